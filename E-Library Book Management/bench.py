@@ -0,0 +1,188 @@
+# bench.py
+# Micro-benchmarks for the E-Library inventory. Run: python bench.py
+
+import contextlib
+import io
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from scr import (INSTRUMENTED, METRICS, ColumnarInventory, LibraryClient, LibraryJournal,
+                 LibrarySystem, LinkedList, make_server)
+
+
+def build_inventory(n, factory=LinkedList):
+    inventory = factory()
+    for i in range(n):
+        inventory.add_book(f"Book {i}", f"Author {i % 1000}")
+    return inventory
+
+
+def bench_find_book(sizes=(1_000, 10_000, 100_000, 500_000), lookups=50_000):
+    """Lookup cost should stay flat as the catalog grows."""
+    print("\n📏 find_book: average lookup time vs catalog size")
+    print(f"{'Books':>10} {'ns/lookup':>12}")
+    print("-" * 24)
+    for n in sizes:
+        inventory = build_inventory(n)
+        titles = [f"BOOK {(i * 7919) % n}" for i in range(lookups)]
+        start = time.perf_counter()
+        for title in titles:
+            inventory.find_book(title)
+        elapsed = time.perf_counter() - start
+        print(f"{n:>10} {elapsed / lookups * 1e9:>12.0f}")
+    print("-" * 24)
+
+
+def bench_search(n=100_000, queries=("Book 4242", "Author 17", "ook 99", "zzz")):
+    """Indexed search vs the old full substring scan."""
+    # Lookup, indexed search and the unindexed scan fold case the same way
+    for factory in (LinkedList, ColumnarInventory, lambda: ColumnarInventory(indexed_search=False)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            inventory = factory()
+            inventory.add_book("Die Straße", "Ödön Horváth")
+        assert inventory.find_book("DIE STRASSE") is not None
+        for keyword in ("STRASSE", "straße", "ÖDÖN", "Die Strasse"):
+            assert [book["title"] for book in inventory.search(keyword)] == ["Die Straße"], keyword
+
+    inventory = build_inventory(n)
+
+    def scan(keyword):
+        return [node.book for node in inventory._nodes()
+                if keyword.casefold() in node.book["title"].casefold()
+                or keyword.casefold() in node.book["author"].casefold()]
+
+    print(f"\n🔍 search on {n} books: indexed vs full scan")
+    print(f"{'Query':<14} {'Hits':>7} {'Indexed ms':>11} {'Scan ms':>9}")
+    print("-" * 44)
+    for keyword in queries:
+        start = time.perf_counter()
+        hits = inventory.search(keyword)
+        indexed = time.perf_counter() - start
+        start = time.perf_counter()
+        expected = scan(keyword)
+        scanned = time.perf_counter() - start
+        assert hits == expected
+        print(f"{keyword:<14} {len(hits):>7} {indexed * 1e3:>11.2f} {scanned * 1e3:>9.2f}")
+    print("-" * 44)
+
+
+def bench_memory(n=200_000):
+    """Traced bytes per book for each inventory layout."""
+    layouts = (
+        ("LinkedList", LinkedList),
+        ("Columnar", ColumnarInventory),
+        ("Columnar, no search index", lambda: ColumnarInventory(indexed_search=False)),
+    )
+    print(f"\n💾 Memory per book ({n} books, tracemalloc)")
+    print(f"{'Layout':<28} {'Bytes/book':>11}")
+    print("-" * 40)
+    for name, factory in layouts:
+        tracemalloc.start()
+        inventory = build_inventory(n, factory)
+        used, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:<28} {used / n:>11.0f}")
+        del inventory
+    print("-" * 40)
+
+
+def bench_startup(n=500_000, tail=10_000):
+    """Startup from a snapshot plus a log tail vs re-adding every book."""
+    print(f"\n🚀 Startup: {n} books in the snapshot, {tail} logged actions after it")
+    with tempfile.TemporaryDirectory() as directory:
+        journal = LibraryJournal(directory, fsync_every=1024)
+        journal.load(LinkedList())
+        inventory = build_inventory(n)
+        journal.snapshot(inventory)
+        for i in range(tail):
+            journal.record("borrow", f"Book {i}")
+        journal.close()
+
+        for name, factory in (("LinkedList", LinkedList), ("Columnar", ColumnarInventory)):
+            start = time.perf_counter()
+            loaded, replayed = LibraryJournal(directory).load(factory())
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<12} restored {loaded} books + {replayed} actions in {elapsed:.2f}s")
+
+    start = time.perf_counter()
+    build_inventory(n)
+    print(f"  add_book x {n}: {time.perf_counter() - start:.2f}s")
+
+
+def bench_server(client_counts=(1, 2, 4, 8, 16), titles=2_000):
+    """Load-generate against the server: every client races to borrow every
+    title. Exactly one borrow per title may succeed; anything else is a
+    double-borrow. Reports throughput per client count."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        library = LibrarySystem(build_inventory(titles))
+    server = make_server(library, ("127.0.0.1", 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    address = server.server_address
+
+    print(f"\n🌐 Server load test: every client borrows all {titles} titles")
+    print(f"{'Clients':>8} {'Requests':>9} {'Req/s':>9} {'Borrowed':>9}")
+    print("-" * 38)
+    for clients in client_counts:
+        wins = [[] for _ in range(clients)]
+        barrier = threading.Barrier(clients)
+
+        def worker(slot):
+            client = LibraryClient(address)
+            order = [f"Book {i}" for i in range(titles)]
+            random.Random(slot).shuffle(order)
+            barrier.wait()
+            for title in order:
+                if client.request("borrow", title=title)["ok"]:
+                    wins[slot].append(title)
+            client.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        borrowed = [title for won in wins for title in won]
+        assert len(borrowed) == len(set(borrowed)) == titles, "double-borrow detected"
+        print(f"{clients:>8} {clients * titles:>9} {clients * titles / elapsed:>9.0f} {len(borrowed):>9}")
+
+        cleanup = LibraryClient(address)
+        for title in borrowed:
+            cleanup.request("return", title=title)
+        cleanup.close()
+    print("-" * 38)
+    server.shutdown()
+    server.server_close()
+
+
+def bench_metrics(n=100_000, lookups=200_000):
+    """find_book with instrumentation off (the default) and on."""
+    print("\n📈 Instrumentation overhead on find_book")
+    print(f"{'Metrics':>10} {'ns/lookup':>12}")
+    print("-" * 24)
+    inventory = build_inventory(n)
+    titles = [f"BOOK {(i * 7919) % n}" for i in range(lookups)]
+    for label in ("off", "on", "off"):
+        if label == "on":
+            METRICS.enable(INSTRUMENTED)
+        start = time.perf_counter()
+        for title in titles:
+            inventory.find_book(title)
+        elapsed = time.perf_counter() - start
+        METRICS.disable()
+        print(f"{label:>10} {elapsed / lookups * 1e9:>12.0f}")
+    print("-" * 24)
+
+
+if __name__ == "__main__":
+    bench_find_book()
+    bench_search()
+    bench_memory()
+    bench_startup()
+    bench_server()
+    bench_metrics()
@@ -1,8 +1,33 @@
 # library_system.py
 # E-Library Book Management with Linked List and Stack (Undo)
 
+import argparse
+import contextlib
+import csv
+import heapq
+import json
+import mmap
+import os
+import re
+import socket
+import socketserver
+import struct
+import sys
+import threading
+from array import array
+from collections import deque
+from itertools import dropwhile, islice
+from operator import itemgetter
+
+
+def fold_case(text):
+    """The one case-insensitive form of a title or author, used by every
+    lookup, search and sort so that e.g. "Straße" and "STRASSE" agree."""
+    return text.casefold()
+
+
 class BookNode:
-    """Node for the linked list representing a book."""
+    """Node for the doubly linked list representing a book."""
     def __init__(self, title, author):
         self.book = {
             "title": title,
@@ -10,153 +35,1324 @@ class BookNode:
             "available": True
         }
         self.next = None
+        self.prev = None
+        self.seq = 0  # Insertion order; larger = closer to head
+
+
+class SearchIndex:
+    """Inverted index over book titles and authors.
+
+    Trigram postings narrow a substring query down to candidate books, which
+    are then verified against the real text. Whole-word postings let ranked
+    queries return exact word matches first.
+
+    After a bulk load the index is marked stale and rebuilt in one pass on
+    the next query, so loading a large catalog does not pay for indexing.
+    """
+    GRAM = 3
+
+    def __init__(self, fields, order):
+        self.fields = fields  # handle -> (title, author)
+        self.order = order    # handle -> insertion sequence
+        self.grams = {}       # trigram -> set of handles
+        self.words = {}       # whole word -> set of handles
+        self.stale = False
+
+    @classmethod
+    def _grams(cls, text):
+        n = cls.GRAM
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    @staticmethod
+    def _words(text):
+        return set(re.findall(r"\w+", text))
+
+    def _texts(self, handle):
+        title, author = self.fields(handle)
+        return fold_case(title), fold_case(author)
+
+    def add(self, handle):
+        if self.stale:
+            return
+        title, author = self._texts(handle)
+        grams, words = self.grams, self.words
+        for gram in self._grams(title) | self._grams(author):
+            postings = grams.get(gram)
+            if postings is None:
+                grams[gram] = {handle}
+            else:
+                postings.add(handle)
+        for word in self._words(title) | self._words(author):
+            postings = words.get(word)
+            if postings is None:
+                words[word] = {handle}
+            else:
+                postings.add(handle)
+
+    def discard(self, handle):
+        if self.stale:
+            return
+        title, author = self._texts(handle)
+        for postings, keys in ((self.grams, self._grams(title) | self._grams(author)),
+                               (self.words, self._words(title) | self._words(author))):
+            for key in keys:
+                handles = postings.get(key)
+                if handles is not None:
+                    handles.discard(handle)
+                    if not handles:
+                        del postings[key]
+
+    def invalidate(self):
+        """Drop all postings; they are rebuilt on the next query."""
+        self.grams.clear()
+        self.words.clear()
+        self.stale = True
+
+    def rebuild(self, handles):
+        self.stale = False
+        for handle in handles:
+            self.add(handle)
+
+    def _intersect(self, postings, keys):
+        sets = [postings.get(key) for key in keys]
+        if not sets or None in sets:
+            return set()
+        sets.sort(key=len)
+        result = set(sets[0])
+        for other in sets[1:]:
+            result &= other
+            if not result:
+                break
+        return result
+
+    def matches(self, handle, keyword):
+        title, author = self._texts(handle)
+        return keyword in title or keyword in author
+
+    def candidates(self, keyword):
+        """Handles that may contain `keyword` (case-folded), newest first.
+
+        Returns None when the keyword is too short for the trigram index to
+        narrow anything down; callers should fall back to a scan.
+        """
+        if len(keyword) < self.GRAM:
+            return None
+        found = self._intersect(self.grams, self._grams(keyword))
+        return sorted(found, key=self.order, reverse=True)
+
+    def word_matches(self, keyword):
+        """Handles containing every whole word of `keyword`, newest first."""
+        words = self._words(keyword)
+        if not words:
+            return []
+        found = self._intersect(self.words, words)
+        return sorted(found, key=self.order, reverse=True)
+
+    def search(self, keyword, scan, limit=None, ranked=False):
+        """Lazily yield handles whose title or author contains `keyword`.
+
+        `scan` is a zero-argument callable yielding every handle newest
+        first, used when the index cannot narrow the query. With `ranked`,
+        whole-word matches come first. Stops once `limit` hits are produced.
+        """
+        if self.stale:
+            self.rebuild(scan())
+        keyword = fold_case(keyword)
+        candidates = self.candidates(keyword)
+        if candidates is None:
+            candidates = scan()
+        hits = (h for h in candidates if self.matches(h, keyword))
+        if ranked:
+            hits = self._ranked(keyword, hits)
+        return islice(hits, limit)
+
+    def _ranked(self, keyword, hits):
+        seen = set()
+        for handle in self.word_matches(keyword):
+            if self.matches(handle, keyword):
+                seen.add(handle)
+                yield handle
+        for handle in hits:
+            if handle not in seen:
+                yield handle
+
+
+# -----------------------------
+# 📄 Paged Listing
+# -----------------------------
+
+BOOK_HEADER = f"{'Title':<25} {'Author':<20} {'Status':<12}\n" + "-" * 60 + "\n"
+BOOK_FOOTER = "-" * 60 + "\n"
+WRITE_BATCH = 1000  # Rows per buffered write when streaming a full listing
+
+SORT_KEYS = {
+    None: lambda seq, book: (-seq,),  # Catalog order: newest first
+    "title": lambda seq, book: (fold_case(book["title"]), -seq),
+    "author": lambda seq, book: (fold_case(book["author"]), fold_case(book["title"]), -seq),
+}
+
+
+def format_books(books):
+    """Render book rows as one string, ready for a single write."""
+    return "".join(
+        f"{book['title']:<25} {book['author']:<20} "
+        f"{'Available' if book['available'] else 'Borrowed':<12}\n"
+        for book in books
+    )
+
+
+def paginate(entries, page_size, offset=0, cursor=None, sort=None):
+    """Return one page of books and the cursor for the next page.
+
+    `entries` yields (seq, book) in catalog order. `sort` is None, "title"
+    or "author". The cursor is the sort key of the last row on the page,
+    or None when nothing follows; passing it back resumes right after that
+    row even if books were added or removed in between. Catalog order is
+    streamed; sorted orders keep a heap of at most offset + page_size + 1
+    rows, so memory follows the page, not the result set.
+    """
+    key = SORT_KEYS[sort]
+    keyed = ((key(seq, book), book) for seq, book in entries)
+    wanted = offset + page_size + 1
+    if sort is None:
+        if cursor is not None:
+            cursor = tuple(cursor)
+            keyed = dropwhile(lambda row: row[0] <= cursor, keyed)
+        window = list(islice(keyed, offset, wanted))
+    else:
+        if cursor is not None:
+            cursor = tuple(cursor)
+            keyed = (row for row in keyed if row[0] > cursor)
+        window = heapq.nsmallest(wanted, keyed, key=itemgetter(0))[offset:]
+    more = len(window) > page_size
+    window = window[:page_size]
+    next_cursor = window[-1][0] if more else None
+    return [book for _, book in window], next_cursor
+
+
+def display_books(entries, page_size=None, offset=0, cursor=None, sort=None):
+    """Print books as a table, one buffered write per page.
+
+    With `page_size` prints that one page and returns the next cursor.
+    Without it streams every book in WRITE_BATCH-row writes.
+    """
+    if page_size is not None:
+        books, next_cursor = paginate(entries, page_size, offset, cursor, sort)
+        sys.stdout.write(BOOK_HEADER + format_books(books) + BOOK_FOOTER)
+        return next_cursor
+
+    if sort is not None:
+        # A full sorted listing has to see every row before the first line
+        entries = sorted(entries, key=lambda entry: SORT_KEYS[sort](*entry))
+    sys.stdout.write(BOOK_HEADER)
+    for batch in batched((book for _, book in islice(entries, offset, None)), WRITE_BATCH):
+        sys.stdout.write(format_books(batch))
+    sys.stdout.write(BOOK_FOOTER)
+    return None
 
 
 class LinkedList:
-    """Singly linked list to manage book inventory."""
+    """Doubly linked list to manage book inventory, with a title index."""
     def __init__(self):
         self.head = None
+        self.tail = None
+        self.size = 0
+        # Case-folded title -> nodes with that title, newest (closest to head) last
+        self.index = {}
+        self.search_index = SearchIndex(
+            lambda node: (node.book["title"], node.book["author"]),
+            lambda node: node.seq,
+        )
+        self._next_seq = 0
+        # Maintained aggregates for the stats API
+        self.by_author = {}        # Case-folded author -> set of nodes
+        self.borrowed = set()      # Nodes currently borrowed
+        self.author_borrowed = {}  # Case-folded author -> borrowed count
 
-    def add_book(self, title, author):
+    def __len__(self):
+        return self.size
+
+    @staticmethod
+    def _key(title):
+        return fold_case(title)
+
+    def _insert(self, title, author, available=True, indexed=True):
         new_node = BookNode(title, author)
+        new_node.book["available"] = available
+        new_node.seq = self._next_seq
+        self._next_seq += 1
         new_node.next = self.head
+        if self.head:
+            self.head.prev = new_node
+        else:
+            self.tail = new_node
         self.head = new_node
+        self.index.setdefault(self._key(title), []).append(new_node)
+        if indexed:
+            self.search_index.add(new_node)
+        self.by_author.setdefault(self._key(author), set()).add(new_node)
+        if not available:
+            self._count_borrowed(new_node, author, 1)
+        self.size += 1
+        return new_node
+
+    def _count_borrowed(self, node, author, delta):
+        key = self._key(author)
+        if delta > 0:
+            self.borrowed.add(node)
+        else:
+            self.borrowed.discard(node)
+        self.author_borrowed[key] = self.author_borrowed.get(key, 0) + delta
+
+    def set_available(self, node, available):
+        """Change a book's availability, keeping the aggregates in sync."""
+        book = node.book
+        if book["available"] != available:
+            book["available"] = available
+            self._count_borrowed(node, book["author"], -1 if available else 1)
+
+    def add_book(self, title, author):
+        self._insert(title, author)
         return f"✅ '{title}' added to inventory."
 
-    def find_book(self, title):
-        """Return node and previous node for modification."""
-        curr = self.head
-        prev = None
+    def bulk_load(self, rows):
+        """Insert (title, author, available) rows, oldest first.
+
+        Equivalent to calling add_book per row, but skips the per-insert
+        message and leaves the search index to be rebuilt once, on the next
+        search. Returns the number of books inserted.
+        """
+        count = 0
+        for title, author, available in rows:
+            self._insert(title, author, available, indexed=False)
+            count += 1
+        if count:
+            self.search_index.invalidate()
+        return count
+
+    def iter_rows(self):
+        """Yield (title, author, available) for every book, oldest first."""
+        curr = self.tail
         while curr:
-            if curr.book["title"].lower() == title.lower():
-                return curr, prev
-            prev = curr
-            curr = curr.next
-        return None, None
+            book = curr.book
+            yield book["title"], book["author"], book["available"]
+            curr = curr.prev
+
+    def find_book(self, title):
+        """Return node and previous node for modification (O(1) via the index)."""
+        nodes = self.index.get(self._key(title))
+        if not nodes:
+            return None, None
+        node = nodes[-1]
+        return node, node.prev
+
+    def copy_number(self, node):
+        """Position of `node` among the books sharing its title, oldest
+        first. Replaying the log rebuilds books in the same order, so title
+        and copy number name the same book after a restart."""
+        nodes = self.index[self._key(node.book["title"])]
+        return next(i for i, other in enumerate(nodes) if other is node)
+
+    def find_copy(self, title, number):
+        """The book `copy_number` calls `number` among those titled `title`."""
+        nodes = self.index.get(self._key(title), ())
+        return nodes[number] if number < len(nodes) else None
+
+    def _unlink(self, node):
+        """Detach a node from the list and the index in O(1)."""
+        if node.prev is None:
+            self.head = node.next
+        else:
+            node.prev.next = node.next
+        if node.next is None:
+            self.tail = node.prev
+        else:
+            node.next.prev = node.prev
+        node.next = node.prev = None
+
+        key = self._key(node.book["title"])
+        nodes = self.index[key]
+        if nodes[-1] is node:
+            nodes.pop()
+        else:
+            nodes.remove(node)
+        if not nodes:
+            del self.index[key]
+        self.search_index.discard(node)
+
+        author = node.book["author"]
+        author_key = self._key(author)
+        books = self.by_author[author_key]
+        books.discard(node)
+        if not books:
+            del self.by_author[author_key]
+        if not node.book["available"]:
+            self._count_borrowed(node, author, -1)
+        self.size -= 1
+
+    def contains(self, node):
+        """True if `node` is still in the inventory (O(1) via the index)."""
+        nodes = self.index.get(self._key(node.book["title"]), ())
+        return any(n is node for n in nodes)
 
     def remove_book(self, title):
-        node, prev = self.find_book(title)
+        node, _ = self.find_book(title)
         if not node:
             return f"❌ '{title}' not found."
-        if prev is None:
-            self.head = node.next
-        else:
-            prev.next = node.next
+        self._unlink(node)
         return f"🗑️  '{title}' removed from inventory."
 
-    def display_all(self):
+    def display_all(self, page_size=None, offset=0, cursor=None, sort=None):
+        """Print the inventory, or one page of it; returns the next-page cursor."""
         if not self.head:
             print("📚 No books in the library.")
-            return
-        print(f"{'Title':<25} {'Author':<20} {'Status':<12}")
-        print("-" * 60)
-        curr = self.head
-        while curr:
-            status = "Available" if curr.book["available"] else "Borrowed"
-            print(f"{curr.book['title']:<25} {curr.book['author']:<20} {status:<12}")
-            curr = curr.next
-        print("-" * 60)
+            return None
+        return display_books(self.iter_books(), page_size, offset, cursor, sort)
 
-    def search(self, keyword):
-        """Search by title or author (case-insensitive)."""
-        results = []
+    def _nodes(self):
         curr = self.head
         while curr:
-            if (keyword.lower() in curr.book["title"].lower() or
-                keyword.lower() in curr.book["author"].lower()):
-                results.append(curr.book)
+            yield curr
             curr = curr.next
-        return results
+
+    def iter_books(self, keyword=None, ranked=False):
+        """Lazily yield (seq, book) newest first: every book, or search hits."""
+        if keyword is None:
+            nodes = self._nodes()
+        else:
+            nodes = self.search_index.search(keyword, self._nodes, None, ranked)
+        for node in nodes:
+            yield node.seq, node.book
+
+    def stats(self):
+        """Catalog totals in O(1) from the maintained counters."""
+        return {"books": self.size, "available": self.size - len(self.borrowed),
+                "borrowed": len(self.borrowed), "authors": len(self.by_author)}
+
+    def author_stats(self, author):
+        """(books, available) for one author in O(1)."""
+        key = self._key(author)
+        total = len(self.by_author.get(key, ()))
+        return total, total - self.author_borrowed.get(key, 0)
+
+    def books_by_author(self, author, available_only=False):
+        """An author's books, newest first, in O(books by that author)."""
+        nodes = self.by_author.get(self._key(author), ())
+        return [node.book for node in sorted(nodes, key=lambda n: n.seq, reverse=True)
+                if not available_only or node.book["available"]]
+
+    def borrowed_books(self):
+        """Everything currently borrowed, newest first, in O(borrowed)."""
+        return [node.book for node in sorted(self.borrowed, key=lambda n: n.seq, reverse=True)]
+
+    def search(self, keyword, limit=None, ranked=False):
+        """Search by title or author (case-insensitive substring match).
+
+        Uses the inverted index to visit only candidate books. `limit` caps
+        the number of results; `ranked` puts whole-word matches first.
+        """
+        hits = self.search_index.search(keyword, self._nodes, limit, ranked)
+        return [node.book for node in hits]
+
+
+class BookView:
+    """Dict-like view of one book row inside a ColumnarInventory."""
+    __slots__ = ("store", "slot")
+    FIELDS = ("title", "author", "available")
+
+    def __init__(self, store, slot):
+        self.store = store
+        self.slot = slot
+
+    def __getitem__(self, field):
+        store, slot = self.store, self.slot
+        if field == "title":
+            return store.titles[slot]
+        if field == "author":
+            return store.authors[store.author_ids[slot]]
+        if field == "available":
+            return store._is_available(slot)
+        raise KeyError(field)
+
+    def __setitem__(self, field, value):
+        if field != "available":
+            raise KeyError(f"'{field}' is read-only")
+        self.store._change_availability(self.slot, value)
+
+    def keys(self):
+        return self.FIELDS
+
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __eq__(self, other):
+        if isinstance(other, BookView):
+            return self.store is other.store and self.slot == other.slot
+        return dict(self) == other
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class BookRef:
+    """Handle to a book in a ColumnarInventory, standing in for a BookNode."""
+    __slots__ = ("store", "slot", "seq")
+
+    def __init__(self, store, slot):
+        self.store = store
+        self.slot = slot
+        self.seq = store.seqs[slot]
+
+    @property
+    def book(self):
+        return BookView(self.store, self.slot)
+
+    @property
+    def next(self):
+        return self.store._ref(self.store.nexts[self.slot])
+
+    @property
+    def prev(self):
+        return self.store._ref(self.store.prevs[self.slot])
+
+    def __eq__(self, other):
+        return (isinstance(other, BookRef) and self.store is other.store
+                and self.slot == other.slot and self.seq == other.seq)
+
+    def __hash__(self):
+        return hash((self.slot, self.seq))
+
+
+class ColumnarInventory:
+    """Array-backed inventory with the same API as LinkedList.
+
+    Books live in parallel columns indexed by slot instead of one node and
+    one dict per book: titles in a list, interned author ids and the list
+    links in typed arrays, and availability in a bitset. Freed slots are
+    reused. find_book returns BookRef handles whose `.book` reads and writes
+    the columns, so LibrarySystem works unchanged on top of it.
+    """
+    NIL = -1
+
+    def __init__(self, indexed_search=True):
+        self.head = self.tail = self.NIL
+        self.size = 0
+        self.titles = []
+        self.authors = []                 # Interned author names
+        self.author_lookup = {}           # Author name -> id
+        self.author_ids = array("I")
+        self.seqs = array("Q")
+        self.nexts = array("i")
+        self.prevs = array("i")
+        self.available = bytearray()      # One bit per slot
+        self.free = array("i")
+        self._next_seq = 1  # 0 marks a free slot
+        # Case-folded title -> slot, or list of slots (newest last) for duplicates
+        self.index = {}
+        # Maintained aggregates for the stats API
+        self.by_author = {}        # Case-folded author -> set of slots
+        self.borrowed = set()      # Slots currently borrowed
+        self.author_borrowed = {}  # Case-folded author -> borrowed count
+        self.search_index = None
+        if indexed_search:
+            self.search_index = SearchIndex(
+                lambda slot: (self.titles[slot], self.authors[self.author_ids[slot]]),
+                self.seqs.__getitem__,
+            )
+
+    def __len__(self):
+        return self.size
+
+    _key = staticmethod(LinkedList._key)
+
+    def _ref(self, slot):
+        return None if slot == self.NIL else BookRef(self, slot)
+
+    def _is_available(self, slot):
+        return bool(self.available[slot >> 3] & (1 << (slot & 7)))
+
+    def _set_bit(self, slot, flag):
+        if flag:
+            self.available[slot >> 3] |= 1 << (slot & 7)
+        else:
+            self.available[slot >> 3] &= ~(1 << (slot & 7)) & 0xFF
+
+    def _intern(self, author):
+        author_id = self.author_lookup.get(author)
+        if author_id is None:
+            author_id = self.author_lookup[author] = len(self.authors)
+            self.authors.append(author)
+        return author_id
+
+    def _alloc(self):
+        if self.free:
+            return self.free.pop()
+        slot = len(self.titles)
+        self.titles.append(None)
+        self.author_ids.append(0)
+        self.seqs.append(0)
+        self.nexts.append(self.NIL)
+        self.prevs.append(self.NIL)
+        if slot >> 3 >= len(self.available):
+            self.available.append(0)
+        return slot
+
+    def _insert(self, title, author, available=True, indexed=True):
+        slot = self._alloc()
+        self.titles[slot] = title
+        self.author_ids[slot] = self._intern(author)
+        self.seqs[slot] = self._next_seq
+        self._next_seq += 1
+        self._set_bit(slot, available)
+
+        self.prevs[slot] = self.NIL
+        self.nexts[slot] = self.head
+        if self.head != self.NIL:
+            self.prevs[self.head] = slot
+        else:
+            self.tail = slot
+        self.head = slot
+
+        key = self._key(title)
+        entry = self.index.get(key)
+        if entry is None:
+            self.index[key] = slot
+        elif isinstance(entry, list):
+            entry.append(slot)
+        else:
+            self.index[key] = [entry, slot]
+        if indexed and self.search_index is not None:
+            self.search_index.add(slot)
+        self.by_author.setdefault(self._key(author), set()).add(slot)
+        if not available:
+            self._count_borrowed(slot, 1)
+        self.size += 1
+        return slot
+
+    def _count_borrowed(self, slot, delta):
+        key = self._key(self.authors[self.author_ids[slot]])
+        if delta > 0:
+            self.borrowed.add(slot)
+        else:
+            self.borrowed.discard(slot)
+        self.author_borrowed[key] = self.author_borrowed.get(key, 0) + delta
+
+    def _change_availability(self, slot, available):
+        if self._is_available(slot) != bool(available):
+            self._set_bit(slot, available)
+            self._count_borrowed(slot, -1 if available else 1)
+
+    def set_available(self, ref, available):
+        """Change a book's availability, keeping the aggregates in sync."""
+        self._change_availability(ref.slot, available)
+
+    def add_book(self, title, author):
+        self._insert(title, author)
+        return f"✅ '{title}' added to inventory."
+
+    def bulk_load(self, rows):
+        """Insert (title, author, available) rows, oldest first (see LinkedList)."""
+        count = 0
+        for title, author, available in rows:
+            self._insert(title, author, available, indexed=False)
+            count += 1
+        if count and self.search_index is not None:
+            self.search_index.invalidate()
+        return count
+
+    def iter_rows(self):
+        """Yield (title, author, available) for every book, oldest first."""
+        slot = self.tail
+        while slot != self.NIL:
+            yield (self.titles[slot], self.authors[self.author_ids[slot]],
+                   self._is_available(slot))
+            slot = self.prevs[slot]
+
+    def _find_slot(self, title):
+        entry = self.index.get(self._key(title))
+        if isinstance(entry, list):
+            return entry[-1]
+        return self.NIL if entry is None else entry
+
+    def find_book(self, title):
+        """Return handle and previous handle for modification (O(1) via the index)."""
+        slot = self._find_slot(title)
+        if slot == self.NIL:
+            return None, None
+        return BookRef(self, slot), self._ref(self.prevs[slot])
+
+    def copy_number(self, ref):
+        """Position among the books sharing its title (see LinkedList)."""
+        entry = self.index[self._key(self.titles[ref.slot])]
+        return entry.index(ref.slot) if isinstance(entry, list) else 0
+
+    def find_copy(self, title, number):
+        entry = self.index.get(self._key(title))
+        slots = entry if isinstance(entry, list) else () if entry is None else (entry,)
+        return self._ref(slots[number]) if number < len(slots) else None
+
+    def contains(self, ref):
+        """True if `ref` still points at the book it was created for."""
+        return ref.store is self and self.seqs[ref.slot] == ref.seq
+
+    def _unlink(self, slot):
+        prev, nxt = self.prevs[slot], self.nexts[slot]
+        if prev == self.NIL:
+            self.head = nxt
+        else:
+            self.nexts[prev] = nxt
+        if nxt == self.NIL:
+            self.tail = prev
+        else:
+            self.prevs[nxt] = prev
+
+        key = self._key(self.titles[slot])
+        entry = self.index[key]
+        if isinstance(entry, list):
+            entry.remove(slot)
+            if len(entry) == 1:
+                self.index[key] = entry[0]
+        else:
+            del self.index[key]
+        if self.search_index is not None:
+            self.search_index.discard(slot)
+
+        author_key = self._key(self.authors[self.author_ids[slot]])
+        books = self.by_author[author_key]
+        books.discard(slot)
+        if not books:
+            del self.by_author[author_key]
+        if not self._is_available(slot):
+            self._count_borrowed(slot, -1)
+
+        self.titles[slot] = None
+        self.seqs[slot] = 0
+        self.free.append(slot)
+        self.size -= 1
+
+    def remove_book(self, title):
+        slot = self._find_slot(title)
+        if slot == self.NIL:
+            return f"❌ '{title}' not found."
+        self._unlink(slot)
+        return f"🗑️  '{title}' removed from inventory."
+
+    def _slots(self):
+        slot = self.head
+        while slot != self.NIL:
+            yield slot
+            slot = self.nexts[slot]
+
+    def display_all(self, page_size=None, offset=0, cursor=None, sort=None):
+        """Print the inventory, or one page of it; returns the next-page cursor."""
+        if self.head == self.NIL:
+            print("📚 No books in the library.")
+            return None
+        return display_books(self.iter_books(), page_size, offset, cursor, sort)
+
+    def iter_books(self, keyword=None, ranked=False):
+        """Lazily yield (seq, book) newest first: every book, or search hits."""
+        if keyword is None:
+            slots = self._slots()
+        elif self.search_index is None:
+            slots = self._scan(fold_case(keyword), ranked)
+        else:
+            slots = self.search_index.search(keyword, self._slots, None, ranked)
+        for slot in slots:
+            yield self.seqs[slot], BookView(self, slot)
+
+    def stats(self):
+        """Catalog totals in O(1) from the maintained counters."""
+        return {"books": self.size, "available": self.size - len(self.borrowed),
+                "borrowed": len(self.borrowed), "authors": len(self.by_author)}
+
+    def author_stats(self, author):
+        """(books, available) for one author in O(1)."""
+        key = self._key(author)
+        total = len(self.by_author.get(key, ()))
+        return total, total - self.author_borrowed.get(key, 0)
+
+    def books_by_author(self, author, available_only=False):
+        """An author's books, newest first, in O(books by that author)."""
+        slots = sorted(self.by_author.get(self._key(author), ()),
+                       key=self.seqs.__getitem__, reverse=True)
+        return [BookView(self, slot) for slot in slots
+                if not available_only or self._is_available(slot)]
+
+    def borrowed_books(self):
+        """Everything currently borrowed, newest first, in O(borrowed)."""
+        slots = sorted(self.borrowed, key=self.seqs.__getitem__, reverse=True)
+        return [BookView(self, slot) for slot in slots]
+
+    def _scan(self, keyword, ranked):
+        """Unindexed search; ranked mode makes a first pass for whole-word hits."""
+        def matching():
+            for slot in self._slots():
+                title = fold_case(self.titles[slot])
+                author = fold_case(self.authors[self.author_ids[slot]])
+                if keyword in title or keyword in author:
+                    yield slot, title, author
+
+        words = SearchIndex._words(keyword) if ranked else None
+        if not words:
+            for slot, _, _ in matching():
+                yield slot
+            return
+        for slot, title, author in matching():
+            if words <= SearchIndex._words(title) | SearchIndex._words(author):
+                yield slot
+        for slot, title, author in matching():
+            if not words <= SearchIndex._words(title) | SearchIndex._words(author):
+                yield slot
+
+    def search(self, keyword, limit=None, ranked=False):
+        """Search by title or author (case-insensitive substring match)."""
+        if self.search_index is None:
+            hits = islice(self._scan(fold_case(keyword), ranked), limit)
+        else:
+            hits = self.search_index.search(keyword, self._slots, limit, ranked)
+        return [BookView(self, slot) for slot in hits]
 
 
 class ActionStack:
-    """Stack to support undo functionality."""
-    def __init__(self):
-        self.stack = []  # Each entry: ("borrow"|"return", title)
+    """Bounded undo/redo history for one user session.
+
+    Entries hold a direct reference to the affected book (a node or handle),
+    so undo and redo never search the catalog. Only the newest `max_depth`
+    entries are kept, and a borrow immediately followed by a return of the
+    same book (or the reverse) cancels out instead of growing the history.
+    """
+    def __init__(self, max_depth=100):
+        self.stack = deque(maxlen=max_depth)  # Each entry: ("borrow"|"return", title, node)
+        self.redo_stack = deque(maxlen=max_depth)
+        self.lock = threading.Lock()  # Held by the server while a request uses this history
 
-    def push(self, action, title):
-        self.stack.append((action, title))
+    def __len__(self):
+        return len(self.stack)
+
+    def push(self, action, title, node=None):
+        self.redo_stack.clear()
+        if self.stack:
+            last_action, _, last_node = self.stack[-1]
+            if node is not None and last_node == node and last_action != action:
+                self.stack.pop()  # Redundant borrow/return pair
+                return
+        self.stack.append((action, title, node))
 
     def pop(self):
+        """Take the newest entry for undo; it becomes available to redo."""
+        if not self.stack:
+            return None
+        entry = self.stack.pop()
+        self.redo_stack.append(entry)
+        return entry
+
+    def pop_redo(self):
+        """Take the most recently undone entry; it becomes undoable again."""
+        if not self.redo_stack:
+            return None
+        entry = self.redo_stack.pop()
+        self.stack.append(entry)
+        return entry
+
+    def drop(self):
+        """Discard the newest entry without making it redoable."""
         return self.stack.pop() if self.stack else None
 
+    def peek(self):
+        return self.stack[-1] if self.stack else None
+
+    def peek_redo(self):
+        return self.redo_stack[-1] if self.redo_stack else None
+
     def is_empty(self):
         return len(self.stack) == 0
 
 
+# -----------------------------
+# 💾 Persistence
+# -----------------------------
+
+class LibraryJournal:
+    """Durable library state: an append-only operation log plus snapshots.
+
+    Every change is appended to `library.log` as one JSON array per line and
+    fsync'd in batches of `fsync_every` records. Every `snapshot_every`
+    records the whole inventory is written to `library.snapshot` together
+    with the log offset it covers, so startup memory-maps the snapshot and
+    replays only the log tail written after it. Availability changes name
+    their book by title and copy number, so duplicate titles replay onto
+    the copy that actually changed.
+
+    The snapshot is a JSON header line followed by packed rows: title and
+    author byte lengths, an availability byte, then the UTF-8 text.
+    """
+    SNAPSHOT_VERSION = 1
+    ROW = struct.Struct("<IIB")
+
+    def __init__(self, directory, fsync_every=64, snapshot_every=10_000):
+        os.makedirs(directory, exist_ok=True)
+        self.log_path = os.path.join(directory, "library.log")
+        self.snapshot_path = os.path.join(directory, "library.snapshot")
+        self.fsync_every = fsync_every
+        self.snapshot_every = snapshot_every
+        self.log = None
+        self.lock = threading.Lock()  # Serializes writers from server threads
+        self.pending = 0          # Records written but not yet fsync'd
+        self.since_snapshot = 0   # Records written since the last snapshot
+
+    def load(self, inventory):
+        """Rebuild `inventory` from disk and open the log for appending.
+
+        Returns (books loaded from the snapshot, log records replayed).
+        """
+        offset, loaded = self._load_snapshot(inventory)
+        replayed = self._replay(inventory, offset)
+        self.log = open(self.log_path, "ab")
+        self.since_snapshot = replayed
+        return loaded, replayed
+
+    def _load_snapshot(self, inventory):
+        if not os.path.exists(self.snapshot_path) or not os.path.getsize(self.snapshot_path):
+            return 0, 0
+        with open(self.snapshot_path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header = json.loads(mm.readline())
+            if header.get("version") != self.SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported snapshot version: {header.get('version')}")
+            loaded = inventory.bulk_load(self._read_rows(mm, mm.tell()))
+        return header["log_offset"], loaded
+
+    @classmethod
+    def _read_rows(cls, buf, pos):
+        unpack, size, end = cls.ROW.unpack_from, cls.ROW.size, len(buf)
+        while pos < end:
+            title_len, author_len, available = unpack(buf, pos)
+            pos += size
+            title = buf[pos:pos + title_len].decode()
+            pos += title_len
+            author = buf[pos:pos + author_len].decode()
+            pos += author_len
+            yield title, author, bool(available)
+
+    def _replay(self, inventory, offset):
+        if not os.path.exists(self.log_path):
+            return 0
+        replayed = 0
+        with open(self.log_path, "rb") as f:
+            f.seek(offset)
+            good = offset
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # Torn write from a crash; drop it
+                self.apply(inventory, record)
+                good += len(line)
+                replayed += 1
+        if good < os.path.getsize(self.log_path):
+            os.truncate(self.log_path, good)
+        return replayed
+
+    @staticmethod
+    def apply(inventory, record):
+        """Re-apply one logged operation to `inventory`."""
+        op, *args = record
+        if op == "add":
+            inventory._insert(*args)
+        elif op == "remove":
+            inventory.remove_book(args[0])
+        else:
+            if op == "undo":
+                act_type, title, *copy = args
+                available = act_type == "borrow"
+            else:
+                title, *copy = args
+                available = op == "return"
+            # Records from older logs carry no copy number: newest copy
+            node = inventory.find_copy(title, copy[0]) if copy else inventory.find_book(title)[0]
+            if node:
+                inventory.set_available(node, available)
+
+    def record(self, op, *args):
+        line = json.dumps([op, *args]).encode() + b"\n"
+        with self.lock:
+            self.log.write(line)
+            self.pending += 1
+            self.since_snapshot += 1
+            if self.pending >= self.fsync_every:
+                self._sync()
+
+    def sync(self):
+        with self.lock:
+            self._sync()
+
+    def _sync(self):
+        if self.log and self.pending:
+            self.log.flush()
+            os.fsync(self.log.fileno())
+            self.pending = 0
+
+    def maybe_snapshot(self, inventory):
+        if self.since_snapshot >= self.snapshot_every:
+            self.snapshot(inventory)
+
+    def snapshot(self, inventory):
+        """Write the full inventory atomically, tagged with the current log offset.
+
+        Records logged while the snapshot is being written land after that
+        offset and are replayed on top of it; borrow, return and undo replay
+        as absolute availability states, so they converge either way.
+        """
+        with self.lock:
+            self._sync()
+            self.log.flush()
+            log_offset = self.log.tell()
+            self.since_snapshot = 0
+        header = {"version": self.SNAPSHOT_VERSION, "log_offset": log_offset,
+                  "books": len(inventory)}
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps(header).encode() + b"\n")
+            pack = self.ROW.pack
+            for title, author, available in inventory.iter_rows():
+                title, author = title.encode(), author.encode()
+                f.write(pack(len(title), len(author), available) + title + author)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def close(self):
+        if self.log:
+            self.sync()
+            self.log.close()
+            self.log = None
+
+
+# -----------------------------
+# 📦 Bulk Import / Export
+# -----------------------------
+
+CATALOG_FIELDS = ("title", "author", "available")
+FALSE_WORDS = {"false", "0", "no", "n", "borrowed"}
+
+
+def catalog_format(path, fmt=None):
+    """Pick 'csv' or 'jsonl' from an explicit format or the file extension."""
+    if fmt:
+        return fmt
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def _parse_available(value):
+    if isinstance(value, bool):
+        return value
+    if value is None or value == "":
+        return True
+    return str(value).strip().lower() not in FALSE_WORDS
+
+
+def _jsonl_records(f):
+    """Yield one dict per non-blank line, or None where a line is not a JSON object."""
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            record = None
+        yield record if isinstance(record, dict) else None
+
+
+def read_catalog(f, fmt, skipped=None):
+    """Stream (title, author, available) rows from an open text file.
+
+    CSV needs a header with `title` and `author` columns (`available` is
+    optional); JSONL needs one object per line with the same keys. Rows
+    missing a title or author (or, in JSONL, lines that are not an object
+    with string fields) are skipped and counted in `skipped[0]`.
+    """
+    records = csv.DictReader(f) if fmt == "csv" else _jsonl_records(f)
+    for record in records:
+        title = record and record.get("title") or ""
+        author = record and record.get("author") or ""
+        if not isinstance(title, str) or not isinstance(author, str):
+            title = author = ""
+        title, author = title.strip(), author.strip()
+        if not title or not author:
+            if skipped is not None:
+                skipped[0] += 1
+            continue
+        yield title, author, _parse_available(record.get("available"))
+
+
+def write_catalog(f, fmt, rows):
+    """Stream (title, author, available) rows to an open text file."""
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(f)
+        writer.writerow(CATALOG_FIELDS)
+        for count, row in enumerate(rows, 1):
+            writer.writerow(row)
+    else:
+        for count, row in enumerate(rows, 1):
+            f.write(json.dumps(dict(zip(CATALOG_FIELDS, row))) + "\n")
+    return count
+
+
+def batched(rows, size):
+    """Yield lists of at most `size` rows so only one batch is held in memory."""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
 # -----------------------------
 # 📚 Main Library System
 # -----------------------------
 
 class LibrarySystem:
-    def __init__(self):
-        self.inventory = LinkedList()
-        self.undo_stack = ActionStack()
+    page_size = 20  # Rows per page in the interactive listings
+
+    def __init__(self, inventory=None, journal=None, history_depth=100):
+        self.inventory = inventory if inventory is not None else LinkedList()
+        self.history_depth = history_depth
+        self.undo_stack = ActionStack(history_depth)
+        self.sessions = {}  # User name -> that user's ActionStack
+        self.journal = journal
+        # Guards structural changes (add/remove) and snapshots when several
+        # threads share this library; see LibraryServer.
+        self.lock = threading.RLock()
         print("📚 Welcome to the E-Library Management System!")
+        if journal:
+            loaded, replayed = journal.load(self.inventory)
+            print(f"💾 Restored {loaded} books from snapshot, replayed {replayed} logged actions.")
+
+    def _log(self, op, *args):
+        """Record a change in the journal, if persistence is enabled."""
+        if self.journal:
+            self.journal.record(op, *args)
+            # Never wait for the structure lock here: borrow/return hold only
+            # a per-title lock, and snapshotting can simply happen next time.
+            if self.lock.acquire(blocking=False):
+                try:
+                    self.journal.maybe_snapshot(self.inventory)
+                finally:
+                    self.lock.release()
+
+    def _stack(self, undo_stack):
+        return self.undo_stack if undo_stack is None else undo_stack
+
+    def session(self, user):
+        """Return the undo/redo history for `user`, creating it on first use."""
+        history = self.sessions.get(user)
+        if history is None:
+            # setdefault is atomic, so concurrent first requests share one history
+            history = self.sessions.setdefault(user, ActionStack(self.history_depth))
+        return history
+
+    def _book_state(self, node):
+        """Availability of a history entry's book, or None if it was removed."""
+        if node is None or not self.inventory.contains(node):
+            return None
+        return node.book["available"]
+
+    # ---- Core operations: return (ok, message), never prompt ----
+
+    def process_add(self, title, author):
+        if not title or not author:
+            return False, "⚠️  Title and author are required."
+        message = self.inventory.add_book(title, author)
+        self._log("add", title, author)
+        return True, message
+
+    def process_remove(self, title):
+        node, _ = self.inventory.find_book(title)
+        if not node:
+            return False, f"❌ '{title}' does not exist in the library."
+        message = self.inventory.remove_book(title)
+        self._log("remove", title)
+        return True, message
+
+    def process_borrow(self, title, undo_stack=None):
+        node, _ = self.inventory.find_book(title)
+        if not node:
+            return False, f"❌ '{title}' does not exist in the library."
+        if not node.book["available"]:
+            return False, f"❌ '{title}' is already borrowed."
+
+        self.inventory.set_available(node, False)
+        self._stack(undo_stack).push("borrow", title, node)
+        self._log("borrow", title, self.inventory.copy_number(node))
+        return True, f"✅ You borrowed '{title}'."
+
+    def process_return(self, title, undo_stack=None):
+        node, _ = self.inventory.find_book(title)
+        if not node:
+            return False, f"❌ '{title}' does not exist in the library."
+        if node.book["available"]:
+            return False, f"❌ '{title}' is already available."
+
+        self.inventory.set_available(node, True)
+        self._stack(undo_stack).push("return", title, node)
+        self._log("return", title, self.inventory.copy_number(node))
+        return True, f"✅ '{title}' has been returned."
+
+    def process_undo(self, undo_stack=None):
+        history = self._stack(undo_stack)
+        action = history.peek()
+        if not action:
+            return False, "🔙 No actions to undo."
+
+        act_type, title, node = action
+        state = self._book_state(node)
+        if state is None:
+            history.drop()
+            return False, f"⚠️  Book '{title}' not found during undo."
+        # A borrow leaves the book unavailable; anything else means someone
+        # has changed it since, and undoing would clobber their action.
+        if state != (act_type == "return"):
+            history.drop()
+            return False, f"⚠️  '{title}' has changed since; cannot undo."
+
+        history.pop()
+        if act_type == "borrow":
+            self.inventory.set_available(node, True)
+            message = f"🔙 Undo: '{title}' is back on the shelf."
+        else:
+            self.inventory.set_available(node, False)
+            message = f"🔙 Undo: You re-borrowed '{title}'."
+        self._log("undo", act_type, title, self.inventory.copy_number(node))
+        return True, message
+
+    def process_redo(self, undo_stack=None):
+        history = self._stack(undo_stack)
+        action = history.peek_redo()
+        if not action:
+            return False, "🔁 Nothing to redo."
+
+        act_type, title, node = action
+        state = self._book_state(node)
+        if state is None or state != (act_type == "borrow"):
+            history.redo_stack.pop()
+            return False, f"⚠️  '{title}' has changed since; cannot redo."
+
+        history.pop_redo()
+        self.inventory.set_available(node, act_type == "return")
+        self._log(act_type, title, self.inventory.copy_number(node))
+        if act_type == "borrow":
+            return True, f"🔁 Redo: You borrowed '{title}' again."
+        return True, f"🔁 Redo: '{title}' is returned again."
+
+    def process_stats(self, author=None):
+        """Catalog counters, plus one author's counts and shelf when given.
+
+        Everything comes from aggregates the inventory maintains on each
+        change, so this never walks the catalog.
+        """
+        report = self.inventory.stats()
+        if author:
+            total, available = self.inventory.author_stats(author)
+            report["author"] = {
+                "name": author, "books": total, "available": available,
+                "on_shelf": [dict(book) for book in
+                             self.inventory.books_by_author(author, available_only=True)],
+            }
+        return report
+
+    # ---- Interactive menu actions ----
 
     def add_book(self):
         print("\n➕ Add a New Book")
         title = input("Enter book title: ").strip()
         author = input("Enter author name: ").strip()
-        if not title or not author:
-            print("⚠️  Title and author are required.")
+        print(self.process_add(title, author)[1])
+
+    def remove_book(self):
+        title = input("\nEnter the title to remove: ").strip()
+        if not title:
+            print("⚠️  Please enter a title.")
             return
-        print(self.inventory.add_book(title, author))
+        print(self.process_remove(title)[1])
 
     def borrow_book(self):
         title = input("\nEnter the title to borrow: ").strip()
         if not title:
             print("⚠️  Please enter a title.")
             return
-
-        node, _ = self.inventory.find_book(title)
-        if not node:
-            print(f"❌ '{title}' does not exist in the library.")
-            return
-        if not node.book["available"]:
-            print(f"❌ '{title}' is already borrowed.")
-            return
-
-        node.book["available"] = False
-        self.undo_stack.push("borrow", title)
-        print(f"✅ You borrowed '{title}'.")
+        print(self.process_borrow(title)[1])
 
     def return_book(self):
         title = input("\nEnter the title to return: ").strip()
         if not title:
             print("⚠️  Please enter a title.")
             return
+        print(self.process_return(title)[1])
 
-        node, _ = self.inventory.find_book(title)
-        if not node:
-            print(f"❌ '{title}' does not exist in the library.")
-            return
-        if node.book["available"]:
-            print(f"❌ '{title}' is already available.")
-            return
+    def undo_last_action(self):
+        print(self.process_undo()[1])
 
-        node.book["available"] = True
-        self.undo_stack.push("return", title)
-        print(f"✅ '{title}' has been returned.")
+    def redo_last_action(self):
+        print(self.process_redo()[1])
 
-    def undo_last_action(self):
-        action = self.undo_stack.pop()
-        if not action:
-            print("🔙 No actions to undo.")
-            return
+    def show_stats(self):
+        report = self.process_stats()
+        print("\n" + "━" * 60)
+        print("📊 LIBRARY STATS")
+        print("━" * 60)
+        print(f"📚 Books: {report['books']}   ✅ Available: {report['available']}   "
+              f"📕 Borrowed: {report['borrowed']}   ✍️  Authors: {report['authors']}")
 
-        act_type, title = action
-        node, _ = self.inventory.find_book(title)
-        if not node:
-            print(f"⚠️  Book '{title}' not found during undo.")
-            return
+        author = input("\nAuthor to look up (Enter to skip): ").strip()
+        if author:
+            total, available = self.inventory.author_stats(author)
+            print(f"\n✍️  {author}: {total} books, {available} on the shelf")
+            shelf = self.inventory.books_by_author(author, available_only=True)
+            if shelf:
+                sys.stdout.write(BOOK_HEADER + format_books(shelf) + BOOK_FOOTER)
 
-        if act_type == "borrow":
-            node.book["available"] = True
-            print(f"🔙 Undo: '{title}' is back on the shelf.")
-        elif act_type == "return":
-            node.book["available"] = False
-            print(f"🔙 Undo: You re-borrowed '{title}'.")
+        if report["borrowed"] and input("\nList borrowed books? (y/N): ").strip().lower() == "y":
+            sys.stdout.write(BOOK_HEADER + format_books(self.inventory.borrowed_books()) + BOOK_FOOTER)
+        print("━" * 60)
+
+    def structure_sizes(self):
+        """Element counts of the main structures, for the instrumentation dump."""
+        inventory = self.inventory
+        index = inventory.search_index
+        return {"books": len(inventory), "title_keys": len(inventory.index),
+                "authors": len(inventory.by_author), "borrowed": len(inventory.borrowed),
+                "search_trigrams": len(index.grams) if index else 0,
+                "search_words": len(index.words) if index else 0,
+                "undo_entries": len(self.undo_stack), "sessions": len(self.sessions)}
+
+    def show_metrics(self):
+        print("\n" + "━" * 60)
+        print("📈 INSTRUMENTATION")
+        print("━" * 60)
+        print(METRICS.format())
+        print("━" * 60)
+
+    def _ask_sort(self):
+        choice = input("Sort by (Enter = newest first, t = title, a = author): ").strip().lower()
+        return {"t": "title", "a": "author"}.get(choice)
+
+    def _browse(self, entries, sort, cursor=None):
+        """Show pages of `entries()` until the reader stops or they run out."""
+        while True:
+            cursor = display_books(entries(), self.page_size, cursor=cursor, sort=sort)
+            if cursor is None:
+                return
+            if input("⏭️  Enter = next page, q = stop: ").strip().lower() == "q":
+                return
 
     def search_books(self):
         keyword = input("\nEnter title or author to search: ").strip()
@@ -164,24 +1360,61 @@ class LibrarySystem:
             print("⚠️  Please enter a keyword.")
             return
 
-        results = self.inventory.search(keyword)
-        if not results:
+        if next(self.inventory.iter_books(keyword), None) is None:
             print(f"🔍 No books found matching '{keyword}'.")
             return
 
+        sort = self._ask_sort()
         print(f"\n🔎 Search Results for '{keyword}':")
-        print(f"{'Title':<25} {'Author':<20} {'Status':<12}")
-        print("-" * 60)
-        for book in results:
-            status = "Available" if book["available"] else "Borrowed"
-            print(f"{book['title']:<25} {book['author']:<20} {status:<12}")
-        print("-" * 60)
+        self._browse(lambda: self.inventory.iter_books(keyword), sort)
 
     def view_all_books(self):
         print("\n" + "="*60)
         print("📖 FULL INVENTORY")
         print("="*60)
-        self.inventory.display_all()
+        if not len(self.inventory):
+            print("📚 No books in the library.")
+            return
+        self._browse(self.inventory.iter_books, self._ask_sort())
+
+    def import_books(self, path, fmt=None, batch_size=10_000):
+        """Stream a CSV/JSONL catalog into the inventory in batches.
+
+        Each batch goes through the inventory's bulk path, so no per-row
+        messages are built and the search index is rebuilt once afterwards.
+        With persistence on, a single snapshot is written at the end
+        instead of one log record per book.
+        """
+        fmt = catalog_format(path, fmt)
+        skipped = [0]
+        imported = 0
+        with open(path, newline="", encoding="utf-8") as f:
+            for batch in batched(read_catalog(f, fmt, skipped), batch_size):
+                imported += self.inventory.bulk_load(batch)
+                print(f"📦 Imported {imported} books...", end="\r", flush=True)
+        if self.journal and imported:
+            self.journal.snapshot(self.inventory)
+        print(f"✅ Imported {imported} books from '{path}'"
+              + (f" ({skipped[0]} invalid rows skipped)." if skipped[0] else "."))
+        return imported
+
+    def export_books(self, path, fmt=None):
+        """Stream the inventory, oldest first, to a CSV/JSONL file ('-' for stdout)."""
+        fmt = catalog_format(path, fmt)
+        if path == "-":
+            count = write_catalog(sys.stdout, fmt, self.inventory.iter_rows())
+            print(f"✅ Exported {count} books.", file=sys.stderr)
+            return count
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            count = write_catalog(f, fmt, self.inventory.iter_rows())
+        print(f"✅ Exported {count} books to '{path}'.")
+        return count
+
+    def shutdown(self):
+        """Snapshot and close the journal so the next start replays nothing."""
+        if self.journal:
+            self.journal.snapshot(self.inventory)
+            self.journal.close()
 
     def menu(self):
         while True:
@@ -194,9 +1427,13 @@ class LibrarySystem:
             print("4. 🔙 Undo Last Action")
             print("5. 🔍 Search Books")
             print("6. 👀 View All Books")
-            print("7. 🚪 Exit")
+            print("7. 🗑️  Remove Book")
+            print("8. 🔁 Redo Last Undo")
+            print("9. 📊 Library Stats")
+            print("10. 📈 Instrumentation")
+            print("11. 🚪 Exit")
 
-            choice = input("\n👉 Choose an option (1-7): ").strip()
+            choice = input("\n👉 Choose an option (1-11): ").strip()
 
             if choice == '1':
                 self.add_book()
@@ -211,10 +1448,202 @@ class LibrarySystem:
             elif choice == '6':
                 self.view_all_books()
             elif choice == '7':
+                self.remove_book()
+            elif choice == '8':
+                self.redo_last_action()
+            elif choice == '9':
+                self.show_stats()
+            elif choice == '10':
+                self.show_metrics()
+            elif choice == '11':
+                self.shutdown()
                 print("👋 Thank you for using the E-Library System. Goodbye!")
                 break
             else:
-                print("❌ Invalid choice. Please select 1–7.")
+                print("❌ Invalid choice. Please select 1–11.")
+
+
+# -----------------------------
+# 🌐 Multi-Client Server
+# -----------------------------
+
+class StripedLocks:
+    """Fixed pool of locks; a title always maps to the same stripe.
+
+    Borrows and returns of different titles almost never share a stripe,
+    so they run without serializing on one global lock.
+    """
+    def __init__(self, stripes=64):
+        self.locks = [threading.Lock() for _ in range(stripes)]
+
+    def __call__(self, title):
+        return self.locks[hash(LinkedList._key(title)) % len(self.locks)]
+
+
+class LibraryService:
+    """Thread-safe request dispatcher shared by all client connections.
+
+    Borrow, return, undo and redo take only the stripe lock of their title,
+    which makes the check-then-set on availability atomic per book. Add,
+    remove and search take the library's structure lock since they touch
+    the list and indexes; remove then also takes the title's stripe. Undo
+    history belongs to the connection, or to a named user when the request
+    carries "user"; its own lock is taken before any stripe. Locks are
+    always taken in that order, so they cannot deadlock.
+    """
+    SEARCH_LIMIT = 100
+
+    def __init__(self, library, stripes=64):
+        self.library = library
+        self.stripe = StripedLocks(stripes)
+
+    def handle(self, request, undo_stack):
+        """Answer one request. Whatever goes wrong is reported in the
+        response, so a bad request never ends the client's connection."""
+        if not isinstance(request, dict):
+            return {"ok": False, "message": "❌ Malformed request.",
+                    "error": "a request must be a JSON object"}
+        try:
+            return self._dispatch(request, undo_stack)
+        except Exception as error:
+            return {"ok": False, "message": "❌ Request failed.",
+                    "error": f"{type(error).__name__}: {error}"}
+
+    def _dispatch(self, request, undo_stack):
+        op = request.get("op")
+        title = str(request.get("title", "")).strip()
+        library = self.library
+        if request.get("user"):
+            undo_stack = library.session(str(request["user"]))
+
+        if op in ("borrow", "return"):
+            if not title:
+                return {"ok": False, "message": "⚠️  Please enter a title."}
+            process = library.process_borrow if op == "borrow" else library.process_return
+            with undo_stack.lock, self.stripe(title):
+                ok, message = process(title, undo_stack)
+        elif op in ("undo", "redo"):
+            process = library.process_undo if op == "undo" else library.process_redo
+            with undo_stack.lock:
+                top = undo_stack.peek() if op == "undo" else undo_stack.peek_redo()
+                if top is None:
+                    ok, message = process(undo_stack)
+                else:
+                    with self.stripe(top[1]):
+                        ok, message = process(undo_stack)
+        elif op == "add":
+            with library.lock:
+                ok, message = library.process_add(title, str(request.get("author", "")).strip())
+        elif op == "remove":
+            with library.lock, self.stripe(title):
+                ok, message = library.process_remove(title)
+        elif op == "search":
+            keyword = str(request.get("keyword", "")).strip()
+            limit = request.get("limit", self.SEARCH_LIMIT)
+            offset = request.get("offset", 0)
+            sort = request.get("sort")
+            if sort not in SORT_KEYS:
+                return {"ok": False, "message": f"❌ Unknown sort: {sort!r}"}
+            for field, value in (("limit", limit), ("offset", offset)):
+                if type(value) is not int or value < 0:
+                    return {"ok": False, "message": f"❌ {field} must be a whole number ≥ 0, not {value!r}"}
+            with library.lock:
+                books, cursor = paginate(library.inventory.iter_books(keyword), limit,
+                                         offset, request.get("cursor"), sort)
+                results = [dict(book) for book in books]
+            return {"ok": True, "message": f"🔎 {len(results)} results.",
+                    "results": results, "next_cursor": cursor}
+        elif op == "stats":
+            with library.lock:
+                report = library.process_stats(str(request.get("author", "")).strip() or None)
+            return {"ok": True, "message": "📊 Library stats.", "stats": report}
+        else:
+            return {"ok": False, "message": f"❌ Unknown operation: {op!r}"}
+        return {"ok": ok, "message": message}
+
+
+class LibraryRequestHandler(socketserver.StreamRequestHandler):
+    """One thread per connection; each connection has its own undo history."""
+
+    def handle(self):
+        undo_stack = ActionStack(self.server.service.library.history_depth)
+        for line in self.rfile:
+            try:
+                response = self.server.service.handle(json.loads(line), undo_stack)
+            except ValueError as error:
+                response = {"ok": False, "message": "❌ Malformed request.", "error": str(error)}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class LibraryTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class LibraryUnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+def make_server(library, address, stripes=64):
+    """Build a threaded server for `library`.
+
+    `address` is a (host, port) pair for TCP or a filesystem path for a
+    Unix socket. Call serve_forever() on the result.
+    """
+    if isinstance(address, str):
+        server = LibraryUnixServer(address, LibraryRequestHandler)
+    else:
+        server = LibraryTCPServer(address, LibraryRequestHandler)
+    server.service = LibraryService(library, stripes)
+    return server
+
+
+class LibraryClient:
+    """Minimal blocking client speaking the server's JSON-lines protocol."""
+
+    def __init__(self, address):
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(address)
+        else:
+            self.sock = socket.create_connection(address)
+        self.file = self.sock.makefile("rwb")
+
+    def request(self, op, **fields):
+        self.file.write(json.dumps({"op": op, **fields}).encode() + b"\n")
+        self.file.flush()
+        return json.loads(self.file.readline())
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+# -----------------------------
+# 📈 Instrumentation
+# -----------------------------
+
+# metrics.py is shared by the three tools and lives in the repository root
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+import metrics  # noqa: E402
+
+METRICS = metrics.Metrics("elibrary")
+
+# Operations timed when instrumentation is on
+INSTRUMENTED = [
+    (SearchIndex, "candidates"),
+    *((inventory, name) for inventory in (LinkedList, ColumnarInventory)
+      for name in ("find_book", "add_book", "remove_book", "bulk_load", "search")),
+    *((LibrarySystem, name) for name in ("process_add", "process_remove", "process_borrow",
+                                         "process_return", "process_undo", "process_redo",
+                                         "process_stats")),
+    (LibraryJournal, "record"),
+    (LibraryJournal, "snapshot"),
+    (LibraryService, "handle"),
+]
 
 
 # -----------------------------
@@ -222,5 +1651,58 @@ class LibrarySystem:
 # -----------------------------
 
 if __name__ == "__main__":
-    library = LibrarySystem()
-    library.menu()
+    parser = argparse.ArgumentParser(description="E-Library Book Management")
+    parser.add_argument("--backend", choices=("linked", "columnar"), default="linked",
+                        help="inventory layout: linked list nodes or compact columns")
+    parser.add_argument("--data-dir",
+                        help="directory for the persistent log and snapshot (default: in-memory only)")
+    parser.add_argument("--history-depth", type=int, default=100,
+                        help="undo/redo entries kept per user session")
+    metrics.add_arguments(parser, menu_option=10)
+    commands = parser.add_subparsers(dest="command")
+    import_cmd = commands.add_parser("import", help="bulk-load a CSV/JSONL catalog")
+    import_cmd.add_argument("path")
+    import_cmd.add_argument("--format", choices=("csv", "jsonl"))
+    import_cmd.add_argument("--batch-size", type=int, default=10_000)
+    export_cmd = commands.add_parser("export", help="write the inventory as CSV/JSONL")
+    export_cmd.add_argument("path", help="output file, or - for stdout")
+    export_cmd.add_argument("--format", choices=("csv", "jsonl"))
+    serve_cmd = commands.add_parser("serve", help="serve many clients over TCP or a Unix socket")
+    serve_cmd.add_argument("--host", default="127.0.0.1")
+    serve_cmd.add_argument("--port", type=int, default=7878)
+    serve_cmd.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    args = parser.parse_args()
+
+    inventory = ColumnarInventory() if args.backend == "columnar" else LinkedList()
+    journal = LibraryJournal(args.data_dir) if args.data_dir else None
+    if args.command == "export" and args.path == "-":
+        # Keep stdout clean for the exported data
+        with contextlib.redirect_stdout(sys.stderr):
+            library = LibrarySystem(inventory, journal, args.history_depth)
+    else:
+        library = LibrarySystem(inventory, journal, args.history_depth)
+
+    METRICS.sizes = library.structure_sizes
+    metrics.start(METRICS, args, INSTRUMENTED)
+
+    if args.command == "import":
+        library.import_books(args.path, args.format, args.batch_size)
+        library.shutdown()
+    elif args.command == "export":
+        library.export_books(args.path, args.format)
+        library.shutdown()
+    elif args.command == "serve":
+        address = args.unix or (args.host, args.port)
+        with make_server(library, address) as server:
+            print(f"🌐 Serving the library on {address}. Press Ctrl+C to stop.")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+        if args.unix:
+            os.unlink(args.unix)
+        library.shutdown()
+    else:
+        library.menu()
+
+    metrics.finish(METRICS, args)
@@ -0,0 +1,338 @@
+# bench.py
+# Micro-benchmarks for the Expression Calculator. Run: python bench.py
+
+import contextlib
+import io
+import random
+import time
+import tracemalloc
+
+from scr import (INSTRUMENTED, METRICS, ExpressionCalculator, HistoryStore, Variable, count_operations,
+                 np, run_postfix, scan)
+
+
+def make_calculator(**kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ExpressionCalculator(**kwargs)
+
+
+def random_expression(rng, terms=12):
+    parts = [str(rng.randint(1, 99))]
+    for _ in range(terms):
+        parts.append(rng.choice("+-*/"))
+        parts.append(f"({rng.randint(1, 99)} {rng.choice('+-*')} {rng.randint(1, 9)})")
+    return " ".join(parts)
+
+
+def bench_cache(formulas=2_000, evaluations=200_000):
+    """Repetitive workload: a few thousand formulas evaluated over and over."""
+    rng = random.Random(42)
+    pool = [random_expression(rng) for _ in range(formulas)]
+    workload = [rng.choice(pool) for _ in range(evaluations)]
+    calc = make_calculator()
+
+    start = time.perf_counter()
+    for expr in workload:
+        calc.evaluate_postfix(calc.infix_to_postfix(calc.tokenize(expr)))
+    uncached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for expr in workload:
+        calc.evaluate_postfix(calc.compile(expr).postfix)
+    cached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for expr in workload:
+        calc.compile(expr).evaluate()
+    closure = time.perf_counter() - start
+
+    for expr in pool:
+        assert calc.compile(expr).evaluate() == calc.evaluate_postfix(calc.compile(expr).postfix)
+
+    stats = calc.cache.stats()
+    print(f"\n⚡ Compiled-expression cache: {evaluations} evaluations of {formulas} formulas")
+    print(f"   Parse every time         : {uncached:.2f}s")
+    print(f"   Cached postfix           : {cached:.2f}s  ({uncached / cached:.1f}x faster)")
+    print(f"   Cached generated closure : {closure:.2f}s  ({uncached / closure:.1f}x faster)")
+    print(f"   Hit rate                 : {stats['hit_rate']:.1%} ({stats['evictions']} evictions)")
+
+
+def legacy_tokenize(expr):
+    """The character-at-a-time tokenizer that scan() replaced, kept for comparison."""
+    tokens = []
+    number = ""
+    name = ""
+    for char in expr:
+        if name and (char.isalnum() or char == '_'):
+            name += char
+        elif char.isdigit() or char == '.':
+            if name:
+                tokens.append(Variable(name))
+                name = ""
+            number += char
+        elif char.isalpha() or char == '_':
+            if number:
+                tokens.append(float(number) if '.' in number else int(number))
+                number = ""
+            name = char
+        else:
+            if number:
+                tokens.append(float(number) if '.' in number else int(number))
+                number = ""
+            if name:
+                tokens.append(Variable(name))
+                name = ""
+            if char in '()+-*/^':
+                tokens.append(char)
+            elif char != ' ':
+                return None
+    if number:
+        tokens.append(float(number) if '.' in number else int(number))
+    if name:
+        tokens.append(Variable(name))
+    return tokens
+
+
+def bench_tokenizer(terms=100_000, short=20_000, repeats=5):
+    """scan() vs the old tokenizer: one long machine-generated expression and
+    many short hand-typed ones."""
+    rng = random.Random(3)
+    parts = []
+    for _ in range(terms):
+        parts.append(rng.choice([repr(rng.uniform(1, 1e6)), str(rng.randint(1, 10**12)),
+                                 f"rate_{rng.randint(0, 99)}", f"({rng.uniform(0.001, 1)!r} * total)"]))
+    long_expr = " + ".join(parts)
+    short_exprs = [random_expression(rng) for _ in range(short)]
+
+    def best(fn, exprs):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for expr in exprs:
+                fn(expr)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    assert scan(long_expr)[0] == legacy_tokenize(long_expr)
+    print(f"\n🔎 Tokenizer (best of {repeats})")
+    for label, exprs in ((f"1 expression, {len(long_expr) / 1e6:.1f} MB", [long_expr]),
+                         (f"{short} short expressions", short_exprs)):
+        legacy_time = best(legacy_tokenize, exprs)
+        scan_time = best(scan, exprs)
+        print(f"   {label}: character loop {legacy_time:.3f}s, "
+              f"scanner {scan_time:.3f}s ({legacy_time / scan_time:.1f}x)")
+
+
+def bench_optimizer(formulas=40, rows=20_000):
+    """A report's worth of formulas over the same inputs, with repeated
+    subterms and constant factors: plain postfix vs optimized closures vs
+    one batch program with shared subterms."""
+    rng = random.Random(11)
+    terms = ["price * qty", "price * qty * (1 - discount)", "(1 + rate) ^ years",
+             "fee * 1 + 0", "qty * (12 / 4)", "-(-tax)"]
+    exprs = []
+    for _ in range(formulas):
+        picked = rng.sample(terms, 3)
+        exprs.append(f"({picked[0]}) {rng.choice('+-*')} ({picked[1]}) "
+                     f"{rng.choice('+-*')} ({picked[2]}) * (2 ^ 3 - 7)")
+    inputs = [{"price": rng.uniform(1, 100), "qty": rng.randint(1, 50), "discount": rng.random() / 2,
+               "rate": rng.random() / 10, "years": rng.randint(1, 10), "fee": rng.uniform(0, 5),
+               "tax": rng.uniform(0, 3)} for _ in range(rows)]
+    calc = make_calculator()
+    compiled = [calc.compile(expr) for expr in exprs]
+    batch = calc.compile_batch(exprs)
+
+    start = time.perf_counter()
+    plain = [[run_postfix(c.postfix, values) for c in compiled] for values in inputs]
+    plain_time = time.perf_counter() - start
+
+    for c in compiled:
+        c.function  # Build the closures up front so only evaluation is timed
+    start = time.perf_counter()
+    closures = [[c.function(values) for c in compiled] for values in inputs]
+    closure_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = [batch.evaluate(values) for values in inputs]
+    batch_time = time.perf_counter() - start
+
+    assert plain == closures == batched
+    written = sum(1 for c in compiled for token in c.postfix if token in ("+", "-", "*", "/", "^", "neg"))
+    optimized = sum(count_operations([c.tree]) for c in compiled)
+    print(f"\n🌳 Optimizer: {formulas} formulas x {rows} input rows")
+    print(f"   Operators per row      : {written} written, {optimized} after folding, "
+          f"{batch.operations} with shared subterms")
+    print(f"   run_postfix            : {plain_time:.2f}s")
+    print(f"   Optimized closures     : {closure_time:.2f}s  ({plain_time / closure_time:.1f}x faster)")
+    print(f"   Batch program (CSE)    : {batch_time:.2f}s  ({plain_time / batch_time:.1f}x faster)")
+
+
+def bench_budget():
+    """How fast pathological formulas are refused under the default budget.
+    Each runs twice: the first time includes parsing (all the step-limit
+    case spends), the second builds the optimized tree, so this also shows
+    constant folding cannot get around the limits."""
+    calc = make_calculator()
+    cases = ["9 ^ (9 ^ 9)", "(2 ^ 13000) * (2 ^ 13000)", "x ^ y | x=7, y=100000000",
+             " * ".join(["x"] * 5000) + " | x=12345678901234567890",
+             " * ".join(["2^2000"] * 3000),
+             " + ".join(["1"] * 2_000_000)]
+    print("\n⛔ Evaluation budget (default limits)")
+    print(f"   {'Formula':<28}  {'1st run':>10} {'2nd run':>10}")
+    for line in cases:
+        times = []
+        for _ in range(2):
+            start = time.perf_counter()
+            ok, message = calc.evaluate_line(line)
+            times.append(time.perf_counter() - start)
+            assert not ok
+        label = line if len(line) <= 28 else line[:25] + "..."
+        print(f"   {label:<28}: {times[0] * 1000:7.1f} ms {times[1] * 1000:7.1f} ms  {message}")
+
+
+def bench_batch(rows=1_000_000, sample=100_000):
+    """evaluate_batch over NumPy columns vs looping evaluate_postfix per row."""
+    if np is None:
+        print("\n📊 evaluate_batch: skipped (NumPy not installed)")
+        return
+    expr = "price * (1 + rate) ^ n - fee / qty"
+    rng = np.random.default_rng(7)
+    columns = {
+        "price": rng.uniform(1, 1000, rows),
+        "rate": rng.uniform(0, 0.1, rows),
+        "n": rng.integers(1, 30, rows).astype(float),
+        "fee": rng.uniform(0, 5, rows),
+        "qty": rng.integers(0, 10, rows).astype(float),  # Some rows divide by zero
+    }
+    calc = make_calculator()
+
+    start = time.perf_counter()
+    vectorized = calc.evaluate_batch(expr, columns)
+    batch_time = time.perf_counter() - start
+
+    postfix = calc.compile(expr).postfix
+    names = list(columns)
+    start = time.perf_counter()
+    looped = [calc.evaluate_postfix(postfix, {name: columns[name][i] for name in names})
+              for i in range(sample)]
+    loop_time = (time.perf_counter() - start) * rows / sample
+
+    expected = np.array([np.nan if r is None else r for r in looped])
+    assert np.allclose(vectorized[:sample], expected, equal_nan=True)
+    print(f"\n📊 evaluate_batch on {rows} rows: {expr}")
+    print(f"   NumPy batch            : {batch_time:.3f}s")
+    print(f"   evaluate_postfix loop  : {loop_time:.1f}s (extrapolated from {sample} rows)")
+    print(f"   Speedup                : {loop_time / batch_time:.0f}x")
+
+
+def bench_sheet(inputs=1_000, chains=1_000, depth=5):
+    """A named-expression model of thousands of formulas: one input change
+    re-evaluates only its downstream chain, not the whole sheet."""
+    calc = make_calculator()
+    sheet = calc.sheet
+    start = time.perf_counter()
+    for i in range(inputs):
+        sheet.define(f"in{i}", str(i))
+    for c in range(chains):
+        sheet.define(f"c{c}_0", f"in{c % inputs} * 2 + 1")
+        for d in range(1, depth):
+            sheet.define(f"c{c}_{d}", f"c{c}_{d - 1} * 3 - in{(c + d) % inputs}")
+    build_time = time.perf_counter() - start
+    size = len(sheet.formulas)
+
+    changes = 200
+    start = time.perf_counter()
+    for k in range(changes):
+        recomputed = sheet.define(f"in{k}", str(k + 1))
+    change_time = (time.perf_counter() - start) / changes
+
+    start = time.perf_counter()
+    for name in sheet.formulas:  # What a naive sheet does on every change
+        sheet._evaluate(name)
+    full_time = time.perf_counter() - start
+
+    print(f"\n📐 Named expressions: {size} formulas (built in {build_time:.2f}s)")
+    print(f"   One input change       : {change_time * 1000:.2f} ms  ({len(recomputed)} re-evaluated)")
+    print(f"   Full recompute         : {full_time * 1000:.1f} ms  ({size} re-evaluated)")
+
+
+def bench_history(entries=200_000, capacity=1000):
+    """HistoryStore memory stays flat as entries spill; lookups stay cheap."""
+    def entry(i):
+        return {"infix": f"{i} * (x + {i % 97})", "postfix": f"{i} x {i % 97} + *", "result": i}
+
+    # Case-insensitive search must also find non-ASCII text once it spills
+    store = HistoryStore(1)
+    for infix in ("café * 2", "CAFÉ + 1", "Straße - 1", "cafe / 2"):
+        store.append({"infix": infix, "postfix": "", "result": 0})
+    assert store.spilled == 3
+    assert [n for n, _ in store.search("CAFÉ")] == [n for n, _ in store.search("café")] == [0, 1]
+    assert [n for n, _ in store.search("STRASSE")] == [2]
+    store.close()
+
+    print(f"\n📜 History: {entries} entries, {capacity} kept in memory")
+    for count in (entries // 10, entries):
+        tracemalloc.start()
+        store = HistoryStore(capacity)
+        for i in range(count):
+            store.append(entry(i))
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"   After {count:>7} appends : {current / 1024:.0f} KiB held")
+    store.close()
+
+    store = HistoryStore(capacity)
+    start = time.perf_counter()
+    for i in range(entries):
+        store.append(entry(i))
+    append = (time.perf_counter() - start) / entries
+    print(f"   Append (with spilling) : {append * 1e6:.1f} µs")
+
+    rng = random.Random(3)
+    picks = [rng.randrange(store.spilled) for _ in range(10_000)]
+    start = time.perf_counter()
+    for i in picks:
+        store[i]
+    lookup = (time.perf_counter() - start) / len(picks)
+    start = time.perf_counter()
+    store.page(entries // 20 // 2, 20)
+    page = time.perf_counter() - start
+    start = time.perf_counter()
+    found = store.search("* (x + 96)", limit=None)
+    search = time.perf_counter() - start
+    print(f"   Random access (disk)   : {lookup * 1e6:.1f} µs")
+    print(f"   Page of 20 (middle)    : {page * 1000:.2f} ms")
+    print(f"   Full search            : {search:.2f}s ({len(found)} matches)")
+    store.close()
+
+
+def bench_metrics(formulas=2_000, evaluations=200_000):
+    """Cached evaluate_line with instrumentation off (the default) and on."""
+    rng = random.Random(42)
+    pool = [random_expression(rng, terms=4) + " | x=1" for _ in range(formulas)]
+    workload = [rng.choice(pool) for _ in range(evaluations)]
+    calc = make_calculator(history_limit=0)
+    for line in pool:
+        calc.evaluate_line(line)
+
+    print(f"\n📈 Instrumentation overhead: {evaluations} cached evaluate_line calls")
+    for label in ("off", "on", "off"):
+        if label == "on":
+            METRICS.enable(INSTRUMENTED)
+        start = time.perf_counter()
+        for line in workload:
+            calc.evaluate_line(line)
+        elapsed = time.perf_counter() - start
+        METRICS.disable()
+        print(f"   Metrics {label:<4}: {elapsed / evaluations * 1e6:.2f} µs per line")
+
+
+if __name__ == "__main__":
+    bench_tokenizer()
+    bench_cache()
+    bench_optimizer()
+    bench_budget()
+    bench_batch()
+    bench_sheet()
+    bench_history()
+    bench_metrics()
@@ -1,12 +1,884 @@
 # expression_calculator.py
 # Stack-Based Expression Calculator (Infix to Postfix + Evaluation)
 
+import argparse
+import json
+import math
+import os
+import re
+import struct
+import sys
+import tempfile
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+try:
+    import numpy as np
+except ImportError:  # Only evaluate_batch needs NumPy
+    np = None
+
+
+class Variable(str):
+    """A named operand token, e.g. `price` in `price * (1 + rate) ^ n`."""
+
+
+OPERANDS = (int, float, Variable)
+
+# The scanner splits on operator characters in one C-level pass, so each
+# operand arrives as a whole slice instead of being built char by char.
+SPLIT_OPERATORS = re.compile(r"([-+*/^()])").split
+BINARY_OPERATORS = frozenset('+-*/^')
+# Only used to explain an operand that failed to parse
+OPERAND_PARTS = re.compile(
+    r"(?P<number>[0-9.][\w.]*(?:(?<=[eE])[-+][\w.]*)?)|(?P<name>[^\W\d]\w*)|(?P<other>\S)")
+
+
+class ExpressionError(ValueError):
+    """Malformed expression text; `position` is the 0-based offset of the problem."""
+    def __init__(self, message, position):
+        super().__init__(message)
+        self.message = message
+        self.position = position
+
+    def __str__(self):
+        return f"{self.message} at column {self.position + 1}"
+
+    def pointer(self, expr):
+        """The expression with a caret under the offending character."""
+        return f"{expr}\n{' ' * self.position}^"
+
+
+def _operand_error(operand, position):
+    """Explain why `operand`, the text between two operators, is not one token."""
+    parts = OPERAND_PARTS.finditer(operand)
+    first = next(parts)
+    if first.lastgroup == "other":
+        return ExpressionError(f"unexpected character {first.group()!r}", position)
+    second = next(parts, None)
+    if first.lastgroup == "number" and (second is None or second.lastgroup != "other"):
+        try:
+            _parse_literal(first.group())
+        except ValueError:
+            return ExpressionError(f"malformed number {first.group()!r}", position)
+    if second is None:
+        return ExpressionError(f"unexpected character {operand[0]!r}", position)
+    if second.lastgroup == "other":
+        return ExpressionError(f"unexpected character {second.group()!r}", position + second.start())
+    return ExpressionError(f"missing operator before {second.group()!r}", position + second.start())
+
+
+def _parse_literal(text):
+    """int for plain digits, float for anything with '.' or an exponent."""
+    if not text.isascii() or '_' in text:
+        raise ValueError(text)  # int()/float() would accept these
+    return int(text) if text.isdigit() else float(text)
+
+
+def scan(expr):
+    """Split `expr` into tokens; returns (tokens, positions).
+
+    Numbers become int (or float with a '.' or exponent, e.g. 1.5e-3),
+    names become Variable and operators stay strings. A '-' where an
+    operand is expected is unary minus and becomes the prefix operator
+    'neg'. The scanner tracks whether it expects an operand or an operator
+    and checks parentheses, so any syntax error is raised here as an
+    ExpressionError with the exact column.
+    """
+    tokens = []
+    positions = []
+    opened = []  # Positions of unclosed '('
+    literals = {}  # Operand text -> token, for repeated names and constants
+    append = tokens.append
+    mark = positions.append
+    expect_operand = True
+    pos = 0
+    carry = ""
+    pieces = SPLIT_OPERATORS(expr)
+    pieces.append(None)
+    pairs = iter(pieces)
+    # pieces alternate: operand text (possibly blank), operator, ..., None
+    for text, op in zip(pairs, pairs):
+        if carry:  # Rejoin an exponent split at its sign: "1e" "-" "5"
+            text = carry + text
+            pos -= len(carry)
+            carry = ""
+        if text:
+            operand = text.strip()
+            if operand:
+                start = pos + text.index(operand[0])
+                if not expect_operand:
+                    raise ExpressionError(f"missing operator before {operand!r}", start)
+                token = literals.get(operand)
+                if token is None:
+                    if operand.isidentifier():
+                        token = Variable(operand)
+                    else:
+                        try:
+                            token = _parse_literal(operand)
+                        except ValueError:
+                            if (op in ('+', '-') and operand[-1] in 'eE'
+                                    and operand[0] in '0123456789.'):
+                                carry = text + op
+                                pos += len(carry)
+                                continue
+                            raise _operand_error(operand, start) from None
+                    literals[operand] = token
+                append(token)
+                mark(start)
+                expect_operand = False
+            pos += len(text)
+
+        if expect_operand:
+            if op == '-':
+                op = 'neg'
+            elif op == '(':
+                opened.append(pos)
+            elif op is None:
+                raise ExpressionError("expected a number or variable", pos)
+            else:
+                raise ExpressionError(f"expected a number or variable before {op!r}", pos)
+        elif op in BINARY_OPERATORS:
+            expect_operand = True
+        elif op == ')':
+            if not opened:
+                raise ExpressionError("unmatched ')'", pos)
+            opened.pop()
+        elif op is None:
+            break
+        else:
+            raise ExpressionError("missing operator before '('", pos)
+        append(op)
+        mark(pos)
+        pos += 1
+    if opened:
+        raise ExpressionError("unclosed '('", opened[-1])
+    return tokens, positions
+
+
+class BudgetExceeded(ArithmeticError):
+    """An evaluation ran past one of its EvaluationBudget limits."""
+
+
+class EvaluationBudget:
+    """Limits for a single evaluation: integer result size in bits, operator
+    steps and wall-clock seconds. None switches a limit off.
+
+    The bit limit applies to every integer an evaluation produces, not
+    just the final result. Big-int `*` and `^` are estimated from their
+    operands and refused before any work is done, so `9 ^ (9 ^ 9)` fails
+    in microseconds instead of filling memory. Floats cannot grow; they
+    overflow to inf or fail on their own.
+    """
+    # Ints this small cost about as much as floats to add or multiply
+    UNMETERED_BITS = 1024
+
+    def __init__(self, max_bits=14_000, max_steps=1_000_000, timeout=5.0):
+        # 14,000 bits is about 4,200 digits, just under what str() will print
+        self.max_bits = max_bits
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self.deadline = None
+
+    def start(self, steps=0):
+        """Begin an evaluation of `steps` operators: check them and start the clock."""
+        self.check_steps(steps)
+        self.deadline = None if self.timeout is None else time.monotonic() + self.timeout
+
+    def fits(self, bound, variables, names):
+        """True if a program with growth_bound `bound` keeps every int under
+        UNMETERED_BITS for these variable values. Each operator is then
+        cheap, so neither the size nor the time limit can be reached and the
+        program can run without metering."""
+        if self.max_bits is None and self.timeout is None:
+            return True
+        if bound is None:
+            return False
+        widest = 0
+        for name in names:
+            value = variables.get(name) if variables else None
+            if type(value) is int:
+                widest = max(widest, value.bit_length())
+        return bound[0] * widest + bound[1] <= self.UNMETERED_BITS
+
+    def check_steps(self, steps):
+        if self.max_steps is not None and steps > self.max_steps:
+            raise BudgetExceeded(f"more than {self.max_steps:,} steps")
+
+    def check_time(self):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise BudgetExceeded(f"took longer than {self.timeout}s")
+
+    def check_result(self, value):
+        if (self.max_bits is not None and type(value) is int
+                and value.bit_length() > self.max_bits):
+            raise BudgetExceeded(f"result has {value.bit_length():,} bits "
+                                 f"(limit {self.max_bits:,})")
+        return value
+
+    def check_product(self, a, b):
+        """Refuse a * b up front if both are ints and the product would be too large."""
+        if (self.max_bits is not None and type(a) is int and type(b) is int
+                and a.bit_length() + b.bit_length() - 1 > self.max_bits):
+            raise BudgetExceeded(f"product would have at least "
+                                 f"{a.bit_length() + b.bit_length() - 1:,} bits "
+                                 f"(limit {self.max_bits:,})")
+
+    def power(self, a, b):
+        """a ** b, refused up front if an integer result would be too large."""
+        if (self.max_bits is not None and type(a) is int and type(b) is int
+                and b > 0 and not -1 <= a <= 1):
+            # |a| has at least bit_length - 1 bits of magnitude, so this is a lower bound
+            at_least = (a.bit_length() - 1) * b
+            if at_least > self.max_bits:
+                raise BudgetExceeded(f"power result would have at least {at_least:,} bits "
+                                     f"(limit {self.max_bits:,})")
+        self.check_time()
+        return self.check_result(a ** b)
+
+
+def run_postfix(postfix, variables=None, budget=None):
+    """Evaluate a postfix token list with an explicit stack.
+
+    With an EvaluationBudget every operator is metered: big-int `*` and `^`
+    are checked before they run, other integer results right after, and
+    BudgetExceeded is raised as soon as any limit is crossed.
+    """
+    if not postfix:
+        return None
+    limit = None
+    if budget is not None:
+        budget.start()
+        limit = budget.max_bits
+
+    stack = []
+    steps = 0
+    for token in postfix:
+        if isinstance(token, Variable):
+            if not variables or token not in variables:
+                return None  # Unbound variable
+            stack.append(variables[token])
+        elif isinstance(token, (int, float)):
+            stack.append(token)
+        elif token == 'neg':
+            if not stack:
+                return None  # Invalid expression
+            stack[-1] = -stack[-1]
+        elif token in '+-*/^':
+            if len(stack) < 2:
+                return None  # Invalid expression
+            b = stack.pop()
+            a = stack.pop()
+            if budget is not None:
+                steps += 1
+                if not steps & 1023:
+                    budget.check_steps(steps)
+                    budget.check_time()
+            try:
+                if token == '+':
+                    result = a + b
+                elif token == '-':
+                    result = a - b
+                elif token == '*':
+                    if (limit is not None and type(a) is int and type(b) is int
+                            and a.bit_length() + b.bit_length() - 1 > limit):
+                        budget.check_product(a, b)
+                    result = a * b
+                elif token == '/':
+                    if b == 0:
+                        return None  # NumPy scalars give inf instead of raising
+                    result = a / b
+                elif token == '^':
+                    result = a ** b if budget is None else budget.power(a, b)
+                    if type(result) is complex:
+                        return None  # (-8) ^ (1/3) has no real result
+            except (ZeroDivisionError, OverflowError):
+                # x / 0, 0 ^ -1, or a big int that does not fit in a float
+                # (2 ^ 2000 / 3, 2 ^ 2000 * 1.5); BudgetExceeded passes through
+                return None
+            if limit is not None and type(result) is int and result.bit_length() > limit:
+                budget.check_result(result)
+            stack.append(result)
+        else:
+            return None  # Invalid token
+    if len(stack) != 1:
+        return None
+    if budget is not None:
+        budget.check_steps(steps)
+        budget.check_result(stack[0])
+    return stack[0]
+
+
+# -----------------------------
+# 🌳 Expression Trees
+# -----------------------------
+
+# Folding 2 ^ 10000000 (or a product of thousands of big powers) at compile
+# time would stall before evaluation even starts, so integer results that
+# could exceed this many bits stay unfolded and are left to the budgeted
+# run time.
+FOLD_MAX_BITS = 4096
+# Generated code spills a subterm into a temporary at this nesting depth;
+# CPython's parser rejects very deeply nested parentheses.
+MAX_NESTING = 50
+
+
+def _fold(op, a, b=None):
+    """Compute an all-constant node the way run_postfix would; None if it
+    fails or should wait until run time."""
+    if type(a) is int and type(b) is int:
+        # Bound the result's size before computing it
+        bits_a, bits_b = abs(a).bit_length(), abs(b).bit_length()
+        if op in '+-':
+            bits = max(bits_a, bits_b) + 1
+        elif op == '*':
+            bits = bits_a + bits_b
+        elif op == '^':
+            bits = b * bits_a if b > 0 else 0
+        else:
+            bits = 0
+        if bits > FOLD_MAX_BITS:
+            return None
+    try:
+        if op == 'neg':
+            result = -a
+        elif op == '+':
+            result = a + b
+        elif op == '-':
+            result = a - b
+        elif op == '*':
+            result = a * b
+        elif op == '/':
+            result = a / b
+        else:
+            result = a ** b
+    except ArithmeticError:
+        return None
+    # (-8) ^ (1/3) is complex, which no evaluator accepts as a token
+    return result if type(result) in (int, float) else None
+
+
+def _leaf(token, nodes):
+    """The shared copy of a constant or variable. Floats are keyed by repr so
+    1 and 1.0 (and 0.0 and -0.0) stay distinct."""
+    key = (float, repr(token)) if type(token) is float else (type(token), token)
+    return nodes.setdefault(key, token)
+
+
+def _node(op, a, b, nodes):
+    """Build one node from already-optimized children.
+
+    Constant subterms are folded, identities that give the same value and
+    type for any operand are dropped (x*1, 1*x, x+0, 0+x, x-0, x^1 with an
+    int constant, and --x), and an identical node built earlier is reused.
+    Reuse is what lets build_program compute a repeated subterm once.
+    """
+    if op == 'neg':
+        if isinstance(a, (int, float)):
+            folded = _fold(op, a)
+            if folded is not None:
+                return _leaf(folded, nodes)
+        elif type(a) is tuple and a[0] == 'neg':
+            return a[1]
+        key = (op, id(a))
+        node = (op, a)
+    else:
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            folded = _fold(op, a, b)
+            if folded is not None:
+                return _leaf(folded, nodes)
+        if type(b) is int and ((b == 1 and op in '*^') or (b == 0 and op in '+-')):
+            return a
+        if type(a) is int and ((a == 1 and op == '*') or (a == 0 and op == '+')):
+            return b
+        key = (op, id(a), id(b))
+        node = (op, a, b)
+    # Children are shared copies, so their ids identify them structurally
+    return nodes.setdefault(key, node)
+
+
+def build_tree(postfix, nodes=None):
+    """Turn postfix into an optimized expression tree; None if malformed.
+
+    Nodes are tuples, ('+', left, right) or ('neg', operand), and leaves are
+    numbers or Variables. Pass the same `nodes` dict for several postfix
+    lists and identical subterms across all of them become one object.
+    """
+    if not postfix:
+        return None
+    if nodes is None:
+        nodes = {}
+    stack = []
+    for token in postfix:
+        if isinstance(token, OPERANDS):
+            stack.append(_leaf(token, nodes))
+        elif token == 'neg':
+            if not stack:
+                return None
+            stack.append(_node(token, stack.pop(), None, nodes))
+        elif token in BINARY_OPERATORS:
+            if len(stack) < 2:
+                return None
+            b = stack.pop()
+            a = stack.pop()
+            stack.append(_node(token, a, b, nodes))
+        else:
+            return None
+    return stack[0] if len(stack) == 1 else None
+
+
+def tree_to_postfix(root):
+    """Flatten a tree back to postfix; shared subterms are written out in full."""
+    postfix = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if type(node) is tuple:
+            postfix.append(node[0])
+            stack.extend(node[1:])
+        else:
+            postfix.append(node)
+    postfix.reverse()  # Root-right-left order reversed is left-right-root
+    return postfix
+
+
+def _unique_nodes(roots):
+    """Operator nodes reachable from `roots`, children before parents, each
+    once; also returns how many places refer to each node id."""
+    order = []
+    uses = {}
+    stack = [(root, False) for root in reversed(roots)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            order.append(node)
+            continue
+        uses[id(node)] = uses.get(id(node), 0) + 1
+        if type(node) is tuple and uses[id(node)] == 1:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node[1:]))
+    return order, uses
+
+
+def count_operations(roots):
+    """Operators evaluated by a program for `roots`, counting shared ones once."""
+    return len(_unique_nodes(roots)[0])
+
+
+def growth_bound(roots):
+    """Static bound on integer sizes in a program: returns (g, c) such that
+    no intermediate int exceeds g * M + c bits when no int input exceeds M
+    bits, or None if an exponent depends on a variable and no static bound
+    exists. Lets an EvaluationBudget clear a program before running it
+    instead of metering every operator.
+    """
+    order, _ = _unique_nodes(roots)
+    bounds = {}
+
+    def bound(node):
+        if type(node) is tuple:
+            return bounds[id(node)]
+        if isinstance(node, Variable):
+            return 1, 0
+        return 0, node.bit_length() if type(node) is int else 0
+
+    peak = (0, 0)
+    for node in order:
+        op = node[0]
+        ga, ca = bound(node[1])
+        if op == 'neg':
+            g, c = ga, ca
+        else:
+            gb, cb = bound(node[2])
+            if op in '+-':
+                g, c = max(ga, gb), max(ca, cb) + 1
+            elif op == '*':
+                g, c = ga + gb, ca + cb
+            elif op == '/':
+                g, c = 0, 0  # Always a float
+            elif type(node[2]) is int:
+                g, c = (ga * node[2], ca * node[2]) if node[2] > 0 else (0, 1)
+            elif type(node[2]) is float:
+                g, c = 0, 0
+            else:
+                return None
+        bounds[id(node)] = (g, c)
+        peak = (max(peak[0], g), max(peak[1], c))
+    for root in roots:
+        g, c = bound(root)
+        peak = (max(peak[0], g), max(peak[1], c))
+    return peak
+
+
+def build_program(roots):
+    """Straight-line code for a list of trees: returns (lines, results, constants).
+
+    Each subterm used more than once is assigned to a temporary `tN` the
+    first time and read back afterwards. `results` holds one Python
+    expression per root and `constants` the values that have no literal
+    form (inf, nan, very large ints).
+    """
+    order, uses = _unique_nodes(roots)
+    lines = []
+    constants = {}
+    text = {}  # node id -> (code, nesting depth)
+
+    def operand(node):
+        code = text.get(id(node))
+        if code is not None:
+            return code
+        if isinstance(node, Variable):
+            code = (f"v[{str(node)!r}]", 0)
+            if uses[id(node)] > 1:
+                lines.append(f"t{len(lines)} = {code[0]}")
+                code = (f"t{len(lines) - 1}", 0)
+        elif (type(node) is int and node.bit_length() <= 64) or (
+                type(node) is float and math.isfinite(node)):
+            literal = repr(node)
+            code = (f"({literal})" if literal.startswith("-") else literal, 0)
+        else:
+            code = (f"k{len(constants)}", 0)
+            constants[code[0]] = node
+        text[id(node)] = code
+        return code
+
+    for node in order:
+        if node[0] == 'neg':
+            inner, depth = operand(node[1])
+            code = f"(-{inner})"
+        else:
+            (a, depth_a), (b, depth_b) = operand(node[1]), operand(node[2])
+            code = f"({a} {'**' if node[0] == '^' else node[0]} {b})"
+            depth = max(depth_a, depth_b)
+        if uses[id(node)] > 1 or depth + 1 >= MAX_NESTING:
+            lines.append(f"t{len(lines)} = {code}")
+            text[id(node)] = (f"t{len(lines) - 1}", 0)
+        else:
+            text[id(node)] = (code, depth + 1)
+    return lines, [operand(root)[0] for root in roots], constants
+
+
+def build_function(roots, batch=False):
+    """Compile build_program's output into `program(v)`, where `v` maps
+    variable names to values. Returns the single result, or a tuple with
+    one result per root when `batch` is set."""
+    lines, results, constants = build_program(roots)
+    result = f"({', '.join(results)},)" if batch else results[0]
+    body = "".join(f"    {line}\n" for line in lines)
+    namespace = dict(constants)
+    exec(compile(f"def program(v):\n{body}    return {result}\n", "<expression>", "exec"),
+         namespace)
+    return namespace["program"]
+
+
+class CompiledExpression:
+    """Parsed form of one expression: tokens, postfix, optimized tree and
+    generated closure.
+
+    If the text did not scan, `tokens` and `postfix` are None and `error`
+    holds the ExpressionError, so failures are cached just like successes.
+    Optimizing and generating the closure costs about ten stack
+    evaluations, so the first run walks the postfix and the rest is only
+    built once the expression is evaluated again.
+    """
+    __slots__ = ("tokens", "postfix", "error", "variables", "steps", "runs",
+                 "_tree", "_function", "_bound")
+
+    def __init__(self, tokens, postfix, error=None):
+        self.tokens = tokens
+        self.postfix = postfix
+        self.error = error
+        # Binary operators as written; what an EvaluationBudget counts
+        self.steps = sum(1 for token in postfix or () if token in BINARY_OPERATORS)
+        self.runs = 0
+        self._tree = False  # Not built yet; None means malformed
+        self._function = False
+        self._bound = False
+        # Variable names in order of first appearance
+        self.variables = tuple(dict.fromkeys(
+            token for token in tokens or () if isinstance(token, Variable)))
+
+    @property
+    def tree(self):
+        """Optimized expression tree, built on first access."""
+        if self._tree is False:
+            self._tree = build_tree(self.postfix)
+        return self._tree
+
+    @property
+    def optimized(self):
+        """Postfix after constant folding and simplification."""
+        return tree_to_postfix(self.tree) if self.tree is not None else None
+
+    @property
+    def function(self):
+        """The generated closure, built on first access."""
+        if self._function is False:
+            self._function = build_function([self.tree]) if self.tree is not None else None
+        return self._function
+
+    def evaluate(self, variables=None, budget=None):
+        """Run the expression; None on division by zero, bad syntax or a
+        missing variable value. Raises BudgetExceeded if `budget` runs out.
+
+        Under a budget the closure only runs when growth_bound proves every
+        integer stays within it for these inputs; anything else goes through
+        the metered run_postfix.
+        """
+        if budget is not None:
+            budget.check_steps(self.steps)
+        self.runs += 1
+        if self.runs == 1:
+            return run_postfix(self.postfix, variables, budget)
+        if self.function is None:
+            return None
+        if budget is not None:
+            if self._bound is False:
+                self._bound = growth_bound([self.tree])
+            if not budget.fits(self._bound, variables, self.variables):
+                return run_postfix(self.postfix, variables, budget)
+        try:
+            result = self.function(variables or {})
+        except (ZeroDivisionError, OverflowError, KeyError):
+            return None
+        # A complex value stays complex through every operator, so checking
+        # the final result catches (-8) ^ (1/3) anywhere in the expression
+        return None if type(result) is complex else result
+
+
+class CompiledBatch:
+    """Several expressions compiled into one program that computes every
+    subterm they share only once."""
+    def __init__(self, compiled):
+        self.compiled = compiled
+        nodes = {}  # Shared, so equal subterms across expressions merge
+        self.trees = [build_tree(c.postfix, nodes) for c in compiled]
+        roots = [tree for tree in self.trees if tree is not None]
+        self.function = build_function(roots, batch=True) if roots else None
+        self.operations = count_operations(roots)
+        self.bound = growth_bound(roots)
+        self.variables = tuple(dict.fromkeys(
+            name for c in compiled for name in c.variables))
+
+    def evaluate(self, variables=None, budget=None):
+        """One result per expression, None where that expression fails or
+        runs past `budget`."""
+        if self.function is not None and (
+                budget is None or budget.fits(self.bound, variables, self.variables)):
+            try:
+                values = iter(self.function(variables or {}))
+            except (ZeroDivisionError, OverflowError, KeyError):
+                pass  # Something failed; find out which expression it was
+            else:
+                return [value if type(value) is not complex else None
+                        for value in (next(values) if tree is not None else None
+                                      for tree in self.trees)]
+        return [self._evaluate_one(c, variables, budget) for c in self.compiled]
+
+    @staticmethod
+    def _evaluate_one(compiled, variables, budget):
+        try:
+            return compiled.evaluate(variables, budget)
+        except BudgetExceeded:
+            return None
+
+
+class ExpressionCache:
+    """Bounded LRU cache from normalized expression text to CompiledExpression."""
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize(expr):
+        """Collapse whitespace runs; a single space still separates numbers."""
+        return " ".join(expr.split())
+
+    def get(self, key):
+        compiled = self.entries.get(key)
+        if compiled is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return compiled
+
+    def put(self, key, compiled):
+        self.entries[key] = compiled
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class HistoryStore:
+    """Calculation history with constant memory, however long the session.
+
+    The newest `capacity` entries live in a ring buffer. Older ones spill,
+    one JSON line each, to an append-only file; a second file holds each
+    spilled line's byte offset as a fixed 8-byte record, so entry i is two
+    seeks away and nothing about the spilled part is kept in memory.
+    Entries are numbered from 0 in the order they were added. With `path`
+    the files are `path` and `path + ".idx"` and history outlives the
+    session; without it they are anonymous temp files. A capacity of 0
+    keeps no history at all.
+    """
+    OFFSET = struct.Struct("<Q")
+
+    def __init__(self, capacity=1000, path=None):
+        self.capacity = capacity
+        self.recent = deque(maxlen=capacity or None)
+        self.spilled = 0  # Entries on disk
+        self.path = path
+        self.data = self.index = None
+        if not capacity:
+            return
+        if path is None:
+            self.data, self.index = tempfile.TemporaryFile(), tempfile.TemporaryFile()
+        else:
+            self.data, self.index = open(path, "a+b"), open(path + ".idx", "a+b")
+            self._recover()
+
+    def _recover(self):
+        """Count the entries a previous session spilled, cutting off
+        whatever a crash left half-written."""
+        self.index.seek(0, os.SEEK_END)
+        self.spilled = self.index.tell() // self.OFFSET.size
+        end = 0
+        while self.spilled:
+            line = self._line(self.spilled - 1)
+            if line.endswith(b"\n"):
+                end = self._offset(self.spilled - 1) + len(line)
+                break
+            self.spilled -= 1
+        self.index.truncate(self.spilled * self.OFFSET.size)
+        self.data.truncate(end)
+
+    def __len__(self):
+        return self.spilled + len(self.recent)
+
+    def append(self, entry):
+        if not self.capacity:
+            return
+        if len(self.recent) == self.capacity:
+            self._spill(self.recent[0])  # The deque drops it on append
+        self.recent.append(entry)
+
+    def _spill(self, entry):
+        self.data.seek(0, os.SEEK_END)
+        offset = self.data.tell()
+        # repr() anything JSON cannot hold, so one odd entry never blocks
+        # the ring buffer from spilling. Text is stored as UTF-8, not \u
+        # escapes, so search can casefold it.
+        self.data.write(json.dumps(entry, ensure_ascii=False, default=repr).encode() + b"\n")
+        self.index.write(self.OFFSET.pack(offset))
+        self.spilled += 1
+
+    def _offset(self, i):
+        self.index.flush()
+        self.index.seek(i * self.OFFSET.size)
+        return self.OFFSET.unpack(self.index.read(self.OFFSET.size))[0]
+
+    def _line(self, i):
+        self.data.flush()
+        self.data.seek(self._offset(i))
+        return self.data.readline()
+
+    def __getitem__(self, i):
+        """Entry number `i` (negative counts from the newest)."""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("history index out of range")
+        if i >= self.spilled:
+            return self.recent[i - self.spilled]
+        return json.loads(self._line(i))
+
+    def entries(self, start=0):
+        """Yield (number, entry) from `start` on, streaming the spilled part."""
+        if start < self.spilled:
+            self.data.flush()
+            self.data.seek(self._offset(start))
+            for number in range(start, self.spilled):
+                yield number, json.loads(self.data.readline())
+            start = self.spilled
+        for number in range(start, len(self)):
+            yield number, self.recent[number - self.spilled]
+
+    def __iter__(self):
+        return (entry for _, entry in self.entries())
+
+    def page(self, number, page_size=20):
+        """Page `number` (from 0) as a list of (number, entry)."""
+        start = number * page_size
+        return list(islice(self.entries(start), page_size)) if start < len(self) else []
+
+    def search(self, text, limit=None):
+        """(number, entry) for entries whose infix contains `text`, oldest
+        first. Spilled lines are only parsed if their casefolded text matches."""
+        needle = text.casefold()
+        raw = json.dumps(text, ensure_ascii=False)[1:-1].casefold()  # As inside a JSON line
+        found = []
+        if self.spilled:
+            self.data.flush()
+            self.data.seek(self._offset(0))
+            for number in range(self.spilled):
+                line = self.data.readline()
+                # Files from older versions may hold \u escapes; parse those
+                if raw in line.decode().casefold() or b"\\u" in line:
+                    entry = json.loads(line)
+                    if needle in entry["infix"].casefold():
+                        found.append((number, entry))
+                        if len(found) == limit:
+                            return found
+        for number, entry in enumerate(self.recent, self.spilled):
+            if needle in entry["infix"].casefold():
+                found.append((number, entry))
+                if len(found) == limit:
+                    break
+        return found
+
+    def close(self):
+        """Close the files; a history kept in `path` first spills the ring
+        buffer too, so the next session sees every entry."""
+        if self.data is not None:
+            if self.path is not None:
+                while self.recent:
+                    self._spill(self.recent.popleft())
+            self.data.close()
+            self.index.close()
+
+
 class ExpressionCalculator:
-    def __init__(self):
+    def __init__(self, cache_size=4096, history_limit=1000, quiet=False, budget=None,
+                 history_path=None):
         # Operator precedence (higher = executed first)
-        self.precedence = {'+': 1, '-': 1, '*': 2, '/': 2, '^': 3}
-        self.history = []  # Store calculation history
-        print("🧮 Welcome to the Expression Calculator!")
+        # 'neg' is unary minus: binds tighter than * but looser than ^, so -2^2 = -4
+        self.precedence = {'+': 1, '-': 1, '*': 2, '/': 2, 'neg': 3, '^': 4}
+        # Calculation history: history_limit newest entries in memory, the
+        # rest spilled to disk (to history_path if given); 0 turns it off
+        self.history = HistoryStore(history_limit, history_path)
+        self.cache = ExpressionCache(cache_size)  # Parsed expressions, LRU
+        # Limits on result size, steps and time for every evaluation
+        self.budget = budget if budget is not None else EvaluationBudget()
+        self.sheet = FormulaSheet(self)  # Named expressions (name = expr)
+        if not quiet:
+            print("🧮 Welcome to the Expression Calculator!")
 
     def display_info(self):
         print("\n" + "━" * 50)
@@ -17,27 +889,18 @@ class ExpressionCalculator:
         print("   / : Division")
         print("   ^ : Exponentiation (power)")
         print("   ( ) : Parentheses for grouping")
-        print("👉 Example: 3 + 4 * (2 - 1)")
+        print("   -x  : Unary minus, e.g. -2 ^ 2 = -4 and 2 * -3")
+        print("   1e3 : Scientific notation (1.5e-3, 2E10)")
+        print("   abc : Variables (you'll be asked for their values)")
+        print("👉 Example: 3 + 4 * (2 - 1)  or  price * (1 + rate) ^ n")
         print("━" * 50)
 
     def tokenize(self, expr):
-        """Convert string expression to list of tokens (numbers and operators)."""
-        tokens = []
-        number = ""
-        for char in expr:
-            if char.isdigit() or char == '.':
-                number += char
-            else:
-                if number:
-                    tokens.append(float(number) if '.' in number else int(number))
-                    number = ""
-                if char in '()+-*/^':
-                    tokens.append(char)
-                elif char != ' ':
-                    return None  # Invalid character
-        if number:
-            tokens.append(float(number) if '.' in number else int(number))
-        return tokens
+        """Convert string expression to list of tokens; None if it is malformed."""
+        try:
+            return scan(expr)[0]
+        except ExpressionError:
+            return None
 
     def infix_to_postfix(self, tokens):
         """Convert infix tokens to postfix using stack."""
@@ -49,7 +912,7 @@ class ExpressionCalculator:
 
         for token in tokens:
             # Operand: add to output
-            if isinstance(token, (int, float)):
+            if isinstance(token, OPERANDS):
                 output.append(token)
 
             # Left parenthesis: push to stack
@@ -64,6 +927,10 @@ class ExpressionCalculator:
                     return None  # Mismatched parentheses
                 stack.pop()  # Remove '('
 
+            # Unary minus: a prefix operator has nothing to its left to pop
+            elif token == 'neg':
+                stack.append(token)
+
             # Operator
             elif token in self.precedence:
                 # Pop higher or equal precedence operators
@@ -84,39 +951,146 @@ class ExpressionCalculator:
 
         return output
 
-    def evaluate_postfix(self, postfix):
+    @staticmethod
+    def parse_number(text):
+        """Parse an int or float literal; None if `text` is not a number."""
+        for kind in (int, float):
+            try:
+                return kind(text)
+            except ValueError:
+                pass
+        return None
+
+    def compile(self, expr):
+        """Tokenize and convert `expr` once; repeats are served from the cache."""
+        key = self.cache.normalize(expr)
+        compiled = self.cache.get(key)
+        if compiled is None:
+            try:
+                tokens = scan(key)[0]
+            except ExpressionError as error:
+                compiled = CompiledExpression(None, None, error)
+            else:
+                compiled = CompiledExpression(tokens, self.infix_to_postfix(tokens))
+            self.cache.put(key, compiled)
+        return compiled
+
+    @staticmethod
+    def locate_error(expr):
+        """Rescan `expr` as typed so an error's column matches the caller's text
+        (the cache key has its whitespace collapsed)."""
+        try:
+            scan(expr)
+        except ExpressionError as error:
+            return error
+        return None
+
+    def compile_batch(self, exprs):
+        """Compile several expressions into one CompiledBatch so subterms they
+        share are computed once per evaluation."""
+        return CompiledBatch([self.compile(expr) for expr in exprs])
+
+    def evaluate_postfix(self, postfix, variables=None):
         """Evaluate postfix expression using stack."""
-        if not postfix:
-            return None
+        return run_postfix(postfix, variables, self.budget)
+
+    def evaluate_line(self, line):
+        """Evaluate one line of batch input; returns (ok, result or error).
+
+        A line is an expression, optionally followed by `|` and variable
+        values: `price * (1 + rate) ^ n | price=100, rate=0.05, n=2`.
+        """
+        expr, _, bindings = line.partition("|")
+        expr = expr.strip()
+        if not expr:
+            return False, "empty expression"
+
+        variables = {}
+        for binding in filter(None, (b.strip() for b in bindings.split(","))):
+            name, _, text = binding.partition("=")
+            value = self.parse_number(text.strip())
+            if value is None:
+                return False, f"bad value for '{name.strip()}': {text.strip()!r}"
+            variables[name.strip()] = value
+
+        compiled = self.compile(expr)
+        if compiled.error is not None:
+            return False, str(self.locate_error(expr))
+        if compiled.postfix is None:
+            return False, "invalid syntax"
+        missing = [name for name in compiled.variables if name not in variables]
+        if missing:
+            return False, f"no value for {', '.join(missing)}"
+        try:
+            result = compiled.evaluate(variables, self.budget)
+        except BudgetExceeded as error:
+            return False, f"stopped: {error}"
+        except ArithmeticError as error:  # Keep one bad line from ending a batch
+            return False, f"evaluation failed: {error}"
+        if result is None:
+            return False, "evaluation failed (division by zero, overflow, no real result or invalid format)"
+        self.history.append({
+            "infix": expr,
+            "postfix": ' '.join(str(t) for t in compiled.postfix),
+            "result": result,
+        })
+        return True, str(result)
+
+    def evaluate_batch(self, expr, columns):
+        """Evaluate `expr` for every row of `columns` with vectorized NumPy.
+
+        `columns` maps each variable name to a sequence (all the same
+        length) or a scalar. The expression is compiled once (and cached);
+        each operator then runs once over whole columns. Returns a float64
+        array with NaN wherever a row divides by zero or is otherwise
+        undefined. Raises ValueError for an invalid expression and KeyError
+        for a variable with no column.
+        """
+        if np is None:
+            raise ImportError("evaluate_batch requires NumPy: pip install numpy")
+        compiled = self.compile(expr)
+        postfix = compiled.optimized
+        if postfix is None:
+            raise ValueError(f"Invalid expression: {expr!r}")
+        missing = [name for name in compiled.variables if name not in columns]
+        if missing:
+            raise KeyError(f"No column for variable(s): {', '.join(missing)}")
+
+        arrays = {name: np.asarray(columns[name], dtype=np.float64)
+                  for name in compiled.variables}
+        # Rows come from every column supplied, not just the ones `expr`
+        # uses, so a constant expression still gives one value per row
+        rows = max((np.shape(column)[0] for column in columns.values() if np.ndim(column)),
+                   default=1)
 
         stack = []
-        for token in postfix:
-            if isinstance(token, (int, float)):
-                stack.append(token)
-            elif token in '+-*/^':
-                if len(stack) < 2:
-                    return None  # Invalid expression
-                b = stack.pop()
-                a = stack.pop()
-                if token == '+':
-                    result = a + b
-                elif token == '-':
-                    result = a - b
-                elif token == '*':
-                    result = a * b
-                elif token == '/':
-                    if b == 0:
-                        return None  # Division by zero
-                    result = a / b
-                elif token == '^':
-                    result = a ** b
-                stack.append(result)
-            else:
-                return None  # Invalid token
-        return stack[0] if len(stack) == 1 else None
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            for token in postfix:
+                if isinstance(token, Variable):
+                    stack.append(arrays[token])
+                elif isinstance(token, (int, float)):
+                    stack.append(np.float64(token))
+                elif token == 'neg':
+                    stack.append(np.negative(stack.pop()))
+                else:
+                    b = stack.pop()
+                    a = stack.pop()
+                    if token == '+':
+                        result = np.add(a, b)
+                    elif token == '-':
+                        result = np.subtract(a, b)
+                    elif token == '*':
+                        result = np.multiply(a, b)
+                    elif token == '/':
+                        result = np.where(b == 0, np.nan, np.divide(a, b))
+                    else:  # '^'; 0 to a negative power is a division by zero
+                        result = np.where((a == 0) & (b < 0), np.nan, np.power(a, b))
+                    stack.append(result)
+        return np.array(np.broadcast_to(stack[0], (rows,)), dtype=np.float64)
 
-    def show_conversion_steps(self, tokens):
-        """Show step-by-step infix to postfix conversion."""
+    def show_conversion_steps(self, tokens, optimize=True):
+        """Show step-by-step infix to postfix conversion, then (if `optimize`)
+        the optimized form that is actually evaluated."""
         if not tokens:
             print("❌ No tokens to process.")
             return
@@ -128,7 +1102,7 @@ class ExpressionCalculator:
         for token in tokens:
             print(f"  Token: {token}", end=" → ")
 
-            if isinstance(token, (int, float)):
+            if isinstance(token, OPERANDS):
                 output.append(token)
                 print(f"Output: {output}")
 
@@ -145,6 +1119,10 @@ class ExpressionCalculator:
                 stack.pop() if stack else None
                 print(f"Popped {temp} to output → Output: {output}")
 
+            elif token == 'neg':
+                stack.append(token)
+                print(f"Unary minus → Stack: {stack}")
+
             elif token in self.precedence:
                 popped = []
                 while (stack and stack[-1] != '(' and
@@ -162,8 +1140,24 @@ class ExpressionCalculator:
             op = stack.pop()
             output.append(op)
         print(f"✅ Final Postfix: {' '.join(str(t) for t in output)}")
+        if optimize:
+            self.show_optimized(output)
         return output
 
+    def show_optimized(self, postfix):
+        """Print the optimized postfix and the straight-line program it compiles to."""
+        tree = build_tree(postfix)
+        if tree is None:
+            return
+        operators = sum(1 for token in postfix if not isinstance(token, OPERANDS))
+        lines, results, _ = build_program([tree])
+        print(f"🌳 Optimized Postfix: {' '.join(str(t) for t in tree_to_postfix(tree))}")
+        print(f"   Operators: {operators} → {count_operations([tree])} "
+              "(constants folded, identities dropped, repeats computed once)")
+        for line in lines:
+            print(f"   {line}")
+        print(f"   result = {results[0]}")
+
     def add_expression(self):
         print("\n➕ Enter a mathematical expression")
         self.display_info()
@@ -172,17 +1166,32 @@ class ExpressionCalculator:
             print("⚠️  Expression cannot be empty.")
             return
 
-        tokens = self.tokenize(expr)
-        if tokens is None:
-            print("❌ Invalid expression. Use only numbers, + - * / ^ ( ) and spaces.")
+        compiled = self.compile(expr)
+        if compiled.error is not None:
+            error = self.locate_error(expr)
+            print(f"❌ Invalid expression: {error}")
+            print("   " + error.pointer(expr).replace("\n", "\n   "))
             return
 
-        postfix = self.infix_to_postfix(tokens)
+        postfix = compiled.postfix
         if postfix is None:
             print("❌ Invalid syntax (check parentheses or operators).")
             return
 
-        result = self.evaluate_postfix(postfix)
+        variables = {}
+        for name in compiled.variables:
+            text = input(f"   Value for {name}: ").strip()
+            value = self.parse_number(text)
+            if value is None:
+                print(f"❌ '{text}' is not a number.")
+                return
+            variables[name] = value
+
+        try:
+            result = compiled.evaluate(variables, self.budget)
+        except BudgetExceeded as error:
+            print(f"⛔ Evaluation stopped: {error}.")
+            return
         if result is None:
             print("❌ Evaluation failed (division by zero or invalid format).")
             return
@@ -195,6 +1204,8 @@ class ExpressionCalculator:
             "postfix": postfix_str,
             "result": result
         }
+        if variables:
+            entry["variables"] = variables
         self.history.append(entry)
         print(f"✅ Expression added. Result: {result}")
 
@@ -204,7 +1215,7 @@ class ExpressionCalculator:
             return
         latest = self.history[-1]
         print(f"\n🔍 Converting: {latest['infix']}")
-        tokens = self.tokenize(latest['infix'])
+        tokens = self.compile(latest['infix']).tokens
         self.show_conversion_steps(tokens)
 
     def evaluate_expression(self):
@@ -214,17 +1225,122 @@ class ExpressionCalculator:
         latest = self.history[-1]
         print(f"\n🧪 Evaluating: {latest['infix']} = {latest['result']}")
 
-    def view_history(self):
+    @staticmethod
+    def show_history_entry(number, entry):
+        print(f"{number + 1}. Infix: {entry['infix']}")
+        print(f"   → Postfix: {entry['postfix']}")
+        if entry.get("variables"):
+            values = ", ".join(f"{k}={v}" for k, v in entry["variables"].items())
+            print(f"   → Values: {values}")
+        print(f"   → Result: {entry['result']}")
+
+    def view_history(self, page_size=10):
         print("\n" + "━" * 70)
         print("📜 CALCULATION HISTORY")
         print("━" * 70)
-        if not self.history:
+        total = len(self.history)
+        if not total:
             print("📭 No calculations yet.")
-        for i, entry in enumerate(self.history, 1):
-            print(f"{i}. Infix: {entry['infix']}")
-            print(f"   → Postfix: {entry['postfix']}")
-            print(f"   → Result: {entry['result']}")
-        print("━" * 70)
+            print("━" * 70)
+            return
+        pages = (total + page_size - 1) // page_size
+        page = pages - 1  # Start with the newest calculations
+        while True:
+            for number, entry in self.history.page(page, page_size):
+                self.show_history_entry(number, entry)
+            print("━" * 70)
+            print(f"📄 Page {page + 1}/{pages} ({total} calculations)")
+            command = self.history_command()
+            while command and command not in ("n", "p"):
+                if command.startswith("#") and command[1:].isdigit():
+                    number = int(command[1:]) - 1
+                    if 0 <= number < total:
+                        self.show_history_entry(number, self.history[number])
+                    else:
+                        print(f"❌ No calculation #{number + 1}.")
+                elif command.startswith("/") and command[1:]:
+                    matches = self.history.search(command[1:], limit=page_size)
+                    if not matches:
+                        print("🔍 No matching calculations.")
+                    for number, entry in matches:
+                        self.show_history_entry(number, entry)
+                else:
+                    print("❌ Unknown command.")
+                command = self.history_command()
+            if not command:
+                return
+            page = min(pages - 1, page + 1) if command == "n" else max(0, page - 1)
+            print("━" * 70)
+
+    @staticmethod
+    def history_command():
+        return input("👉 [n]ext, [p]rev, #number, /text to search, Enter to go back: ").strip()
+
+    def view_cache_stats(self):
+        stats = self.cache.stats()
+        print("\n" + "━" * 50)
+        print("⚡ COMPILED-EXPRESSION CACHE")
+        print("━" * 50)
+        print(f"   Entries   : {stats['size']} / {stats['capacity']}")
+        print(f"   Hits      : {stats['hits']}")
+        print(f"   Misses    : {stats['misses']}")
+        print(f"   Evictions : {stats['evictions']}")
+        print(f"   Hit rate  : {stats['hit_rate']:.1%}")
+        print("━" * 50)
+
+    def structure_sizes(self):
+        """Element counts of the main structures, for the instrumentation dump."""
+        return {"cached_expressions": len(self.cache.entries), "history_entries": len(self.history),
+                "history_in_memory": len(self.history.recent), "history_on_disk": self.history.spilled,
+                "named_expressions": len(self.sheet.formulas)}
+
+    def view_metrics(self):
+        print("\n" + "━" * 50)
+        print("📈 INSTRUMENTATION")
+        print("━" * 50)
+        print(METRICS.format())
+        print("━" * 50)
+
+    def named_expressions(self):
+        print("\n📐 Named expressions: 'name = expr' defines or changes a name,")
+        print("   'del name' removes it, 'list' shows them all, empty line goes back.")
+        print("👉 Example: price = 20, qty = 3, total = price * qty, then price = 25")
+        sheet = self.sheet
+        while True:
+            line = input("📐 > ").strip()
+            if not line:
+                return
+            if line == "list":
+                if not sheet.formulas:
+                    print("📭 No named expressions yet.")
+                for name in sheet.formulas:
+                    print(f"   {sheet.describe(name)}")
+                continue
+            if line.startswith("del "):
+                name = line[4:].strip()
+                if name not in sheet.formulas:
+                    print(f"❌ '{name}' is not defined.")
+                    continue
+                changed = sheet.remove(name)
+                print(f"🗑️  Removed {name}.")
+            else:
+                name, equals, expr = line.partition("=")
+                name = name.strip()
+                if not equals:
+                    if name in sheet.formulas:
+                        print(f"   {sheet.describe(name)}")
+                    else:
+                        print("❌ Use 'name = expression'.")
+                    continue
+                try:
+                    changed = sheet.define(name, expr.strip())
+                except ValueError as error:  # Bad name, syntax error or cycle
+                    print(f"❌ {error}")
+                    continue
+                print(f"✅ {sheet.describe(name)}")
+                changed = changed[1:]
+            for other in changed:
+                print(f"   ↻ {sheet.describe(other)}")
 
     def menu(self):
         while True:
@@ -235,9 +1351,12 @@ class ExpressionCalculator:
             print("2. 🔍 Convert to Postfix (Step-by-step)")
             print("3. 🧪 Evaluate Expression")
             print("4. 📜 View History")
-            print("5. 🚪 Exit")
+            print("5. ⚡ Cache Stats")
+            print("6. 📐 Named Expressions")
+            print("7. 📈 Instrumentation")
+            print("8. 🚪 Exit")
 
-            choice = input("\n👉 Choose an option (1-5): ").strip()
+            choice = input("\n👉 Choose an option (1-8): ").strip()
 
             if choice == '1':
                 self.add_expression()
@@ -248,10 +1367,362 @@ class ExpressionCalculator:
             elif choice == '4':
                 self.view_history()
             elif choice == '5':
+                self.view_cache_stats()
+            elif choice == '6':
+                self.named_expressions()
+            elif choice == '7':
+                self.view_metrics()
+            elif choice == '8':
+                self.history.close()
                 print("👋 Thank you for using the Expression Calculator!")
                 break
             else:
-                print("❌ Invalid choice. Please select 1–5.")
+                print("❌ Invalid choice. Please select 1–8.")
+
+
+# -----------------------------
+# 📐 Named Expressions
+# -----------------------------
+
+class CycleError(ValueError):
+    """A definition would make a name depend on itself."""
+
+
+class FormulaSheet:
+    """Named expressions that can refer to each other, e.g. `total = a + b`.
+
+    The sheet keeps a dependency graph in both directions. Redefining a
+    name re-evaluates only the formulas downstream of it, in topological
+    order, so a change costs time proportional to what it affects rather
+    than to the size of the sheet. A name with no value (undefined, or its
+    formula failed) leaves everything that reads it without a value too,
+    with the reason in `errors`.
+    """
+    def __init__(self, calculator):
+        self.calculator = calculator
+        self.formulas = {}     # name -> CompiledExpression
+        self.sources = {}      # name -> expression text as entered
+        self.depends_on = {}   # name -> names its formula reads
+        self.dependents = {}   # name -> names whose formulas read it (may be undefined)
+        self.values = {}       # name -> current value
+        self.errors = {}       # name -> why it has no value
+
+    def define(self, name, expr):
+        """Set `name` to `expr` and update everything downstream.
+
+        Returns the names that were re-evaluated, in evaluation order.
+        Raises ExpressionError for bad syntax and CycleError (leaving the
+        sheet unchanged) if `expr` depends on `name` itself.
+        """
+        if not name.isidentifier():
+            raise ValueError(f"'{name}' is not a valid name")
+        compiled = self.calculator.compile(expr)
+        if compiled.error is not None:
+            raise self.calculator.locate_error(expr)
+        depends_on = compiled.variables
+        cycle = self._find_cycle(name, depends_on)
+        if cycle:
+            raise CycleError("cycle: " + " → ".join(cycle))
+
+        for old in self.depends_on.get(name, ()):
+            self._unlink(old, name)
+        for dep in depends_on:
+            self.dependents.setdefault(dep, set()).add(name)
+        self.formulas[name] = compiled
+        self.sources[name] = expr
+        self.depends_on[name] = depends_on
+        return self._recompute(name)
+
+    def remove(self, name):
+        """Delete a name's formula; whatever reads it loses its value.
+        Returns the names re-evaluated."""
+        if name not in self.formulas:
+            return []
+        for dep in self.depends_on.pop(name):
+            self._unlink(dep, name)
+        del self.formulas[name], self.sources[name]
+        self.values.pop(name, None)
+        self.errors.pop(name, None)
+        changed = self._recompute(name)
+        return changed[1:]  # The removed name itself is not re-evaluated
+
+    def _unlink(self, dep, name):
+        readers = self.dependents.get(dep)
+        if readers is not None:
+            readers.discard(name)
+            if not readers:
+                del self.dependents[dep]
+
+    def _downstream(self, name):
+        """Every name that depends on `name`, directly or not, in BFS order,
+        plus the edge each was reached by (for reporting cycles)."""
+        reached = {name: None}
+        queue = deque([name])
+        while queue:
+            current = queue.popleft()
+            for reader in self.dependents.get(current, ()):
+                if reader not in reached:
+                    reached[reader] = current
+                    queue.append(reader)
+        return reached
+
+    def _find_cycle(self, name, depends_on):
+        """The path name → ... → name that defining `name` over `depends_on`
+        would close, or None."""
+        if name in depends_on:
+            return [name, name]
+        reached = self._downstream(name)
+        for dep in depends_on:
+            if dep in reached:
+                path = [dep]
+                while path[-1] != name:
+                    path.append(reached[path[-1]])
+                return [name] + path[::-1][1:] + [name]
+        return None
+
+    def _recompute(self, name):
+        """Re-evaluate `name` and everything downstream, each after all of
+        its inputs (Kahn's algorithm restricted to the affected names)."""
+        affected = self._downstream(name)
+        waiting = {}
+        for node in affected:
+            waiting[node] = sum(1 for dep in self.depends_on.get(node, ()) if dep in affected)
+        ready = deque(node for node, count in waiting.items() if count == 0)
+        order = []
+        while ready:
+            node = ready.popleft()
+            order.append(node)
+            if node in self.formulas:
+                self._evaluate(node)
+            for reader in self.dependents.get(node, ()):
+                waiting[reader] -= 1
+                if waiting[reader] == 0:
+                    ready.append(reader)
+        return order
+
+    def _evaluate(self, name):
+        missing = [dep for dep in self.depends_on[name] if dep not in self.values]
+        result = None
+        if missing:
+            error = f"no value for {', '.join(missing)}"
+        else:
+            try:
+                result = self.formulas[name].evaluate(self.values, self.calculator.budget)
+                error = "evaluation failed (division by zero, overflow, no real result or invalid format)"
+            except BudgetExceeded as exceeded:
+                error = f"stopped: {exceeded}"
+        if result is None:
+            self.values.pop(name, None)
+            self.errors[name] = error
+        else:
+            self.values[name] = result
+            self.errors.pop(name, None)
+
+    def describe(self, name):
+        """`name = expr → value` (or the error) for display."""
+        value = self.values.get(name)
+        outcome = value if value is not None else f"⚠️  {self.errors.get(name)}"
+        return f"{name} = {self.sources[name]} → {outcome}"
+
+
+# -----------------------------
+# 🤖 Headless Commands
+# -----------------------------
+
+class CalculatorService:
+    """The menu's operations as request dicts in, response dicts out, with
+    no prompts or printing, for scripts and load tests.
+
+    Every request has an "op"; every response has "ok" and "message",
+    plus op-specific fields. A malformed request gets an "error" instead of
+    raising, so one bad line cannot stop a replay.
+    """
+    HISTORY_PAGE = 20
+
+    def __init__(self, calculator):
+        self.calculator = calculator
+
+    def handle(self, request):
+        if not isinstance(request, dict):
+            return {"ok": False, "message": "❌ Malformed request.",
+                    "error": "a request must be a JSON object"}
+        try:
+            return self._dispatch(request)
+        except Exception as error:
+            return {"ok": False, "message": "❌ Request failed.",
+                    "error": f"{type(error).__name__}: {error}"}
+
+    @staticmethod
+    def _field(request, name, kind, default, minimum=None):
+        """request[name] (`default` if absent), checked to be a `kind`."""
+        value = request.get(name, default)
+        if kind is int:
+            if type(value) is not int or (minimum is not None and value < minimum):
+                bound = "" if minimum is None else f" ≥ {minimum}"
+                raise ValueError(f"{name} must be a whole number{bound}, not {value!r}")
+        elif not isinstance(value, kind):
+            raise ValueError(f"{name} must be a {kind.__name__}, not {value!r}")
+        return value
+
+    def _dispatch(self, request):
+        op = request.get("op")
+        calc = self.calculator
+        field = self._field
+        if op == "eval":
+            ok, message = calc.evaluate_line(field(request, "expr", str, ""))
+            return {"ok": ok, "message": message}
+        if op == "convert":
+            expr = field(request, "expr", str, "").strip()
+            compiled = calc.compile(expr)
+            if compiled.error is not None:
+                return {"ok": False, "message": f"❌ {calc.locate_error(expr)}"}
+            if compiled.postfix is None:
+                return {"ok": False, "message": "❌ Invalid expression."}
+            postfix = " ".join(str(t) for t in compiled.postfix)
+            return {"ok": True, "message": postfix, "postfix": postfix}
+        if op == "define":
+            name = field(request, "name", str, "").strip()
+            expr = field(request, "expr", str, "")
+            try:
+                changed = calc.sheet.define(name, expr)
+            except ValueError as error:  # Bad name, syntax error or cycle
+                return {"ok": False, "message": f"❌ {error}"}
+            return {"ok": True, "message": f"✅ {calc.sheet.describe(name)}",
+                    "recomputed": changed, "value": calc.sheet.values.get(name)}
+        if op in ("get", "remove"):
+            name = field(request, "name", str, "").strip()
+            if name not in calc.sheet.formulas:
+                return {"ok": False, "message": f"❌ '{name}' is not defined."}
+            if op == "remove":
+                return {"ok": True, "message": f"🗑️  Removed {name}.",
+                        "recomputed": calc.sheet.remove(name)}
+            return {"ok": True, "message": calc.sheet.describe(name),
+                    "value": calc.sheet.values.get(name)}
+        if op == "history":
+            text = field(request, "search", str, "")
+            limit = field(request, "limit", int, self.HISTORY_PAGE, minimum=1)
+            if text:
+                rows = calc.history.search(text, limit)
+            else:
+                rows = calc.history.page(field(request, "page", int, 0, minimum=0), limit)
+            return {"ok": True, "message": f"📜 {len(rows)} of {len(calc.history)} calculations.",
+                    "entries": [dict(entry, number=number + 1) for number, entry in rows]}
+        if op == "cache_stats":
+            return {"ok": True, "message": "⚡ Cache stats.", "stats": calc.cache.stats()}
+        return {"ok": False, "message": f"❌ Unknown operation: {op!r}"}
+
+
+# -----------------------------
+# 📦 Batch Evaluation
+# -----------------------------
+
+_worker_calc = None
+
+
+def allow_printing(budget):
+    """str() refuses ints over 4,300 digits; lift that if the budget allows
+    results bigger than that."""
+    if (budget.max_bits is None or budget.max_bits > 14_000) and hasattr(
+            sys, "set_int_max_str_digits"):
+        sys.set_int_max_str_digits(0)
+
+
+def _init_worker(cache_size, budget):
+    """Give each pool process its own quiet, history-free calculator."""
+    global _worker_calc
+    allow_printing(budget)
+    _worker_calc = ExpressionCalculator(cache_size=cache_size, history_limit=0,
+                                        quiet=True, budget=budget)
+
+
+def _evaluate_chunk(lines):
+    return [_worker_calc.evaluate_line(line) for line in lines]
+
+
+def _chunks(lines, size):
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_batch(lines, out, errors=sys.stderr, workers=None, chunk_size=1000, cache_size=4096,
+              budget=None):
+    """Evaluate a stream of expression lines, writing one result per line.
+
+    Lines are grouped into chunks and fanned out over a process pool. At
+    most two chunks per worker are in flight and results are written in
+    input order as soon as the oldest chunk completes, so memory stays
+    bounded no matter how long the input is. A line that fails produces
+    `error: ...` in the output and a numbered message on `errors`; the run
+    carries on. Each line is evaluated under `budget` (an EvaluationBudget;
+    the default limits if None), so one pathological formula fails on its
+    own instead of stalling a worker. Returns (evaluated, failed).
+    """
+    workers = workers or os.cpu_count() or 1
+    budget = budget if budget is not None else EvaluationBudget()
+    evaluated = failed = 0
+    line_no = 0
+
+    def emit(results):
+        nonlocal evaluated, failed, line_no
+        for ok, text in results:
+            line_no += 1
+            evaluated += 1
+            if ok:
+                out.write(f"{text}\n")
+            else:
+                failed += 1
+                out.write(f"error: {text}\n")
+                errors.write(f"⚠️  line {line_no}: {text}\n")
+
+    chunks = _chunks((line.rstrip("\n") for line in lines), chunk_size)
+    if workers == 1:
+        _init_worker(cache_size, budget)
+        for chunk in chunks:
+            emit(_evaluate_chunk(chunk))
+        return evaluated, failed
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(cache_size, budget)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_evaluate_chunk, chunk))
+            if len(pending) >= workers * 2:
+                emit(pending.popleft().result())
+        while pending:
+            emit(pending.popleft().result())
+    return evaluated, failed
+
+
+# -----------------------------
+# 📈 Instrumentation
+# -----------------------------
+
+# metrics.py is shared by the three tools and lives in the repository root
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+import metrics  # noqa: E402
+
+METRICS = metrics.Metrics("calculator")
+
+# Stages timed when instrumentation is on
+INSTRUMENTED = [
+    (sys.modules[__name__], "scan"),
+    (sys.modules[__name__], "run_postfix"),
+    *((ExpressionCalculator, name) for name in ("infix_to_postfix", "compile", "evaluate_postfix",
+                                                "evaluate_line", "evaluate_batch")),
+    (CompiledExpression, "evaluate"),
+    (HistoryStore, "append"),
+    (HistoryStore, "__getitem__"),
+    (HistoryStore, "search"),
+    (FormulaSheet, "define"),
+    (FormulaSheet, "remove"),
+    (CalculatorService, "handle"),
+]
 
 
 # -----------------------------
@@ -259,5 +1730,39 @@ class ExpressionCalculator:
 # -----------------------------
 
 if __name__ == "__main__":
-    calc = ExpressionCalculator()
-    calc.menu()
+    parser = argparse.ArgumentParser(description="Stack-Based Expression Calculator")
+    parser.add_argument("--max-bits", type=int, default=14_000,
+                        help="largest integer result, in bits (0 = no limit)")
+    parser.add_argument("--max-steps", type=int, default=1_000_000,
+                        help="most operators per evaluation (0 = no limit)")
+    parser.add_argument("--timeout", type=float, default=5.0,
+                        help="seconds per evaluation (0 = no limit)")
+    parser.add_argument("--history", metavar="FILE",
+                        help="keep calculation history in FILE across sessions")
+    metrics.add_arguments(parser, menu_option=7)
+    commands = parser.add_subparsers(dest="command")
+    eval_cmd = commands.add_parser(
+        "eval", help="evaluate expressions from a file or stdin, one per line")
+    eval_cmd.add_argument("path", nargs="?", default="-", help="input file (default: stdin)")
+    eval_cmd.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    eval_cmd.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    eval_cmd.add_argument("--chunk-size", type=int, default=1000, help="lines per work unit")
+    args = parser.parse_args()
+    budget = EvaluationBudget(max_bits=args.max_bits or None, max_steps=args.max_steps or None,
+                              timeout=args.timeout or None)
+    metrics.start(METRICS, args, INSTRUMENTED)
+
+    if args.command == "eval":
+        source = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+        out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        with source, out:
+            evaluated, failed = run_batch(source, out, workers=args.workers,
+                                          chunk_size=args.chunk_size, budget=budget)
+        print(f"✅ Evaluated {evaluated} lines, {failed} errors.", file=sys.stderr)
+    else:
+        allow_printing(budget)
+        calc = ExpressionCalculator(budget=budget, history_path=args.history)
+        METRICS.sizes = calc.structure_sizes
+        calc.menu()
+
+    metrics.finish(METRICS, args)
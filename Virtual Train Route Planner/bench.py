@@ -0,0 +1,324 @@
+# bench.py
+# Micro-benchmarks for the Virtual Train Route Planner. Run: python bench.py
+
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from scr import INSTRUMENTED, METRICS, RailNetwork, TrainRoute, TrainSimulation
+
+
+def make_route(circular=False):
+    with contextlib.redirect_stdout(io.StringIO()):
+        route = TrainRoute()
+        if circular:
+            route.toggle_circular()
+    return route
+
+
+def legacy_find_station(route, name):
+    """The original O(n) walk, kept for comparison."""
+    curr = route.head
+    while curr:
+        if curr.name.lower() == name.lower():
+            return curr
+        curr = curr.next
+        if curr == route.head:
+            break
+    return None
+
+
+def bench_build(stations=50_000, legacy=5_000):
+    """Building a route: indexed add_station / add_stations vs the old scan."""
+    names = [f"Station {i}" for i in range(stations)]
+    print(f"\n🏗️  Building routes of {stations} stations")
+
+    for circular in (False, True):
+        route = make_route(circular)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name in names:
+                route.add_station(name)
+        one_by_one = time.perf_counter() - start
+
+        bulk = make_route(circular)
+        start = time.perf_counter()
+        bulk.add_stations(names)
+        batched = time.perf_counter() - start
+        assert len(route) == len(bulk) == stations
+        mode = "circular" if circular else "linear"
+        print(f"   add_station ({mode:<8}) : {one_by_one:.2f}s")
+        print(f"   add_stations ({mode:<8}): {batched:.2f}s")
+
+    # The old duplicate check walked the whole list on every insert
+    route = make_route()
+    start = time.perf_counter()
+    for name in names[:legacy]:
+        legacy_find_station(route, name)
+        route._append(name)
+    elapsed = time.perf_counter() - start
+    projected = elapsed * (stations / legacy) ** 2
+    print(f"   Old O(n) scan           : {elapsed:.2f}s for {legacy} "
+          f"(~{projected:.0f}s projected for {stations})")
+
+
+def bench_seek(stations=200_000, queries=20_000):
+    """Positional operations on the treap vs walking the linked list."""
+    route = make_route()
+    route.add_stations(f"Station {i}" for i in range(stations))
+    rng = random.Random(5)
+    positions = [rng.randrange(stations) for _ in range(queries)]
+    print(f"\n🎯 Positional access on {stations} stations")
+
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        start = time.perf_counter()
+        for k in positions:
+            route.seek(k)
+        seek = (time.perf_counter() - start) / queries
+
+        start = time.perf_counter()
+        for k in positions[:1000]:
+            route.index_of(f"Station {k}")
+        index_of = (time.perf_counter() - start) / 1000
+
+        start = time.perf_counter()
+        for k in positions[:1000]:
+            route.insert_at(k, f"New {k}")
+        insert = (time.perf_counter() - start) / 1000
+
+        start = time.perf_counter()
+        for k in positions[:1000]:
+            route.remove_station(f"New {k}")
+        remove = (time.perf_counter() - start) / 1000
+
+    start = time.perf_counter()
+    for k in positions[:50]:
+        node = route.head
+        for _ in range(k):
+            node = node.next
+    walk = (time.perf_counter() - start) / 50
+
+    print(f"   seek(k)                 : {seek * 1e6:.1f} µs")
+    print(f"   index_of(name)          : {index_of * 1e6:.1f} µs")
+    print(f"   insert_at(k)            : {insert * 1e6:.1f} µs")
+    print(f"   remove_station(name)    : {remove * 1e6:.1f} µs")
+    print(f"   Walk k nodes (old way)  : {walk * 1e6:.0f} µs")
+
+
+def grid_network(side, timed=False, seed=9):
+    """side x side stations; one line along every row and every column."""
+    rng = random.Random(seed)
+    network = RailNetwork()
+    for axis in ("Row", "Col"):
+        for i in range(side):
+            route = TrainRoute(quiet=True)
+            cells = ((i, j) if axis == "Row" else (j, i) for j in range(side))
+            route.add_stations(f"{r}-{c}" for r, c in cells)
+            minutes = [rng.randint(1, 6) for _ in range(side - 1)] if timed else None
+            network.add_route(route, f"{axis} {i}", minutes)
+    return network
+
+
+def dijkstra_stops(network, origin, target):
+    """Plain BFS on stations: what a query costs without landmarks."""
+    seen = {origin}
+    frontier = [origin]
+    while frontier and target not in seen:
+        following = []
+        for u in frontier:
+            for v in network.adjacent[u]:
+                if v not in seen:
+                    seen.add(v)
+                    following.append(v)
+        frontier = following
+    return len(seen)
+
+
+def bench_network(side=320, queries=20):
+    """Journey queries on a ~100k-station grid network."""
+    rng = random.Random(11)
+    start = time.perf_counter()
+    network = grid_network(side, timed=True)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    network.precompute()
+    pre = time.perf_counter() - start
+    print(f"\n🕸️  Network: {len(network)} stations, {len(network.lines)} lines")
+    print(f"   Build / precompute      : {build:.1f}s / {pre:.1f}s")
+
+    pairs = [(f"{rng.randrange(side)}-{rng.randrange(side)}",
+              f"{rng.randrange(side)}-{rng.randrange(side)}") for _ in range(queries)]
+    for optimize in RailNetwork.OPTIMIZE:
+        start = time.perf_counter()
+        for origin, destination in pairs:
+            network.journey(origin, destination, optimize)
+        cold = (time.perf_counter() - start) / queries
+        start = time.perf_counter()
+        for origin, destination in pairs * 50:
+            network.journey(origin, destination, optimize)
+        hot = (time.perf_counter() - start) / (queries * 50)
+        print(f"   {optimize:<9} cold / cached : {cold * 1000:7.1f} ms / {hot * 1e6:.1f} µs")
+
+    start = time.perf_counter()
+    for origin, destination in pairs:
+        dijkstra_stops(network, network.ids[origin], network.ids[destination])
+    print(f"   BFS without landmarks   : {(time.perf_counter() - start) / queries * 1000:7.1f} ms")
+
+
+def make_simulation(routes=100, stations=50, trains=5_000, seed=13):
+    rng = random.Random(seed)
+    sim = TrainSimulation()
+    for r in range(routes):
+        route = TrainRoute(quiet=True)
+        route.add_stations(f"R{r} S{i}" for i in range(stations))
+        route.is_circular = r % 2 == 0
+        if route.is_circular:
+            route._make_circular()
+        rid = sim.add_route(route, [rng.uniform(1, 5) for _ in range(stations)], dwell=0.5)
+        sim.add_trains(rid, trains // routes)
+    return sim
+
+
+def bench_simulation(hours=24):
+    """5000 trains for a simulated day: event by event vs fast-forward."""
+    print(f"\n🚦 Simulation: 5000 trains on 100 routes, {hours} simulated hours")
+    sim = make_simulation()
+    start = time.perf_counter()
+    sim.run(60, fast_forward=False)
+    hour = time.perf_counter() - start
+    print(f"   Event by event          : {hour:.2f}s per simulated hour "
+          f"({sim.stats()['events_per_second']:,.0f} events/s)")
+
+    fast = make_simulation()
+    start = time.perf_counter()
+    arrivals = fast.run(hours * 60)
+    elapsed = time.perf_counter() - start
+    print(f"   Fast-forward {hours}h        : {elapsed * 1000:.0f} ms for {arrivals:,} arrivals")
+    start = time.perf_counter()
+    fast.run(60)
+    print(f"   Fast-forward 1 more hour: {(time.perf_counter() - start) * 1000:.0f} ms")
+    start = time.perf_counter()
+    busiest = fast.busiest(1)[0]
+    fast.last_arrival_at(busiest[0])
+    print(f"   Busiest + last arrival  : {(time.perf_counter() - start) * 1000:.1f} ms ({busiest[0]})")
+
+def bench_route_file(stations=1_000_000):
+    """Saving and lazily re-opening a million-station route."""
+    route = make_route()
+    start = time.perf_counter()
+    route.add_stations(f"Station {i}" for i in range(stations))
+    build = time.perf_counter() - start
+    path = os.path.join(tempfile.mkdtemp(), "route.bin")
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        start = time.perf_counter()
+        route.save(path)
+        save = time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded = TrainRoute.load(path)
+        load = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(1000):
+            loaded.move_next()
+        loaded.seek(stations // 2)
+        loaded.index_of(f"Station {stations - 7}")
+        use = time.perf_counter() - start
+    print(f"\n💾 Route file with {stations} stations ({os.path.getsize(path) / 2**20:.1f} MiB)")
+    print(f"   Build with add_stations : {build:.2f}s")
+    print(f"   save                    : {save:.2f}s")
+    print(f"   load                    : {load * 1000:.2f} ms")
+    print(f"   1000 moves, seek, find  : {use * 1000:.1f} ms "
+          f"({len(loaded.store.nodes)} stations read)")
+    os.remove(path)
+
+
+class CountingSink:
+    """A stdout stand-in that only counts what is written."""
+    def __init__(self):
+        self.chars = 0
+        self.writes = 0
+
+    def write(self, text):
+        self.chars += len(text)
+        self.writes += 1
+
+
+def legacy_view_route(route):
+    """The original view_route body: collect every name, join, print once."""
+    stations = []
+    curr = route.head
+    while True:
+        stations.append(curr.name)
+        curr = curr.next
+        if curr == route.head and route.is_circular or curr is None:
+            break
+    return " ➔ ".join(stations)
+
+
+def bench_view(stations=500_000):
+    """Streaming view_route memory, and windowed views on a long route."""
+    route = make_route()
+    route.add_stations(f"Station {i}" for i in range(stations))
+    print(f"\n🔭 Viewing a route of {stations} stations")
+
+    tracemalloc.start()
+    legacy_view_route(route)
+    _, legacy_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    sink = CountingSink()
+    tracemalloc.start()
+    start = time.perf_counter()
+    route.view_route(sink)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"   Old join-then-print     : {legacy_peak / 2**20:.1f} MiB peak")
+    print(f"   Streaming view_route    : {peak / 2**20:.2f} MiB peak, {sink.writes} writes, {elapsed:.2f}s")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        route.seek(stations // 2)
+    start = time.perf_counter()
+    for _ in range(1000):
+        route.view_window(10, CountingSink())
+    window = (time.perf_counter() - start) / 1000
+    start = time.perf_counter()
+    for k in range(0, stations, stations // 1000):
+        route.view_range(k, k + 20, CountingSink())
+    ranged = (time.perf_counter() - start) / 1000
+    print(f"   view_window(10)         : {window * 1e6:.0f} µs")
+    print(f"   view_range(k, k + 20)   : {ranged * 1e6:.0f} µs")
+
+
+def bench_metrics(stations=100_000, lookups=200_000):
+    """index_of by name with instrumentation off (the default) and on."""
+    route = make_route()
+    with contextlib.redirect_stdout(io.StringIO()):
+        route.add_stations(f"Station {i}" for i in range(stations))
+    names = [f"station {(i * 7919) % stations}" for i in range(lookups)]
+
+    print(f"\n📈 Instrumentation overhead: {lookups} index_of lookups")
+    for label in ("off", "on", "off"):
+        if label == "on":
+            METRICS.enable(INSTRUMENTED)
+        start = time.perf_counter()
+        for name in names:
+            route.index_of(name)
+        elapsed = time.perf_counter() - start
+        METRICS.disable()
+        print(f"   Metrics {label:<4}: {elapsed / lookups * 1e6:.2f} µs per lookup")
+
+
+if __name__ == "__main__":
+    bench_build()
+    bench_seek()
+    bench_network()
+    bench_simulation()
+    bench_route_file()
+    bench_view()
+    bench_metrics()
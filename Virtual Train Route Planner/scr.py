@@ -1,58 +1,534 @@
 # train_route_planner.py
 # Virtual Train Route Planner using Doubly and Circular Linked Lists
 
+import argparse
+import contextlib
+import heapq
+import io
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import islice
+
+
+WRITE_BATCH = 1000  # Stations per buffered write when streaming a route
+
+
 class StationNode:
-    """Node representing a train station."""
+    """Node representing a train station.
+
+    Besides its list links, every station is also a node of an implicit
+    treap (a randomly balanced tree ordered by route position) so that
+    positional lookups take O(log n) instead of a walk along the list.
+    """
     def __init__(self, name):
         self.name = name
         self.next = None
         self.prev = None
+        # Treap links; `count` is the size of the subtree rooted here
+        self.left = None
+        self.right = None
+        self.parent = None
+        self.count = 1
+        self.priority = random.random()
+
+
+# -----------------------------
+# 🌲 Order Statistics (implicit treap)
+# -----------------------------
+
+def _count(node):
+    return node.count if node else 0
+
+
+def _update(node):
+    """Recompute a node's subtree size and adopt its children."""
+    node.count = 1 + _count(node.left) + _count(node.right)
+    if node.left:
+        node.left.parent = node
+    if node.right:
+        node.right.parent = node
+    return node
+
+
+def _merge(a, b):
+    """Join two treaps, every position of `a` before every one of `b`."""
+    if not a or not b:
+        return a or b
+    if a.priority > b.priority:
+        a.right = _merge(a.right, b)
+        return _update(a)
+    b.left = _merge(a, b.left)
+    return _update(b)
+
+
+def _split(node, k):
+    """Split into (first k stations, the rest)."""
+    if not node:
+        return None, None
+    if _count(node.left) >= k:
+        left, node.left = _split(node.left, k)
+        return left, _update(node)
+    node.right, right = _split(node.right, k - _count(node.left) - 1)
+    return _update(node), right
+
+
+def _push_back(root, node):
+    """Append one station at the end; the iterative fast path of _merge."""
+    parent, child = None, root
+    while child and child.priority > node.priority:
+        child.count += 1
+        parent, child = child, child.right
+    node.left = child
+    _update(node)
+    if not parent:
+        return node
+    parent.right = node
+    node.parent = parent
+    return root
+
+
+def _build(nodes):
+    """Treap over `nodes` in order, in O(n) (Cartesian tree on priority)."""
+    stack = []
+    for node in nodes:
+        last = None
+        while stack and stack[-1].priority < node.priority:
+            last = _update(stack.pop())
+        node.left = last
+        if stack:
+            stack[-1].right = node
+        stack.append(node)
+    root = None
+    while stack:
+        root = _update(stack.pop())
+    return root
+
+
+def _position(node):
+    """0-based position of `node` on the route, by climbing to the root."""
+    i = _count(node.left)
+    while node.parent:
+        if node is node.parent.right:
+            i += _count(node.parent.left) + 1
+        node = node.parent
+    return i
+
+
+def _select(node, k):
+    """The station at 0-based position `k` in this treap."""
+    while node:
+        left = _count(node.left)
+        if k < left:
+            node = node.left
+        elif k == left:
+            return node
+        else:
+            k -= left + 1
+            node = node.right
+    return None
+
+
+# -----------------------------
+# 💾 Route Files (binary, memory-mapped)
+# -----------------------------
+
+class LazyStationNode(StationNode):
+    """A station read from a route file. Its neighbours are only read
+    (and created) the first time `next` or `prev` is followed."""
+    def __init__(self, name, store, pos):
+        super().__init__(name)
+        self.store = store
+        self.pos = pos  # Position in the file; valid until the route changes
+        self._next_ready = self._prev_ready = False
+
+    @property
+    def next(self):
+        if not self._next_ready:
+            self._next, self._next_ready = self.store.neighbour(self.pos + 1), True
+        return self._next
+
+    @next.setter
+    def next(self, node):
+        self._next, self._next_ready = node, True
+
+    @property
+    def prev(self):
+        if not self._prev_ready:
+            self._prev, self._prev_ready = self.store.neighbour(self.pos - 1), True
+        return self._prev
+
+    @prev.setter
+    def prev(self, node):
+        self._prev, self._prev_ready = node, True
+
+
+class RouteFile:
+    """The binary route format, read through mmap.
+
+    Layout: a fixed header; the station names back to back as UTF-8 (the
+    string table); count + 1 little-endian u64 offsets into it (station i
+    is bytes offsets[i]:offsets[i + 1]); and an open-addressing hash table
+    of u32 slots holding position + 1, keyed by crc32 of the case-folded
+    name, for lookups by name. Only the pages a lookup touches are read.
+    """
+    MAGIC = b"TRTE"
+    VERSION = 1
+    CIRCULAR = 1  # Header flag bit
+    # magic, version, flags, count, current, slots, offsets at, names at, table at
+    HEADER = struct.Struct("<4sHHIIIQQQ")
+    OFFSET = struct.Struct("<QQ")
+    SLOT = struct.Struct("<I")
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, flags, self.count, self.current, self.slots,
+         self.offsets_at, self.names_at, self.table_at) = self.HEADER.unpack_from(self.mm, 0)
+        if magic != self.MAGIC:
+            raise ValueError(f"{path} is not a route file")
+        if version != self.VERSION:
+            raise ValueError(f"Unsupported route file version: {version}")
+        self.circular = bool(flags & self.CIRCULAR)
+        self.nodes = {}  # Position -> node, for the stations created so far
+
+    def name(self, i):
+        start, end = self.OFFSET.unpack_from(self.mm, self.offsets_at + 8 * i)
+        return self.mm[self.names_at + start:self.names_at + end].decode()
+
+    def node(self, i):
+        node = self.nodes.get(i)
+        if node is None:
+            node = self.nodes[i] = LazyStationNode(self.name(i), self, i)
+        return node
+
+    def neighbour(self, i):
+        # Past either end is None; loop routes link head and tail explicitly
+        return self.node(i) if 0 <= i < self.count else None
+
+    def find(self, key):
+        """Position of the station whose case-folded name is `key`, or None."""
+        mask = self.slots - 1
+        slot = zlib.crc32(key.encode()) & mask
+        while True:
+            (entry,) = self.SLOT.unpack_from(self.mm, self.table_at + 4 * slot)
+            if not entry:
+                return None
+            if TrainRoute._key(self.name(entry - 1)) == key:
+                return entry - 1
+            slot = (slot + 1) & mask
+
+    @classmethod
+    def write(cls, path, names, circular=False, current=0):
+        """Write station `names` (in route order) to `path`, atomically."""
+        offsets = array("Q", [0])
+        hashes = array("I")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(bytes(cls.HEADER.size))
+            names_at = f.tell()
+            for name in names:
+                data = name.encode()
+                f.write(data)
+                offsets.append(offsets[-1] + len(data))
+                hashes.append(zlib.crc32(TrainRoute._key(name).encode()))
+            f.write(bytes(-f.tell() % 8))  # Align the offsets
+            slots = 1
+            while slots < 2 * len(hashes):
+                slots *= 2
+            table = array("I", bytes(4 * slots))
+            for i, h in enumerate(hashes):
+                slot = h & (slots - 1)
+                while table[slot]:
+                    slot = (slot + 1) & (slots - 1)
+                table[slot] = i + 1
+            if sys.byteorder != "little":
+                offsets.byteswap()
+                table.byteswap()
+            offsets_at = f.tell()
+            offsets.tofile(f)
+            table_at = f.tell()
+            table.tofile(f)
+            f.seek(0)
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, cls.CIRCULAR if circular else 0,
+                                    len(hashes), current, slots, offsets_at, names_at, table_at))
+        os.replace(tmp_path, path)
+        return len(hashes)
 
 
 class TrainRoute:
-    def __init__(self):
+    def __init__(self, quiet=False):
         self.head = None
         self.tail = None
         self.current = None
         self.is_circular = False
-        print("🚆 Welcome to the Virtual Train Route Planner!")
+        self.size = 0
+        # Case-folded station name -> StationNode, kept in step with the list
+        self.index = {}
+        self.root = None  # Treap over the same nodes, ordered by position
+        # Set while the route is a file opened with load() and not yet
+        # changed: stations come from it on demand, index and treap are unused
+        self.store = None
+        if not quiet:
+            print("🚆 Welcome to the Virtual Train Route Planner!")
+
+    def __len__(self):
+        return self.size
+
+    def iter_stations(self):
+        """Yield each StationNode once, head to tail (also on loop routes)."""
+        curr = self.head
+        for _ in range(self.size):
+            yield curr
+            curr = curr.next
+
+    @staticmethod
+    def _key(name):
+        return name.strip().casefold()
+
+    # -----------------------------
+    # 💾 Save / load
+    # -----------------------------
+
+    def save(self, path):
+        """Write the route to `path` in the binary route format."""
+        current = self._where(self.current) if self.current else 0
+        count = RouteFile.write(path, (node.name for node in self.iter_stations()),
+                                self.is_circular, current)
+        print(f"💾 Saved {count} stations to {path}")
+        return count
+
+    @classmethod
+    def load(cls, path, quiet=True):
+        """Open a saved route. Near-instant at any size: the file is
+        memory-mapped and stations are only read as the train reaches them.
+        The first change to the route reads the rest."""
+        route = cls(quiet=quiet)
+        route._open(RouteFile(path))
+        return route
+
+    def _open(self, store):
+        self.store, self.size = store, store.count
+        self.index, self.root = {}, None
+        self.is_circular = store.circular
+        self.head = self.tail = self.current = None
+        if store.count:
+            self.head, self.tail = store.node(0), store.node(store.count - 1)
+            self.current = store.node(store.current)
+            if self.is_circular:
+                self._make_circular()
+
+    def _materialize(self):
+        """Read every station of a loaded route and build the name index
+        and treap, so the route can be changed like any other."""
+        store = self.store
+        if store is None:
+            return
+        nodes = list(self.iter_stations())
+        for a, b in zip(nodes, nodes[1:]):
+            a.next, b.prev = b, a  # Fix links before positions go stale
+        # The ends too: setting a link marks it resolved, so nothing reads
+        # the store again once it is dropped
+        if nodes:
+            head, tail = nodes[0], nodes[-1]
+            head.prev, tail.next = (tail, head) if self.is_circular else (None, None)
+        self.index = {self._key(node.name): node for node in nodes}
+        self._set_root(_build(nodes))
+        for node in nodes:
+            node.store = None
+        self.store = None
+
+    def _where(self, node):
+        """0-based position of a station on this route."""
+        return node.pos if self.store else _position(node)
 
     def add_station(self, name):
         """Add a new station to the end of the route."""
         if not name.strip():
             print("⚠️  Station name cannot be empty.")
             return
+        self._materialize()
 
         # Avoid duplicates
         if self._find_station(name):
             print(f"❌ '{name}' already exists in the route.")
             return
 
-        new_node = StationNode(name.strip())
+        first = self.head is None
+        self._append(name.strip())
+        print(f"✅ Added: {name} (starting point)" if first else f"✅ Added: {name}")
+
+        # Reconnect circular if needed
+        if self.is_circular:
+            self._make_circular()
+
+    def add_stations(self, names):
+        """Append many stations at once, skipping blank and duplicate names.
 
+        Same result as calling add_station per name, without the per-station
+        message, and in circular mode the loop is reconnected once at the
+        end. Returns the number of stations added.
+        """
+        self._materialize()
+        added = []
+        for name in names:
+            name = name.strip()
+            if name and self._key(name) not in self.index:
+                added.append(self._link(name))
+        if added:
+            self._set_root(_merge(self.root, _build(added)))
+            if self.is_circular:
+                self._make_circular()
+        return len(added)
+
+    def _link(self, name):
+        """Link a new station after the tail and index it by name only."""
+        new_node = StationNode(name)
         if not self.head:
             self.head = self.tail = self.current = new_node
-            print(f"✅ Added: {name} (starting point)")
         else:
             new_node.prev = self.tail
             self.tail.next = new_node
             self.tail = new_node
-            print(f"✅ Added: {name}")
+        self.index[self._key(name)] = new_node
+        self.size += 1
+        return new_node
 
-        # Reconnect circular if needed
+    def _append(self, name):
+        """Append a station to the list and the treap (no loop fix-up)."""
+        new_node = self._link(name)
+        self._set_root(_push_back(self.root, new_node))
+        return new_node
+
+    def _set_root(self, root):
+        self.root = root
+        if root:
+            root.parent = None
+
+    # -----------------------------
+    # 🎯 Positional access, O(log n)
+    # -----------------------------
+
+    def station_at(self, k):
+        """The station at 0-based position `k` (negative counts from the
+        tail), or None if out of range."""
+        if k < 0:
+            k += self.size
+        if not 0 <= k < self.size:
+            return None
+        return self.store.node(k) if self.store else _select(self.root, k)
+
+    def index_of(self, name):
+        """0-based position of the named station, or None if absent."""
+        node = self._find_station(name)
+        return self._where(node) if node else None
+
+    def seek(self, k):
+        """Move the train straight to the station at position `k`."""
+        node = self.station_at(k)
+        if not node:
+            print(f"❌ No station at position {k + 1}." if self.size else "❌ No stations in the route.")
+            return None
+        self.current = node
+        print(f"🚂 Arrived at: {node.name} (stop {self._where(node) + 1} of {self.size})")
+        return node
+
+    def advance(self, k):
+        """Move `k` stations ahead (negative = back). Circular routes wrap
+        around; linear routes stop at the first or last station."""
+        if not self.current:
+            print("❌ No stations in the route.")
+            return None
+        target = self._where(self.current) + k
+        if self.is_circular:
+            target %= self.size
+        elif target >= self.size:
+            target = self.size - 1
+            print("🔚 End of the line.")
+        elif target < 0:
+            target = 0
+            print("🏁 Reached the first station.")
+        return self.seek(target)
+
+    def insert_at(self, k, name):
+        """Insert a new station so that it becomes position `k` (0 = new
+        first station, len(route) = append)."""
+        name = name.strip()
+        if not name:
+            print("⚠️  Station name cannot be empty.")
+            return None
+        self._materialize()
+        if self._find_station(name):
+            print(f"❌ '{name}' already exists in the route.")
+            return None
+        if not 0 <= k <= self.size:
+            print(f"❌ Position must be between 1 and {self.size + 1}.")
+            return None
+        if k == self.size:
+            node = self._append(name)
+        else:
+            after = self.station_at(k)
+            self._break_circular()
+            node = StationNode(name)
+            node.prev, node.next = after.prev, after
+            if after.prev:
+                after.prev.next = node
+            else:
+                self.head = node
+            after.prev = node
+            self.index[self._key(name)] = node
+            self.size += 1
+            left, right = _split(self.root, k)
+            self._set_root(_merge(_merge(left, node), right))
+        if self.is_circular:
+            self._make_circular()
+        print(f"✅ Inserted: {name} at stop {k + 1}")
+        return node
+
+    def remove_station(self, name):
+        """Remove a station. A train standing there moves on to the next
+        station (or the previous one at the end of a linear route)."""
+        node = self._find_station(name)
+        if not node:
+            print(f"❌ '{name}' is not on the route.")
+            return False
+        self._materialize()
+        k = _position(node)
+        if node is self.current:  # Before unlinking, so a loop still wraps
+            self.current = None if self.size == 1 else node.next or node.prev
+        self._break_circular()
+        if node.prev:
+            node.prev.next = node.next
+        else:
+            self.head = node.next
+        if node.next:
+            node.next.prev = node.prev
+        else:
+            self.tail = node.prev
+        del self.index[self._key(node.name)]
+        self.size -= 1
+        left, rest = _split(self.root, k)
+        _, right = _split(rest, 1)
+        self._set_root(_merge(left, right))
+        node.next = node.prev = node.left = node.right = node.parent = None
         if self.is_circular:
             self._make_circular()
+        print(f"🗑️  Removed: {node.name}")
+        return True
 
     def _find_station(self, name):
-        """Check if station exists."""
-        curr = self.head
-        while curr:
-            if curr.name.lower() == name.lower():
-                return curr
-            curr = curr.next
-            if curr == self.head:  # Circular break
-                break
-        return None
+        """Return the station with this name (any case), or None. O(1)."""
+        if self.store:
+            pos = self.store.find(self._key(name))
+            return None if pos is None else self.store.node(pos)
+        return self.index.get(self._key(name))
 
     def _make_circular(self):
         """Make the route circular by linking tail to head."""
@@ -109,38 +585,70 @@ class TrainRoute:
             self.current = self.current.prev
             print(f"🚂 Arrived at: {self.current.name}")
 
-    def view_route(self):
-        """Display the full route."""
+    def view_route(self, out=None):
+        """Display the full route, streamed WRITE_BATCH stations per write
+        so memory stays flat however long the route is."""
         if not self.head:
             print("\n🛤️  No stations added yet.")
             return
 
-        print("\n" + "━" * 60)
-        print("🗺️  FULL TRAIN ROUTE")
-        print("━" * 60)
+        out = out or sys.stdout
+        out.write("\n" + "━" * 60 + "\n🗺️  FULL TRAIN ROUTE\n" + "━" * 60 + "\n")
+        out.write("🛣️  Route: ")
+        self._write_stations(out, self.head, self.size, mark=False)
+        if self.is_circular:
+            out.write(" ➔ " + self.head.name + " (loop)")
+        out.write(f"\n🔁 Mode: {'Circular' if self.is_circular else 'Linear'}\n" + "━" * 60 + "\n")
 
-        stations = []
-        curr = self.head
-        if not curr:
-            print("📭 Empty route.")
+    def view_window(self, radius=5, out=None):
+        """Show the `radius` stations either side of the current one (around
+        the loop on circular routes). Costs O(radius + log n)."""
+        if not self.current:
+            print("\n🛤️  No stations added yet.")
             return
+        here = self._where(self.current)
+        if self.is_circular and 2 * radius + 1 >= self.size:
+            first, count = 0, self.size  # The window covers the whole loop
+        elif self.is_circular:
+            first, count = (here - radius) % self.size, 2 * radius + 1
+        else:
+            first = max(0, here - radius)
+            count = min(self.size - 1, here + radius) - first + 1
+        self._view_span("🗺️  ROUTE AROUND " + self.current.name, first, count, out)
 
-        while True:
-            stations.append(curr.name)
-            curr = curr.next
-            if curr == self.head and self.is_circular:
-                break  # Full loop
-            if curr is None:
-                break
+    def view_range(self, first, last, out=None):
+        """Show stations `first`..`last` (0-based, inclusive). Costs
+        O(last - first + log n)."""
+        first, last = max(0, first), min(self.size - 1, last)
+        if first > last:
+            print("❌ No stations in that range.")
+            return
+        self._view_span(f"🗺️  STOPS {first + 1}–{last + 1} OF {self.size}", first, last - first + 1, out)
 
-        # Build route string
-        route_str = " ➔ ".join(stations)
-        if self.is_circular:
-            route_str += " ➔ " + stations[0] + " (loop)"
+    def _view_span(self, title, first, count, out):
+        out = out or sys.stdout
+        out.write("\n" + "━" * 60 + f"\n{title}\n" + "━" * 60 + "\n")
+        out.write(f"🛣️  Stops {first + 1}–{(first + count - 1) % self.size + 1}: ")
+        self._write_stations(out, self.station_at(first), count)
+        out.write("\n📍 = current station\n" + "━" * 60 + "\n")
+
+    def _write_stations(self, out, node, count, mark=True):
+        """Write `count` stations from `node` on, joined by arrows, in
+        WRITE_BATCH-sized writes; `mark` flags the current station 📍."""
+        def names():
+            curr = node
+            for _ in range(count):
+                yield "📍" + curr.name if mark and curr is self.current else curr.name
+                curr = curr.next
 
-        print(f"🛣️  Route: {route_str}")
-        print(f"🔁 Mode: {'Circular' if self.is_circular else 'Linear'}")
-        print("━" * 60)
+        stations = names()
+        separator = ""
+        while True:
+            batch = list(islice(stations, WRITE_BATCH))
+            if not batch:
+                return
+            out.write(separator + " ➔ ".join(batch))
+            separator = " ➔ "
 
     def current_station(self):
         """Show current train position."""
@@ -149,6 +657,20 @@ class TrainRoute:
         else:
             print("\n❌ Train not initialized — no stations.")
 
+    def structure_sizes(self):
+        """Element counts of the route's structures, for the instrumentation dump."""
+        store = self.store
+        return {"stations": self.size, "name_index": len(self.index),
+                "file_backed": int(store is not None),
+                "stations_in_memory": len(store.nodes) if store else self.size}
+
+    def view_metrics(self):
+        print("\n" + "━" * 50)
+        print("📈 INSTRUMENTATION")
+        print("━" * 50)
+        print(METRICS.format())
+        print("━" * 50)
+
     def menu(self):
         while True:
             print("\n" + "═" * 50)
@@ -160,9 +682,17 @@ class TrainRoute:
             print("4. ⏪ Move to Previous Station")
             print("5. 🗺️  View Full Route")
             print("6. 📍 Current Station")
-            print("7. 🚪 Exit")
+            print("7. 🎯 Jump to Station (number or name)")
+            print("8. ⏭️  Move k Stations (negative = back)")
+            print("9. 📌 Insert Station at Position")
+            print("10. 🗑️  Remove Station")
+            print("11. 🔭 View Stations Around Current / Range")
+            print("12. 💾 Save Route")
+            print("13. 📂 Load Route")
+            print("14. 📈 Instrumentation")
+            print("15. 🚪 Exit")
 
-            choice = input("\n👉 Choose an option (1-7): ").strip()
+            choice = input("\n👉 Choose an option (1-15): ").strip()
 
             if choice == '1':
                 name = input("Enter station name: ").strip()
@@ -178,10 +708,841 @@ class TrainRoute:
             elif choice == '6':
                 self.current_station()
             elif choice == '7':
+                target = input("Enter stop number or station name: ").strip()
+                if target.isdigit() and int(target) < 1:
+                    print(f"❌ Stop numbers start at 1 (1-{self.size}).")
+                elif target.isdigit():
+                    self.seek(int(target) - 1)
+                elif self._find_station(target):
+                    self.seek(self.index_of(target))
+                else:
+                    print(f"❌ '{target}' is not on the route.")
+            elif choice == '8':
+                steps = input("How many stations? ").strip()
+                try:
+                    self.advance(int(steps))
+                except ValueError:
+                    print("❌ Please enter a whole number.")
+            elif choice == '9':
+                name = input("Enter station name: ").strip()
+                position = input(f"Insert at stop number (1-{self.size + 1}): ").strip()
+                if position.isdigit():
+                    self.insert_at(int(position) - 1, name)
+                else:
+                    print("❌ Please enter a stop number.")
+            elif choice == '10':
+                name = input("Enter station name to remove: ").strip()
+                self.remove_station(name)
+            elif choice == '11':
+                span = input("Stations either side (e.g. 5), or a range of stops (e.g. 10-20): ").strip()
+                first, dash, last = span.partition("-")
+                if dash and first.strip().isdigit() and last.strip().isdigit():
+                    self.view_range(int(first) - 1, int(last) - 1)
+                elif span.isdigit():
+                    self.view_window(int(span))
+                else:
+                    print("❌ Enter a number or a range like 10-20.")
+            elif choice == '12':
+                path = input("Save to file: ").strip()
+                try:
+                    self.save(path)
+                except OSError as error:
+                    print(f"❌ Could not save: {error}")
+            elif choice == '13':
+                path = input("Load from file: ").strip()
+                try:
+                    self._open(RouteFile(path))
+                except (OSError, ValueError, struct.error) as error:
+                    print(f"❌ Could not load: {error}")
+                else:
+                    print(f"📂 Loaded {self.size} stations from {path}")
+            elif choice == '14':
+                self.view_metrics()
+            elif choice == '15':
                 print("👋 Thank you for riding the Virtual Train! Goodbye!")
                 break
             else:
-                print("❌ Invalid choice. Please select 1–7.")
+                print("❌ Invalid choice. Please select 1–15.")
+
+
+# -----------------------------
+# 🕸️ Rail Network
+# -----------------------------
+
+INF = float("inf")
+
+
+class RailNetwork:
+    """Many TrainRoutes joined into one graph wherever they share a station
+    name (case-insensitive); those stations are the transfer points.
+
+    Trains run both ways along every line. Journeys can be optimized for
+    fewest stops, fewest transfers (ties broken by stops) or travel time,
+    where time is the segment minutes given to add_route (default_minutes
+    where none was given) plus transfer_minutes per change of line.
+
+    Queries are A* searches guided by ALT lower bounds: distances from a
+    few far-apart landmark stations, computed once on the first query
+    after the network changes. Answers are kept in an LRU cache keyed by
+    (origin, destination, optimize).
+    """
+    OPTIMIZE = ("stops", "transfers", "time")
+
+    def __init__(self, landmarks=8, cache_size=10_000, default_minutes=2.0, transfer_minutes=5.0):
+        self.ids = {}        # Case-folded station name -> station id
+        self.names = []      # Station id -> display name
+        self.adjacent = []   # Station id -> {neighbour id: [minutes, {line ids}]}
+        self.lines = []      # Line id -> line name
+        self.timed = False   # True once any segment has its own minutes
+        self.landmark_count = landmarks
+        self.default_minutes = default_minutes
+        self.transfer_minutes = transfer_minutes
+        self.landmarks = None  # Metric -> list of distance arrays (one per landmark)
+        self.component = None  # Station id -> connected component id
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def _station(self, name):
+        key = name.strip().casefold()
+        station = self.ids.get(key)
+        if station is None:
+            station = self.ids[key] = len(self.names)
+            self.names.append(name.strip())
+            self.adjacent.append({})
+        return station
+
+    def add_route(self, route, name=None, minutes=None):
+        """Add a TrainRoute as a line and return its line id.
+
+        `minutes`, if given, holds the travel time of each segment in route
+        order (including tail -> head on loop routes); None entries fall
+        back to default_minutes.
+        """
+        line = len(self.lines)
+        self.lines.append(name or f"Line {line + 1}")
+        stations = [self._station(node.name) for node in route.iter_stations()]
+        segments = list(zip(stations, stations[1:]))
+        if route.is_circular and len(stations) > 2:
+            segments.append((stations[-1], stations[0]))
+        minutes = list(minutes or ())
+        for i, (a, b) in enumerate(segments):
+            given = minutes[i] if i < len(minutes) else None
+            self.timed = self.timed or given is not None
+            self._connect(a, b, self.default_minutes if given is None else given, line)
+        self.landmarks = None  # Stale; rebuilt on the next query
+        self.cache.clear()
+        return line
+
+    def _connect(self, a, b, minutes, line):
+        edge = self.adjacent[a].get(b)
+        if edge is None:
+            edge = self.adjacent[a][b] = self.adjacent[b][a] = [minutes, set()]
+        else:
+            edge[0] = min(edge[0], minutes)  # Fastest line over this segment
+        edge[1].add(line)
+
+    # -----------------------------
+    # 📐 Landmarks (precomputation)
+    # -----------------------------
+
+    def _distances(self, source, metric):
+        """Shortest distance from `source` to every station (BFS for stops,
+        Dijkstra for minutes), INF where unreachable."""
+        dist = array("d", [INF]) * len(self.names)
+        dist[source] = 0
+        if metric == "stops":
+            frontier = [source]
+            while frontier:
+                following = []
+                for u in frontier:
+                    d = dist[u] + 1
+                    for v in self.adjacent[u]:
+                        if dist[v] == INF:
+                            dist[v] = d
+                            following.append(v)
+                frontier = following
+            return dist
+        heap = [(0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for v, edge in self.adjacent[u].items():
+                nd = d + edge[0]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return dist
+
+    def _components(self):
+        """Label every station with the id of its connected component."""
+        component = array("i", [-1]) * len(self.names)
+        label = 0
+        for source in range(len(self.names)):
+            if component[source] != -1:
+                continue
+            component[source] = label
+            frontier = [source]
+            while frontier:
+                u = frontier.pop()
+                for v in self.adjacent[u]:
+                    if component[v] == -1:
+                        component[v] = label
+                        frontier.append(v)
+            label += 1
+        return component
+
+    def _pick_landmarks(self, metric):
+        """Farthest-first landmarks: each new one is the station farthest
+        from all chosen so far (an unreachable one first, so every part of
+        a disconnected network gets covered)."""
+        if not self.names:
+            return []
+        nearest = self._distances(0, metric)
+        tables = []
+        for _ in range(self.landmark_count):
+            pick = max(range(len(nearest)), key=nearest.__getitem__)
+            if tables and nearest[pick] == 0:
+                break  # Every station is already a landmark
+            table = self._distances(pick, metric)
+            tables.append(table)
+            nearest = array("d", map(min, nearest, table)) if len(tables) > 1 else table
+        return tables
+
+    def precompute(self):
+        """Choose landmarks and store their distance tables. Runs on its own
+        at the first query after a change; call it to pay the cost up front."""
+        self.component = self._components()
+        stops = self._pick_landmarks("stops")
+        if self.timed:
+            minutes = self._pick_landmarks("time")
+        else:  # Every segment takes default_minutes, so time is just stops scaled
+            scale = self.default_minutes
+            minutes = [array("d", (d * scale for d in table)) for table in stops]
+        self.landmarks = {"stops": stops, "time": minutes}
+
+    def _heuristic(self, metric, target):
+        """A lower bound on the remaining distance to `target` for A*."""
+        columns = [(table, table[target]) for table in self.landmarks[metric]
+                   if table[target] != INF]
+        known = {}  # Station -> bound; a station is reached on several lines
+
+        def estimate(station):
+            bound = known.get(station)
+            if bound is None:
+                bound = 0
+                for table, to_target in columns:
+                    gap = to_target - table[station]
+                    if gap < 0:
+                        gap = -gap
+                    if gap > bound:
+                        bound = gap
+                known[station] = bound
+            return bound
+        return estimate
+
+    def _reachable(self, origin, target):
+        # Landmarks cannot tell components apart once there are more
+        # components than landmarks, so this uses the component labels
+        return self.component[origin] == self.component[target]
+
+    # -----------------------------
+    # 🧭 Journey queries
+    # -----------------------------
+
+    def journey(self, origin, destination, optimize="stops"):
+        """Best journey between two station names, or None if there is no
+        way between them. Returns a dict with `stations`, `lines` (the line
+        ridden on each leg), `stops`, `transfers` and `minutes`."""
+        if optimize not in self.OPTIMIZE:
+            raise ValueError(f"optimize must be one of {', '.join(self.OPTIMIZE)}")
+        for name in (origin, destination):
+            if name.strip().casefold() not in self.ids:
+                raise ValueError(f"unknown station '{name}'")
+        key = (self.ids[origin.strip().casefold()], self.ids[destination.strip().casefold()], optimize)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return self.cache[key]
+        self.misses += 1
+        if self.landmarks is None:
+            self.precompute()
+        result = self._search(*key)
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    def _search(self, origin, target, optimize):
+        if not self._reachable(origin, target):
+            return None
+        if optimize == "stops":
+            path = self._search_stations(origin, target)
+            return path and self._describe(path, self._assign_lines(path))
+        if optimize == "transfers":
+            # A change outweighs any number of stops, so transfers come first
+            ride, change, metric = (lambda edge: 1), len(self.names) + 1, "stops"
+        else:
+            ride, change, metric = (lambda edge: edge[0]), self.transfer_minutes, "time"
+        found = self._search_lines(origin, target, ride, change, metric)
+        return found and self._describe(*found)
+
+    def _search_stations(self, origin, target):
+        """A* over stations with unit steps; the path as station ids, or
+        None if the target is never reached."""
+        estimate = self._heuristic("stops", target)
+        best = {origin: 0}
+        parent = {origin: None}
+        # Among equal estimates prefer the deeper station (-cost): it is
+        # closer to the target, so ties do not fan out across the network
+        heap = [(estimate(origin), 0, origin)]
+        while heap:
+            _, cost, u = heapq.heappop(heap)
+            cost = -cost
+            if u == target:
+                break
+            if cost > best[u]:
+                continue
+            for v in self.adjacent[u]:
+                if cost + 1 < best.get(v, INF):
+                    best[v] = cost + 1
+                    parent[v] = u
+                    heapq.heappush(heap, (cost + 1 + estimate(v), -cost - 1, v))
+        else:
+            return None
+        path = [target]
+        while parent[path[-1]] is not None:
+            path.append(parent[path[-1]])
+        return path[::-1]
+
+    def _search_lines(self, origin, target, ride, change, metric):
+        """A* over (station, line) states, so changing line can carry a
+        cost; returns the path and the line of each leg, or None if the
+        target is never reached."""
+        estimate = self._heuristic(metric, target)
+        # A train on a line that never calls at the target must change at
+        # least once more, which keeps the bound admissible and consistent
+        target_lines = set().union(*(edge[1] for edge in self.adjacent[target].values()))
+        start = (origin, -1)  # -1: not on a train yet, so the first line is free
+        best = {start: 0}
+        parent = {start: None}
+        heap = [(estimate(origin), 0, origin, -1)]
+        while heap:
+            _, cost, u, line = heapq.heappop(heap)
+            cost = -cost
+            if u == target:
+                break
+            if cost > best[(u, line)]:
+                continue
+            for v, edge in self.adjacent[u].items():
+                step = cost + ride(edge)
+                for next_line in edge[1]:
+                    total = step + change if line != -1 and next_line != line else step
+                    state = (v, next_line)
+                    if total < best.get(state, INF):
+                        best[state] = total
+                        parent[state] = (u, line)
+                        bound = estimate(v) if next_line in target_lines else estimate(v) + change
+                        heapq.heappush(heap, (total + bound, -total, v, next_line))
+        else:
+            return None
+        path, lines = [u], []
+        state = (u, line)
+        while parent[state] is not None:
+            lines.append(state[1])
+            state = parent[state]
+            path.append(state[0])
+        return path[::-1], lines[::-1]
+
+    def _assign_lines(self, path):
+        """Lines for a fixed path with as few changes as possible: stay on
+        the current line while it goes on, else take the one going furthest."""
+        legs = [self.adjacent[a][b][1] for a, b in zip(path, path[1:])]
+        lines = []
+        for i, available in enumerate(legs):
+            if lines and lines[-1] in available:
+                lines.append(lines[-1])
+                continue
+            best, reach = None, -1
+            for line in available:
+                j = i
+                while j < len(legs) and line in legs[j]:
+                    j += 1
+                if j > reach:
+                    best, reach = line, j
+            lines.append(best)
+        return lines
+
+    def _describe(self, path, lines):
+        transfers = sum(1 for a, b in zip(lines, lines[1:]) if a != b)
+        minutes = sum(self.adjacent[a][b][0] for a, b in zip(path, path[1:]))
+        return {
+            "stations": [self.names[s] for s in path],
+            "lines": [self.lines[line] for line in lines],
+            "stops": len(path) - 1,
+            "transfers": transfers,
+            "minutes": minutes + transfers * self.transfer_minutes,
+        }
+
+    def cache_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.cache),
+            "capacity": self.cache_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def format_journey(journey):
+    """One line per line ridden, e.g. `🚆 Red: A ➔ B ➔ C`."""
+    if journey is None:
+        return "❌ No connection between these stations."
+    stations, lines = journey["stations"], journey["lines"]
+    if not lines:
+        return f"📍 Already at {stations[0]}."
+    out, start = [], 0
+    for i in range(1, len(lines) + 1):
+        if i == len(lines) or lines[i] != lines[start]:
+            out.append(f"🚆 {lines[start]}: {' ➔ '.join(stations[start:i + 1])}")
+            if i < len(lines):
+                out.append(f"   🔄 Change at {stations[i]}")
+            start = i
+    out.append(f"🧾 {journey['stops']} stops, {journey['transfers']} transfers, "
+               f"~{journey['minutes']:g} min")
+    return "\n".join(out)
+
+
+def read_routes(f):
+    """Yield (name, TrainRoute, segment minutes) from lines of text like
+
+        Red: Central > Market > Harbor | 3 4
+        Ring (loop): A > B > C
+
+    Segment minutes after `|` are optional; `(loop)` makes a circular line.
+    """
+    for text in f:
+        text = text.strip()
+        if not text or text.startswith("#"):
+            continue
+        name, _, rest = text.rpartition(":") if ":" in text else ("", "", text)
+        stations, _, minutes = rest.partition("|")
+        route = TrainRoute(quiet=True)
+        if name.strip().endswith("(loop)"):
+            name = name.strip()[:-len("(loop)")]
+            route.is_circular = True
+        route.add_stations(stations.split(">"))
+        if route.is_circular:
+            route._make_circular()
+        yield name.strip() or None, route, [float(m) for m in minutes.split()]
+
+
+def load_network(f, **options):
+    """Build a RailNetwork from a route file (see read_routes)."""
+    network = RailNetwork(**options)
+    for name, route, minutes in read_routes(f):
+        network.add_route(route, name, minutes)
+    return network
+
+
+# -----------------------------
+# 🚦 Multi-Train Simulation
+# -----------------------------
+
+class TrainSimulation:
+    """Discrete-event simulation of many trains running over TrainRoutes.
+
+    Each train dwells `dwell` minutes at every station and then takes the
+    segment's travel time to the next one. Trains on linear routes turn
+    back at either end; on loop routes they keep going round. The only
+    events are arrivals, kept in a heap ordered by time. Trains are rows
+    in parallel arrays (route, next station, direction, arrival time), so
+    a train costs a few bytes rather than an object.
+
+    A train's motion repeats once it has been round its route, so run()
+    with fast_forward computes where each train ends up and how many
+    arrivals it made at each station arithmetically, per train rather than
+    per event. Last-arrival queries are answered the same way, from the
+    trains' current state.
+    """
+    def __init__(self, default_minutes=2.0):
+        self.default_minutes = default_minutes
+        self.clock = 0.0
+        # Per route
+        self.route_names = []
+        self.stations = []    # Route -> list of station names
+        self.segments = []    # Route -> array of minutes; segment i runs i -> i + 1
+        self.dwell = []
+        self.circular = []
+        self.base = []        # Route -> first slot of its stations in arrival_count
+        self.trains_on = []   # Route -> train ids
+        self.cycles = {}      # (route, direction) -> (station per step, arrival offsets)
+        # Per (route, station) slot
+        self.arrival_count = array("q")
+        self.slots = {}       # Case-folded station name -> (route, station index) pairs
+        self.display = {}     # Case-folded station name -> name as first added
+        # Per train
+        self.train_route = array("i")
+        self.train_pos = array("i")   # Station it is heading for (or standing at)
+        self.train_dir = array("b")
+        self.train_next = array("d")  # Time it arrives there
+        self.train_start = array("d")  # Time of its first arrival
+        self.events = []              # Heap of (time, train)
+        self.processed = 0            # Arrivals handled as events
+        self.skipped = 0              # Arrivals accounted for by fast-forward
+        self.wall_seconds = 0.0
+
+    def add_route(self, route, minutes=None, dwell=0.5, name=None):
+        """Add a TrainRoute; `minutes` as for RailNetwork.add_route.
+        Returns the route id."""
+        rid = len(self.stations)
+        names = [node.name for node in route.iter_stations()]
+        circular = route.is_circular and len(names) > 2
+        count = len(names) if circular else len(names) - 1
+        minutes = list(minutes or ())
+        segments = array("d", (minutes[i] if i < len(minutes) and minutes[i] is not None
+                               else self.default_minutes for i in range(max(count, 0))))
+        self.route_names.append(name or f"Line {rid + 1}")
+        self.stations.append(names)
+        self.segments.append(segments)
+        self.dwell.append(dwell)
+        self.circular.append(circular)
+        self.base.append(len(self.arrival_count))
+        self.trains_on.append([])
+        for i, station in enumerate(names):
+            self.slots.setdefault(station.casefold(), []).append((rid, i))
+            self.display.setdefault(station.casefold(), station)
+        self.arrival_count.extend([0] * len(names))
+        return rid
+
+    def add_train(self, rid, station=0, direction=1, depart=None):
+        """Put a train at station index `station` of route `rid`, heading
+        `direction` (1 or -1); its first arrival there is at `depart`
+        (default: now). Returns the train id."""
+        train = len(self.train_route)
+        when = self.clock if depart is None else depart
+        self.train_route.append(rid)
+        self.train_pos.append(station)
+        self.train_dir.append(direction)
+        self.train_next.append(when)
+        self.train_start.append(when)
+        self.trains_on[rid].append(train)
+        if len(self.stations[rid]) > 1:  # A one-station route goes nowhere
+            heapq.heappush(self.events, (when, train))
+        return train
+
+    def add_trains(self, rid, count):
+        """Spread `count` trains evenly around route `rid`'s cycle."""
+        n = len(self.stations[rid])
+        cycle = n if self.circular[rid] else max(2 * (n - 1), 1)
+        for j in range(count):
+            c = j * cycle // count
+            if self.circular[rid] or c < n - 1 or n == 1:
+                self.add_train(rid, c if n > 1 else 0, 1)
+            else:
+                self.add_train(rid, cycle - c, -1)
+
+    def _arrive(self, train, when):
+        """Record an arrival and schedule the train's next one."""
+        rid = self.train_route[train]
+        pos, step = self.train_pos[train], self.train_dir[train]
+        self.arrival_count[self.base[rid] + pos] += 1
+        n = len(self.stations[rid])
+        if self.circular[rid]:
+            following = (pos + step) % n
+            segment = pos if step == 1 else following
+        else:
+            if not 0 <= pos + step < n:
+                step = self.train_dir[train] = -step
+            following = pos + step
+            segment = min(pos, following)
+        when += self.dwell[rid] + self.segments[rid][segment]
+        self.train_pos[train] = following
+        self.train_next[train] = when
+        heapq.heappush(self.events, (when, train))
+
+    # -----------------------------
+    # ⏩ Fast-forward
+    # -----------------------------
+
+    def _cycle(self, rid, step):
+        """The stations a train visits in one full cycle, starting at station
+        0, and the offset of each arrival from the first; the last offset
+        is the cycle's length in minutes."""
+        key = (rid, step if self.circular[rid] else 0)
+        cycle = self.cycles.get(key)
+        if cycle is None:
+            n, segments = len(self.stations[rid]), self.segments[rid]
+            if self.circular[rid]:
+                order = list(range(n)) if step == 1 else [0] + list(range(n - 1, 0, -1))
+                hops = [segments[min(a, b)] if abs(a - b) == 1 else segments[n - 1]
+                        for a, b in zip(order, order[1:] + order[:1])]
+            else:
+                order = list(range(n)) + list(range(n - 2, 0, -1))
+                hops = [segments[min(a, b)] for a, b in zip(order, order[1:] + order[:1])]
+            offsets = array("d", [0.0])
+            for hop in hops:
+                offsets.append(offsets[-1] + self.dwell[rid] + hop)
+            cycle = self.cycles[key] = (array("i", order), offsets)
+        return cycle
+
+    def _cycle_step(self, rid, pos, step):
+        """Which step of its cycle a train heading for `pos` is on."""
+        n = len(self.stations[rid])
+        if self.circular[rid]:
+            return pos if step == 1 else (n - pos) % n
+        if pos == 0 or pos == n - 1 or step == 1:
+            return pos
+        return 2 * (n - 1) - pos
+
+    def _fast_forward(self, until):
+        """Move every train straight to its state at `until`, counting the
+        arrivals it makes on the way per station of its cycle."""
+        pending = {}  # Cycle -> [whole cycles, difference array over steps]
+        for _, train in self.events:
+            when = self.train_next[train]
+            if when > until:
+                continue
+            rid, step = self.train_route[train], self.train_dir[train]
+            order, offsets = cycle = self._cycle(rid, step)
+            length, period = len(order), offsets[-1]
+            c = self._cycle_step(rid, self.train_pos[train], step)
+            laps, rest = divmod(until - when, period)
+            counts = pending.setdefault(id(cycle), [cycle, rid, 0, [0] * (length + 1)])
+            counts[2] += int(laps)
+            diff = counts[3]
+            diff[c] += 1  # Arrivals at steps c.. in the last partial lap
+            reach = offsets[c] + rest
+            if reach >= period:  # Wrapped past step 0
+                diff[length] -= 1
+                diff[0] += 1
+                reach -= period
+                laps += 1
+            last = bisect_right(offsets, reach) - 1
+            diff[last + 1] -= 1
+            following = last + 1
+            self.skipped += int(laps) * length + following - c
+            when += laps * period + offsets[following] - offsets[c]
+            following %= length
+            pos = order[following]
+            n = len(self.stations[rid])
+            if not self.circular[rid]:
+                step = -1 if following == 0 or following >= n else 1
+            self.train_pos[train] = pos
+            self.train_dir[train] = step
+            self.train_next[train] = when
+        for (order, _), rid, laps, diff in pending.values():
+            base, running = self.base[rid], laps
+            for c, pos in enumerate(order):
+                running += diff[c]
+                self.arrival_count[base + pos] += running
+        self.events = [(self.train_next[train], train) for _, train in self.events]
+        heapq.heapify(self.events)
+
+    def run(self, minutes, fast_forward=True):
+        """Advance the clock by `minutes`, handling every arrival up to the
+        new time. Returns the number of arrivals in that span."""
+        start = time.perf_counter()
+        until = self.clock + minutes
+        before = self.processed + self.skipped
+        if fast_forward:
+            self._fast_forward(until)
+        events, pop, arrive = self.events, heapq.heappop, self._arrive
+        while events and events[0][0] <= until:
+            when, train = pop(events)
+            arrive(train, when)
+            self.processed += 1
+        self.clock = until
+        self.wall_seconds += time.perf_counter() - start
+        return self.processed + self.skipped - before
+
+    # -----------------------------
+    # 📊 Queries and metrics
+    # -----------------------------
+
+    def arrivals(self, station=None):
+        """Arrivals so far at a station (by name, over every route calling
+        there), or in total."""
+        if station is None:
+            return self.processed + self.skipped
+        return sum(self.arrival_count[self.base[rid] + i]
+                   for rid, i in self.slots.get(station.strip().casefold(), ()))
+
+    def last_arrival_at(self, station):
+        """Time of the latest arrival at a station, or None if none yet.
+
+        Worked out backwards from each train's next arrival, so it costs
+        O(trains on the routes calling there), however long the run.
+        """
+        latest = None
+        for rid, i in self.slots.get(station.strip().casefold(), ()):
+            for train in self.trains_on[rid]:
+                if len(self.stations[rid]) < 2:
+                    continue
+                step = self.train_dir[train]
+                order, offsets = self._cycle(rid, step)
+                period = offsets[-1]
+                c = self._cycle_step(rid, self.train_pos[train], step)
+                for s, pos in enumerate(order):
+                    if pos != i:
+                        continue
+                    back = (offsets[c] - offsets[s]) % period or period
+                    when = self.train_next[train] - back
+                    if when >= self.train_start[train] - 1e-9 and (latest is None or when > latest):
+                        latest = when
+        return latest
+
+    def position(self, train):
+        """(route name, station name, direction) of the station the train
+        is heading for next."""
+        rid = self.train_route[train]
+        return self.route_names[rid], self.stations[rid][self.train_pos[train]], self.train_dir[train]
+
+    def busiest(self, count=5):
+        """The `count` stations with the most arrivals, as (name, arrivals)."""
+        totals = ((self.arrivals(key), name) for key, name in self.display.items())
+        return [(name, total) for total, name in heapq.nlargest(count, totals)]
+
+    def stats(self):
+        hours = self.clock / 60
+        total = self.arrivals()
+        return {
+            "trains": len(self.train_route),
+            "routes": len(self.stations),
+            "simulated_hours": hours,
+            "arrivals": total,
+            "arrivals_per_hour": total / hours if hours else 0.0,
+            "events_processed": self.processed,
+            "arrivals_fast_forwarded": self.skipped,
+            "wall_seconds": self.wall_seconds,
+            "events_per_second": self.processed / self.wall_seconds if self.wall_seconds else 0.0,
+        }
+
+
+# -----------------------------
+# 🤖 Headless Commands
+# -----------------------------
+
+class RouteService:
+    """The menu's operations as request dicts in, response dicts out, for
+    scripts and load tests. What the route would print is captured into
+    the response's "message" instead of reaching the terminal.
+
+    Every request has an "op"; every response has "ok", "message" and
+    "station" (where the train is afterwards). Positions are 0-based.
+    A malformed request gets an "error" instead of raising. Capturing
+    swaps sys.stdout, so use one service per thread at most.
+    """
+    def __init__(self, route):
+        self.route = route
+
+    def handle(self, request):
+        if not isinstance(request, dict):
+            return {"ok": False, "message": "❌ Malformed request.", "station": None,
+                    "error": "a request must be a JSON object"}
+        try:
+            return self._dispatch(request)
+        except Exception as error:
+            current = self.route.current
+            return {"ok": False, "message": "❌ Request failed.",
+                    "station": current.name if current else None,
+                    "error": f"{type(error).__name__}: {error}"}
+
+    @staticmethod
+    def _field(request, name, kind, default, minimum=None):
+        """request[name] (`default` if absent), checked to be a `kind`."""
+        value = request.get(name, default)
+        if kind is int:
+            if type(value) is not int or (minimum is not None and value < minimum):
+                bound = "" if minimum is None else f" ≥ {minimum}"
+                raise ValueError(f"{name} must be a whole number{bound}, not {value!r}")
+        elif not isinstance(value, kind):
+            raise ValueError(f"{name} must be a {kind.__name__}, not {value!r}")
+        return value
+
+    def _dispatch(self, request):
+        op = request.get("op")
+        route = self.route
+        field = self._field
+        name = field(request, "name", str, "")
+        before = (route.size, route.current)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            if op == "add":
+                route.add_station(name)
+                ok = route.size > before[0]
+            elif op == "add_many":
+                names = field(request, "names", list, [])
+                if not all(isinstance(n, str) for n in names):
+                    raise ValueError("names must all be strings")
+                ok = route.add_stations(names) > 0
+                print(f"✅ Added {route.size - before[0]} stations.")
+            elif op == "toggle":
+                route.toggle_circular()
+                ok = True
+            elif op in ("next", "prev"):
+                route.move_next() if op == "next" else route.move_prev()
+                ok = route.current is not before[1]
+            elif op == "seek":
+                ok = route.seek(field(request, "k", int, 0)) is not None
+            elif op == "advance":
+                ok = route.advance(field(request, "k", int, 1)) is not None
+            elif op == "insert":
+                ok = route.insert_at(field(request, "k", int, route.size), name) is not None
+            elif op == "remove":
+                ok = route.remove_station(name)
+            elif op == "find":
+                index = route.index_of(name)
+                ok = index is not None
+                print(f"📍 {name} is stop {index + 1}." if ok else f"❌ '{name}' is not on the route.")
+            elif op == "current":
+                route.current_station()
+                ok = route.current is not None
+            elif op == "window":
+                route.view_window(field(request, "radius", int, 5, minimum=0))
+                ok = route.current is not None
+            elif op == "range":
+                route.view_range(field(request, "first", int, 0), field(request, "last", int, 0))
+                ok = route.size > 0
+            elif op == "view":
+                route.view_route()
+                ok = route.size > 0
+            else:
+                return {"ok": False, "message": f"❌ Unknown operation: {op!r}", "station": None}
+        station = route.current.name if route.current else None
+        return {"ok": ok, "message": out.getvalue().strip(), "station": station}
+
+
+# -----------------------------
+# 📈 Instrumentation
+# -----------------------------
+
+# metrics.py is shared by the three tools and lives in the repository root
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+import metrics  # noqa: E402
+
+METRICS = metrics.Metrics("train")
+
+# Operations timed when instrumentation is on
+INSTRUMENTED = [
+    *((TrainRoute, name) for name in ("_find_station", "add_station", "add_stations", "station_at",
+                                      "index_of", "seek", "advance", "move_next", "move_prev",
+                                      "insert_at", "remove_station", "view_route", "view_window",
+                                      "view_range", "save", "load")),
+    (RouteFile, "find"),
+    (RailNetwork, "precompute"),
+    (RailNetwork, "journey"),
+    (TrainSimulation, "run"),
+    (RouteService, "handle"),
+]
 
 
 # -----------------------------
@@ -189,5 +1550,57 @@ class TrainRoute:
 # -----------------------------
 
 if __name__ == "__main__":
-    route = TrainRoute()
-    route.menu()
+    parser = argparse.ArgumentParser(description="Virtual Train Route Planner")
+    parser.add_argument("--load", metavar="FILE", help="start from a route saved with Save Route")
+    metrics.add_arguments(parser, menu_option=14)
+    commands = parser.add_subparsers(dest="command")
+    plan_cmd = commands.add_parser("plan", help="plan a journey across a network of lines")
+    plan_cmd.add_argument("network", help="file with one line per route: 'Name: A > B > C | 3 4'")
+    plan_cmd.add_argument("origin")
+    plan_cmd.add_argument("destination")
+    plan_cmd.add_argument("--by", choices=RailNetwork.OPTIMIZE, default="stops",
+                          help="what to minimize (default: stops)")
+    sim_cmd = commands.add_parser("simulate", help="run many trains over the lines of a network file")
+    sim_cmd.add_argument("network", help="route file, as for plan")
+    sim_cmd.add_argument("--trains", type=int, default=10, help="trains per line (default: 10)")
+    sim_cmd.add_argument("--hours", type=float, default=24, help="simulated hours (default: 24)")
+    sim_cmd.add_argument("--dwell", type=float, default=0.5, help="minutes at each station")
+    args = parser.parse_args()
+    metrics.start(METRICS, args, INSTRUMENTED)
+
+    if args.command == "plan":
+        with open(args.network, encoding="utf-8") as f:
+            network = load_network(f)
+        METRICS.sizes = lambda: {"stations": len(network), "cached_journeys": len(network.cache)}
+        try:
+            print(format_journey(network.journey(args.origin, args.destination, args.by)))
+        except ValueError as error:
+            print(f"❌ {error}")
+    elif args.command == "simulate":
+        sim = TrainSimulation()
+        METRICS.sizes = lambda: {"trains": len(sim.train_route), "pending_events": len(sim.events)}
+        with open(args.network, encoding="utf-8") as f:
+            for name, route, minutes in read_routes(f):
+                sim.add_trains(sim.add_route(route, minutes, args.dwell, name), args.trains)
+        sim.run(args.hours * 60)
+        stats = sim.stats()
+        print(f"🚦 {stats['trains']} trains on {stats['routes']} lines, "
+              f"{stats['simulated_hours']:g} simulated hours in {stats['wall_seconds'] * 1000:.0f} ms")
+        print(f"🚉 {stats['arrivals']} arrivals ({stats['arrivals_per_hour']:.0f} per hour)")
+        if not stats["arrivals"]:
+            print("   No train reached a station in that time.")
+        for station, count in sim.busiest():
+            last = sim.last_arrival_at(station)
+            if last is None:
+                print(f"   {station}: no arrivals")
+            else:
+                print(f"   {station}: {count} arrivals, last at minute {last:g}")
+    else:
+        route = TrainRoute()
+        if args.load:
+            route._open(RouteFile(args.load))
+            print(f"📂 Loaded {route.size} stations from {args.load}")
+        METRICS.sizes = route.structure_sizes
+        route.menu()
+
+    metrics.finish(METRICS, args)
@@ -0,0 +1,201 @@
+# metrics.py
+# Opt-in instrumentation shared by the three tools: per-operation call
+# counters and timers, structure sizes and tracemalloc growth, shown from a
+# menu entry or dumped periodically as JSON or Prometheus text. Each tool's
+# scr.py imports it (putting the repository root on sys.path) and lists the
+# operations it times.
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+
+class Metrics:
+    """Opt-in call counters, timers and memory figures for a tool's core operations.
+
+    Nothing is measured until enable(): it swaps each named method or
+    module-level function for a timing wrapper, and disable() puts the
+    originals back, so with metrics off a tool runs exactly its
+    uninstrumented code. Functions are swapped in their module's namespace,
+    which is where their callers look them up. Timings include nested
+    calls. Counters are updated without a lock, so under the library's
+    threaded server the odd call may go uncounted, and worker processes
+    (the calculator's `eval --workers N`) are not timed at all; the figures
+    are for profiling, not accounting.
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix   # Metric name prefix in the Prometheus dump
+        self.calls = {}        # "Class.method" or function -> [calls, total ns, max ns]
+        self.sizes = None      # Callable returning {structure: element count}
+        self.enabled = False
+        self._originals = []   # (owner, name, original attribute) to restore
+        self._baseline = None  # tracemalloc snapshot taken by enable()
+        self._owns_tracing = False
+        self._dumper = None
+        self._stop = threading.Event()
+
+    def enable(self, targets, trace_memory=False):
+        """Time every (class or module, name) in `targets`; optionally trace allocations."""
+        if self.enabled:
+            return
+        for owner, name in targets:
+            original = owner.__dict__[name]
+            self._originals.append((owner, name, original))
+            label = f"{owner.__name__}.{name}" if isinstance(owner, type) else name
+            setattr(owner, name, self._timed(label, original))
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracing = True
+            self._baseline = tracemalloc.take_snapshot()
+        self.enabled = True
+
+    def disable(self):
+        self.stop_dumping()
+        for owner, name, original in reversed(self._originals):
+            setattr(owner, name, original)
+        self._originals.clear()
+        if self._owns_tracing:
+            tracemalloc.stop()
+        self._baseline = None
+        self._owns_tracing = False
+        self.enabled = False
+
+    def _timed(self, label, original):
+        if isinstance(original, (staticmethod, classmethod)):
+            return type(original)(self._timed(label, original.__func__))
+        stats = self.calls.setdefault(label, [0, 0, 0])
+        clock = time.perf_counter_ns
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                stats[0] += 1
+                stats[1] += elapsed
+                if elapsed > stats[2]:
+                    stats[2] = elapsed
+        return timed
+
+    def snapshot(self, top=5):
+        """Current figures as a plain dict; this is also the JSON dump."""
+        report = {"time": time.time(), "enabled": self.enabled, "operations": {}}
+        for label, (calls, total, worst) in sorted(self.calls.items()):
+            report["operations"][label] = {
+                "calls": calls, "total_seconds": total / 1e9,
+                "mean_us": total / calls / 1e3 if calls else 0.0, "max_us": worst / 1e3}
+        if self.sizes is not None:
+            report["sizes"] = self.sizes()
+        if self._baseline is not None and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, tracemalloc.__file__)])
+            growth = snapshot.compare_to(self._baseline, "lineno")[:top]
+            report["memory"] = {
+                "current_bytes": current, "peak_bytes": peak,
+                "top_growth": [{"where": str(stat.traceback[0]), "bytes": stat.size_diff,
+                                "blocks": stat.count_diff} for stat in growth]}
+        return report
+
+    def prometheus(self, report=None):
+        """The same figures in the Prometheus text exposition format."""
+        report = report or self.snapshot()
+        p = self.prefix
+        ops = report["operations"]
+        lines = []
+        for metric, kind, values in (
+                ("operation_calls_total", "counter", {op: s["calls"] for op, s in ops.items()}),
+                ("operation_seconds_total", "counter", {op: s["total_seconds"] for op, s in ops.items()}),
+                ("operation_max_seconds", "gauge", {op: s["max_us"] / 1e6 for op, s in ops.items()})):
+            lines.append(f"# TYPE {p}_{metric} {kind}")
+            lines.extend(f'{p}_{metric}{{op="{op}"}} {value}' for op, value in values.items())
+        if "sizes" in report:
+            lines.append(f"# TYPE {p}_structure_size gauge")
+            lines.extend(f'{p}_structure_size{{structure="{name}"}} {value}'
+                         for name, value in report["sizes"].items())
+        if "memory" in report:
+            lines.append(f"# TYPE {p}_traced_memory_bytes gauge")
+            lines.append(f'{p}_traced_memory_bytes{{kind="current"}} {report["memory"]["current_bytes"]}')
+            lines.append(f'{p}_traced_memory_bytes{{kind="peak"}} {report["memory"]["peak_bytes"]}')
+        return "\n".join(lines) + "\n"
+
+    def format(self):
+        """Human-readable summary for the stats menu entry."""
+        report = self.snapshot()
+        lines = []
+        if "sizes" in report:
+            lines.append("📏 " + "   ".join(f"{name}: {value:,}" for name, value in report["sizes"].items()))
+        ops = {op: s for op, s in report["operations"].items() if s["calls"]}
+        if not self.enabled:
+            lines.append("⏱️  Timers are off (start with --metrics).")
+        elif not ops:
+            lines.append("⏱️  No timed operations yet.")
+        else:
+            width = max(map(len, ops)) + 2
+            lines.append(f"{'Operation':<{width}}{'Calls':>10}{'Mean µs':>10}{'Max µs':>10}{'Total s':>10}")
+            lines.extend(f"{op:<{width}}{s['calls']:>10,}{s['mean_us']:>10.1f}{s['max_us']:>10.1f}"
+                         f"{s['total_seconds']:>10.3f}" for op, s in ops.items())
+        if "memory" in report:
+            memory = report["memory"]
+            lines.append(f"🧠 Traced memory: {memory['current_bytes'] / 2**20:.1f} MiB now, "
+                         f"{memory['peak_bytes'] / 2**20:.1f} MiB peak. Largest growth:")
+            lines.extend(f"   {stat['bytes'] / 1024:>10,.1f} KiB  {stat['where']}" for stat in memory["top_growth"])
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """Write the figures to `path` atomically: JSON for *.json, else Prometheus text."""
+        report = self.snapshot()
+        text = json.dumps(report, indent=2) if path.endswith(".json") else self.prometheus(report)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def start_dumping(self, path, interval):
+        """Rewrite `path` every `interval` seconds from a daemon thread."""
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.dump(path)
+        self._dumper = threading.Thread(target=loop, name="metrics-dump", daemon=True)
+        self._dumper.start()
+
+    def stop_dumping(self):
+        if self._dumper is not None:
+            self._stop.set()
+            self._dumper.join()
+            self._dumper = None
+
+
+def add_arguments(parser, menu_option):
+    """The --metrics family of command-line flags."""
+    parser.add_argument("--metrics", action="store_true",
+                        help=f"time and count the core operations (see menu option {menu_option})")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also track allocations with tracemalloc (implies --metrics)")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="dump metrics periodically to PATH (*.json, otherwise Prometheus text)")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, metavar="SECONDS")
+
+
+def start(metrics, args, targets):
+    """Switch `metrics` on if any of the flags asked for it."""
+    if args.metrics or args.trace_memory or args.metrics_file:
+        metrics.enable(targets, trace_memory=args.trace_memory)
+        if args.metrics_file:
+            metrics.start_dumping(args.metrics_file, args.metrics_interval)
+
+
+def finish(metrics, args):
+    """Stop the periodic dump and write the final figures."""
+    if args.metrics_file:
+        metrics.stop_dumping()
+        metrics.dump(args.metrics_file)
@@ -0,0 +1,202 @@
+# replay.py
+# Replay driver: runs a recorded or generated command script against one of
+# the three tools through its headless API and reports throughput and latency.
+#
+#   python replay.py library --generate 1000000
+#   python replay.py train commands.jsonl --responses out.jsonl
+#   python replay.py calculator --generate 100000 --save-script calc.jsonl
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import random
+import sys
+import time
+from array import array
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+TOOLS = {
+    "library": "E-Library Book Management",
+    "calculator": "Expression Calculator",
+    "train": "Virtual Train Route Planner",
+}
+
+
+def load_tool(tool):
+    """Import a tool's scr.py by path (the folders have spaces in their names)."""
+    path = os.path.join(ROOT, TOOLS[tool], "scr.py")
+    spec = importlib.util.spec_from_file_location(f"{tool}_scr", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module  # Lets pickling and dataclasses find it
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_handler(tool, module):
+    """A function request -> response for `tool`, with startup banners muted."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        if tool == "library":
+            library = module.LibrarySystem()
+            service = module.LibraryService(library)
+            undo_stack = library.undo_stack
+            return lambda request: service.handle(request, undo_stack)
+        if tool == "calculator":
+            return module.CalculatorService(module.ExpressionCalculator(quiet=True)).handle
+        return module.RouteService(module.TrainRoute(quiet=True)).handle
+
+
+# -----------------------------
+# 🎲 Generated Workloads
+# -----------------------------
+
+def generate_library(rng, count):
+    """Add a catalog, then mostly borrows and returns of random titles."""
+    books = max(100, min(count // 20, 50_000))
+    for i in range(books):
+        yield {"op": "add", "title": f"Book {i}", "author": f"Author {i % 997}"}
+    for _ in range(count - books):
+        roll = rng.random()
+        title = f"Book {rng.randrange(books)}"
+        if roll < 0.45:
+            yield {"op": "borrow", "title": title}
+        elif roll < 0.90:
+            yield {"op": "return", "title": title}
+        elif roll < 0.95:
+            yield {"op": "undo"}
+        elif roll < 0.99:
+            yield {"op": "search", "keyword": f"Author {rng.randrange(997)}", "limit": 10}
+        else:
+            yield {"op": "stats"}
+
+
+def generate_train(rng, count):
+    """One long route, then station hops, jumps and lookups."""
+    stations = max(100, min(count // 10, 100_000))
+    yield {"op": "add_many", "names": [f"Station {i}" for i in range(stations)]}
+    yield {"op": "toggle"}
+    for _ in range(count - 2):
+        roll = rng.random()
+        if roll < 0.40:
+            yield {"op": "next"}
+        elif roll < 0.60:
+            yield {"op": "prev"}
+        elif roll < 0.75:
+            yield {"op": "advance", "k": rng.randint(-50, 50)}
+        elif roll < 0.85:
+            yield {"op": "seek", "k": rng.randrange(stations)}
+        elif roll < 0.95:
+            yield {"op": "find", "name": f"Station {rng.randrange(stations)}"}
+        else:
+            yield {"op": "window", "radius": 5}
+
+
+def generate_calculator(rng, count):
+    """Evaluations from a pool of formulas (so the cache sees repeats), plus
+    named-expression updates over a small dependency chain."""
+    pool = []
+    for _ in range(500):
+        terms = [str(rng.randint(1, 99)) if rng.random() < 0.7 else "x" for _ in range(rng.randint(2, 8))]
+        expr = terms[0]
+        for term in terms[1:]:
+            expr += f" {rng.choice('+-*/')} {term}"
+        pool.append(expr)
+    yield {"op": "define", "name": "base", "expr": "1"}
+    for i in range(20):
+        yield {"op": "define", "name": f"level{i}", "expr": f"{'base' if i == 0 else f'level{i - 1}'} * 2 + 1"}
+    for _ in range(count - 21):
+        roll = rng.random()
+        if roll < 0.85:
+            yield {"op": "eval", "expr": f"{rng.choice(pool)} | x={rng.randint(1, 9)}"}
+        elif roll < 0.95:
+            yield {"op": "define", "name": "base", "expr": str(rng.randint(1, 100))}
+        elif roll < 0.99:
+            yield {"op": "convert", "expr": rng.choice(pool)}
+        else:
+            yield {"op": "get", "name": "level19"}
+
+
+GENERATORS = {"library": generate_library, "train": generate_train, "calculator": generate_calculator}
+
+
+def read_script(f):
+    """Requests from a JSON-lines script; blank lines are skipped."""
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+# -----------------------------
+# ⏱️ Replay and Report
+# -----------------------------
+
+def replay(handle, requests, responses=None):
+    """Run every request, timing each one. Returns {op: array of ns}."""
+    latencies = {}
+    clock = time.perf_counter_ns
+    for request in requests:
+        start = clock()
+        response = handle(request)
+        elapsed = clock() - start
+        op = request.get("op")
+        samples = latencies.get(op)
+        if samples is None:
+            samples = latencies[op] = array("q")
+        samples.append(elapsed)
+        if responses is not None:
+            responses.write(json.dumps(response, default=str) + "\n")
+    return latencies
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def report(latencies, wall_seconds, out=sys.stdout):
+    total = sum(len(samples) for samples in latencies.values())
+    out.write(f"📊 {total:,} operations in {wall_seconds:.2f}s "
+              f"({total / wall_seconds if wall_seconds else 0:,.0f} ops/s overall)\n")
+    out.write(f"{'op':<12}{'count':>10}{'ops/s':>12}{'p50 µs':>10}{'p90 µs':>10}"
+              f"{'p99 µs':>10}{'max µs':>10}\n")
+    for op, samples in sorted(latencies.items(), key=lambda item: -len(item[1])):
+        ordered = sorted(samples)
+        busy = sum(ordered) / 1e9
+        out.write(f"{str(op):<12}{len(ordered):>10,}{len(ordered) / busy if busy else 0:>12,.0f}"
+                  + "".join(f"{percentile(ordered, q) / 1000:>10.1f}" for q in (0.5, 0.9, 0.99))
+                  + f"{ordered[-1] / 1000:>10.1f}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a command script against a tool's headless API")
+    parser.add_argument("tool", choices=sorted(TOOLS))
+    parser.add_argument("script", nargs="?", help="JSON-lines requests, one per line (- for stdin)")
+    parser.add_argument("--generate", type=int, metavar="N", help="generate N requests instead")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save-script", metavar="FILE", help="write the generated requests and exit")
+    parser.add_argument("--responses", metavar="FILE", help="write every response (default: discarded)")
+    args = parser.parse_args()
+    if (args.script is None) == (args.generate is None):
+        parser.error("give either a script or --generate N")
+
+    if args.generate is not None:
+        requests = GENERATORS[args.tool](random.Random(args.seed), args.generate)
+        if args.save_script:
+            with open(args.save_script, "w", encoding="utf-8") as f:
+                for request in requests:
+                    f.write(json.dumps(request) + "\n")
+            print(f"💾 Wrote {args.generate} requests to {args.save_script}")
+            sys.exit(0)
+        source = contextlib.nullcontext()
+    else:
+        source = sys.stdin if args.script == "-" else open(args.script, encoding="utf-8")
+        requests = read_script(source)
+
+    handle = make_handler(args.tool, load_tool(args.tool))
+    sink = open(args.responses, "w", encoding="utf-8", buffering=1 << 20) if args.responses else None
+    with source, sink or contextlib.nullcontext():
+        start = time.perf_counter()
+        latencies = replay(handle, requests, sink)
+        wall = time.perf_counter() - start
+    report(latencies, wall)